@@ -0,0 +1,281 @@
+# NOTE: This file contains the asyncio version of database.py, for running the customer tracking system behind a web
+# or API front end. Every operation in database.py is available here as a coroutine that runs the blocking call on a
+# worker thread, so the event loop is never blocked by SQLite.
+#
+# Reads run on a pool of READ_WORKERS threads. Each thread keeps its own connection (database.py opens one per thread),
+# so the pool is also a pool of read connections, and in WAL journal mode they read in parallel with each other and
+# with the writer. Every write runs on one writer thread, one at a time, so writes never wait on each other's locks.
+# At most MAX_PENDING operations are queued for the threads at once; callers past that wait their turn.
+#
+# Usage:
+#   import adatabase
+#   customers = await adatabase.view_customers()
+#   await adatabase.close()
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+# Number of threads (and so read connections) reads are run on.
+# NOTE: SQLite lets go of the GIL while it runs a query, so reads overlap even on a single CPU. The pool is never
+# smaller than 4 threads, so one slow read can't hold up the quick ones on a small machine.
+READ_WORKERS = max(4, min(8, os.cpu_count() or 1))
+
+# Most operations queued for the worker threads at once.
+MAX_PENDING = 64
+
+# The executors and the limit on queued operations are created by the first operation, so importing this file doesn't
+# start any threads.
+read_executor = None
+write_executor = None
+pending_limit = None
+
+# EXECUTOR FUNCTIONS 👇 -----------------------------------------------------------------------------------------#
+
+# Function used to create the read and write executors the first time an operation runs.
+# NOTE: Every read thread is started (and opens its connection) straight away. A ThreadPoolExecutor otherwise only
+# starts a new thread when it finds no idle one, and it can count a busy thread as idle, which would leave a quick read
+# queued behind a slow one (like the billing query) instead of running alongside it.
+def start():
+    global read_executor, write_executor, pending_limit
+    if read_executor is None:
+        read_executor = ThreadPoolExecutor(READ_WORKERS, thread_name_prefix="adatabase-read")
+        write_executor = ThreadPoolExecutor(1, thread_name_prefix="adatabase-write")
+        pending_limit = asyncio.Semaphore(MAX_PENDING)
+
+        # Each thread waits at the barrier until all of them have started, so every open_worker_connection() call is
+        # run by a different thread.
+        barrier = threading.Barrier(READ_WORKERS)
+        for worker in range(READ_WORKERS):
+            read_executor.submit(open_worker_connection, barrier)
+        write_executor.submit(open_worker_connection, None)
+
+
+# Function used to open a worker thread's connection before its first operation.
+# NOTE: The thread waits at the barrier even if its connection couldn't be opened, so the other threads aren't left
+# waiting forever. The connection is opened again by the thread's first operation, which reports the error.
+def open_worker_connection(barrier):
+    try:
+        database.get_connection()
+    finally:
+        if barrier:
+            barrier.wait()
+
+
+# Function used to run a blocking database function on one of the executors and wait for its result.
+async def run_on(executor_name, function, *args):
+    start()
+    executor = read_executor if executor_name == "read" else write_executor
+    async with pending_limit:
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(function, *args))
+
+
+# Function used to run a database function that only reads, on the read pool.
+async def run_read(function, *args):
+    return await run_on("read", function, *args)
+
+
+# Function used to run a database function that writes, on the writer thread.
+async def run_write(function, *args):
+    return await run_on("write", function, *args)
+
+
+# Function used to run a database function that returns a cursor on the read pool. Returns every row as a list.
+# NOTE: A cursor can only be read on the thread whose connection made it, so the rows are read before returning.
+async def read_rows(function, *args):
+    return await run_read(lambda: function(*args).fetchall())
+
+
+# Function used to shut the executors down once every queued operation has finished. The worker threads' connections
+# are closed as the threads exit.
+async def close():
+    global read_executor, write_executor, pending_limit
+    if read_executor is None:
+        return
+    executors = (read_executor, write_executor)
+    read_executor = write_executor = pending_limit = None
+    for executor in executors:
+        await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+# MAIN COROUTINES 👇 --------------------------------------------------------------------------------------------#
+
+# Coroutine used for 👇
+# 1. Add a customer
+async def add_new_customer(name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp):
+    return await run_write(database.add_new_customer, name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp)
+
+
+async def add_new_customers(customers):
+    return await run_write(database.add_new_customers, customers)
+
+
+# Coroutines used for 👇
+# 2. Remove a customer
+async def remove_customer(id, customer_name):
+    return await run_write(database.remove_customer, id, customer_name)
+
+
+async def view_customer_info(name):
+    return await read_rows(database.view_customer_info, name)
+
+
+# Coroutines used for 👇
+# 3. View customer(s)
+async def view_customers():
+    return await read_rows(database.view_customers)
+
+
+async def view_customers_page(after_id=0, location=None, page_size=database.PAGE_SIZE):
+    return await run_read(database.view_customers_page, after_id, location, page_size)
+
+
+# Coroutine used for 👇
+# 4. View customers who currently have late payments
+# NOTE: The payment aging sweep is a write, so it is run on the writer thread before the customers are read.
+async def view_late_customers(min_bucket=30):
+    await run_write(database.sweep_payment_aging)
+    return await read_rows(database.read_late_customers, min_bucket)
+
+
+# Coroutine used for 👇
+# 5. Update a customer's last payment made
+async def update_last_payment(last_payment_timestamp, entry_to_update):
+    return await run_write(database.update_last_payment, last_payment_timestamp, entry_to_update)
+
+
+# Coroutines used for 👇
+# 6. Add a product
+async def add_new_product(product, type, price):
+    return await run_write(database.add_new_product, product, type, price)
+
+
+async def add_new_products(products):
+    return await run_write(database.add_new_products, products)
+
+
+# Coroutines used for 👇
+# 7. Remove a product
+async def remove_product(id, product):
+    return await run_write(database.remove_product, id, product)
+
+
+async def view_product_info(product):
+    return await run_read(database.view_product_info, product)
+
+
+# Coroutines used for 👇
+# 8. View product(s)
+async def view_products():
+    return await run_read(database.view_products)
+
+
+async def view_products_page(after_id=0, product_type=None, page_size=database.PAGE_SIZE):
+    return await run_read(database.view_products_page, after_id, product_type, page_size)
+
+
+# Coroutine used for 👇
+# 9. Edit the price of a product
+async def update_price(price, entry_to_update):
+    return await run_write(database.update_price, price, entry_to_update)
+
+
+# Coroutines used for 👇
+# 10. Assign a product to a customer
+async def assign_product_to_customer(customer_name, customer_location, product_to_assign, price_to_assign):
+    return await run_write(database.assign_product_to_customer, customer_name, customer_location, product_to_assign, price_to_assign)
+
+
+async def assign_products_by_id(customer_and_product_ids):
+    return await run_write(database.assign_products_by_id, customer_and_product_ids)
+
+
+# Coroutine used for 👇
+# 11. Remove a product from a customer
+async def remove_assignment(id):
+    return await run_write(database.remove_assignment, id)
+
+
+# Coroutines used for 👇
+# 12. View product assignment(s)
+async def view_assignments():
+    return await read_rows(database.view_assignments)
+
+
+async def view_assignments_page(after_id=0, location=None, page_size=database.PAGE_SIZE):
+    return await run_read(database.view_assignments_page, after_id, location, page_size)
+
+
+# Coroutine used for 👇
+# 13. View a customer's monthly bill
+async def view_monthly_bill(name):
+    return await read_rows(database.view_monthly_bill, name)
+
+# OTHER COROUTINES 👇 -------------------------------------------------------------------------------------------#
+
+# Coroutine used to find customers from part of their name, location or phone number (see database.search_customers()).
+async def search_customers(text, limit=database.SEARCH_LIMIT):
+    return await run_read(database.search_customers, text, limit)
+
+
+# Coroutines used for the monthly billing run (see billing.py).
+async def view_all_bills():
+    return await read_rows(database.view_all_bills)
+
+
+async def save_bills(billing_month):
+    return await run_write(database.save_bills, billing_month)
+
+
+# Coroutines used for the payment aging buckets (see database.sweep_payment_aging()).
+async def sweep_payment_aging():
+    return await run_write(database.sweep_payment_aging)
+
+
+async def payment_aging_summary():
+    await run_write(database.sweep_payment_aging)
+    return await run_read(database.read_payment_aging_summary)
+
+# CHECK COROUTINES 👇 -------------------------------------------------------------------------------------------#
+
+# NOTE: These run the check functions in database.py, which each return True if the entry exists and False if not.
+
+async def customer_at_location_check(name, location):
+    return await run_read(database.customer_at_location_check, name, location)
+
+
+async def customers_at_locations_check(names_and_locations):
+    return await run_read(database.customers_at_locations_check, names_and_locations)
+
+
+async def product_and_price_check(product, price):
+    return await run_read(database.product_and_price_check, product, price)
+
+
+async def id_check_customers(id, name):
+    return await run_read(database.id_check_customers, id, name)
+
+
+async def id_check_products(id, product):
+    return await run_read(database.id_check_products, id, product)
+
+
+async def id_check_customer_products(id):
+    return await run_read(database.id_check_customer_products, id)
+
+
+async def customer_check(name):
+    return await run_read(database.customer_check, name)
+
+
+async def product_check(product):
+    return await run_read(database.product_check, product)
+
+
+async def customer_assignment_check(name):
+    return await run_read(database.customer_assignment_check, name)
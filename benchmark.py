@@ -0,0 +1,335 @@
+# NOTE: This file contains the benchmark suite for database.py. It generates a synthetic database (generate_data.py)
+# at each requested size, times every public database function against it, and writes a JSON report. Passing an
+# earlier report with --compare flags any function that got slower.
+#
+# Usage: python benchmark.py [--sizes 10000 100000 1000000] [--output report.json] [--compare baseline.json]
+#
+# Before the sizes are run, the time it takes main.py and cli.py to start and exit is measured over --startup-runs
+# separate launches, since scripts call them many times in a row. The write throughput with one commit per operation
+# is then compared with group commit (many operations in one database.unit_of_work()) under each durability profile.
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import database
+import generate_data
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Number of customers looked up ahead of time for the benchmarks to pick from.
+SAMPLE_SIZE = 500
+
+# Number of separate launches timed for each startup benchmark.
+DEFAULT_STARTUP_RUNS = 20
+
+# Write operations timed per group commit benchmark, the number of customers in the database they run against, and
+# the number of operations committed together by group commit.
+DEFAULT_GROUP_COMMIT_OPERATIONS = 2000
+GROUP_COMMIT_DATABASE_SIZE = 10000
+GROUP_COMMIT_SIZE = 100
+
+# Directory the application files are in, for launching main.py and cli.py in the startup benchmarks.
+APPLICATION_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# A function is reported as a regression when its median time grows by more than this factor.
+DEFAULT_THRESHOLD = 1.25
+
+# SETUP FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to get a database file with the given number of customers. Generated databases are kept in the work
+# directory and reused, and each benchmark run works on a fresh copy since the write benchmarks change the data.
+def prepare_database(work_directory, size, seed):
+    generated_path = os.path.join(work_directory, f"bench_{size}.db")
+    if not os.path.exists(generated_path):
+        print(f"Generating {size} customers...")
+        generate_data.generate_database(generated_path, size, 50, size * 3, seed)
+
+        # Closing the connection checkpoints the WAL file into the database file so the file can be copied by itself.
+        database.close_connection()
+
+    run_path = os.path.join(work_directory, f"bench_{size}_run.db")
+    shutil.copyfile(generated_path, run_path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(run_path + suffix):
+            os.remove(run_path + suffix)
+
+    database.use_database(run_path)
+    return run_path
+
+
+# Function used to look up a random sample of customers and every product for the benchmarks to use as arguments.
+# Returns a shuffled list of (id, name, location) customers and a list of (id, product, price) products.
+def sample_entries(rng, size):
+    customers = []
+    for customer_id in rng.sample(range(1, size + 1), min(SAMPLE_SIZE, size)):
+        page, has_next_page = database.view_customers_page(customer_id - 1, page_size=1)
+        customers.extend((id, name, location) for id, name, phone_num, location, *dates in page)
+    products = [(id, product, price) for id, product, product_type, price in database.view_products()]
+    return customers, products
+
+# BENCHMARK FUNCTIONS 👇 ----------------------------------------------------------------------------------------#
+
+# Function used to read every row from a cursor, so the time of functions that return a cursor includes running the
+# whole query and not just starting it.
+def consume(cursor):
+    for row in cursor:
+        pass
+
+
+# Function used to get the list of benchmarks to run. Each benchmark is a name, the number of times it is called, and
+# a function that is passed the call number and calls one database function.
+# NOTE: The benchmarks run in this order, so the ones that remove data come last and the reads see the full data set.
+def benchmarks(rng, size, customers, products):
+    customer = lambda call: customers[call % len(customers)]
+    product = lambda call: products[call % len(products)]
+    timestamp = datetime.now().timestamp()
+
+    return [
+        # Checks
+        ("customer_check", 200, lambda call: database.customer_check(customer(call)[1])),
+        ("customer_at_location_check", 200, lambda call: database.customer_at_location_check(*customer(call)[1:])),
+        ("customers_at_locations_check", 20, lambda call: database.customers_at_locations_check([entry[1:] for entry in customers])),
+        ("product_check", 200, lambda call: database.product_check(product(call)[1])),
+        ("product_and_price_check", 200, lambda call: database.product_and_price_check(*product(call)[1:])),
+        ("product_check (uncached)", 200, lambda call: (database.clear_product_cache(), database.product_check(product(call)[1]))),
+        ("id_check_customers", 200, lambda call: database.id_check_customers(*customer(call)[:2])),
+        ("id_check_products", 200, lambda call: database.id_check_products(*product(call)[:2])),
+        ("id_check_customer_products", 200, lambda call: database.id_check_customer_products(rng.randint(1, size * 3))),
+        ("customer_assignment_check", 200, lambda call: database.customer_assignment_check(customer(call)[1])),
+
+        # Single entry views
+        ("view_customer_info", 200, lambda call: consume(database.view_customer_info(customer(call)[1]))),
+        ("view_product_info", 200, lambda call: consume(database.view_product_info(product(call)[1]))),
+        ("view_monthly_bill", 200, lambda call: consume(database.view_monthly_bill(customer(call)[1]))),
+
+        # Customer search
+        ("search_customers (prefix)", 200, lambda call: database.search_customers(customer(call)[1][:3])),
+        ("search_customers (full name)", 200, lambda call: database.search_customers(customer(call)[1])),
+        ("search_customers (name and city)", 200, lambda call: database.search_customers(f"{customer(call)[1]} {customer(call)[2].split()[-2]}")),
+
+        # Paged views
+        ("view_customers_page", 200, lambda call: database.view_customers_page(customer(call)[0])),
+        ("view_customers_page (location)", 200, lambda call: database.view_customers_page(0, customer(call)[2])),
+        ("view_products_page", 200, lambda call: database.view_products_page(0, "Service")),
+        ("view_assignments_page", 200, lambda call: database.view_assignments_page(customer(call)[0])),
+
+        # Full table views
+        ("view_customers", 3, lambda call: consume(database.view_customers())),
+        ("view_products", 20, lambda call: consume(database.view_products())),
+        ("view_products (uncached)", 20, lambda call: (database.clear_product_cache(), consume(database.view_products()))),
+        ("view_assignments", 3, lambda call: consume(database.view_assignments())),
+        ("view_late_customers", 3, lambda call: consume(database.view_late_customers())),
+        ("view_late_customers (90 days)", 20, lambda call: consume(database.view_late_customers(90))),
+        ("payment_aging_summary", 20, lambda call: database.payment_aging_summary()),
+        ("sweep_payment_aging", 200, lambda call: database.sweep_payment_aging()),
+        ("view_all_bills", 3, lambda call: consume(database.view_all_bills())),
+
+        # Writes
+        ("add_new_customer", 100, lambda call: database.add_new_customer(f"Benchmark Customer {call}", "555-555-5555", "1 Benchmark Way", "4111111111111111", timestamp, timestamp)),
+        ("add_new_customers (1000 rows)", 5, lambda call: database.add_new_customers([(f"Benchmark Customer {call}-{row}", "555-555-5555", "2 Benchmark Way", "4111111111111111", timestamp, timestamp) for row in range(1000)])),
+        ("add_new_product", 100, lambda call: database.add_new_product(f"Benchmark Product {call}", "Service", 99.99)),
+        ("assign_product_to_customer", 100, lambda call: database.assign_product_to_customer(*customer(call)[1:], *product(call + 1)[1:])),
+        ("update_last_payment", 100, lambda call: database.update_last_payment(timestamp, customer(call)[0])),
+        ("update_price", 20, lambda call: database.update_price(round(product(call)[2] + 0.01, 2), product(call)[0])),
+        ("save_bills", 3, lambda call: database.save_bills(f"benchmark-{call}")),
+
+        # Removes (including the assignments removed by cascade)
+        ("remove_assignment", 100, lambda call: database.remove_assignment(rng.randint(1, size * 3))),
+        ("remove_customer", 100, lambda call: database.remove_customer(*customer(call)[:2])),
+        ("remove_product", 3, lambda call: database.remove_product(*product(call)[:2])),
+    ]
+
+
+# Function used to call a benchmark the given number of times and summarize how long the calls took.
+def time_calls(calls, function):
+    durations = []
+    for call in range(calls):
+        start = time.perf_counter()
+        function(call)
+        durations.append(time.perf_counter() - start)
+
+    durations.sort()
+    return {
+        "calls": calls,
+        "mean_ms": statistics.fmean(durations) * 1000,
+        "p50_ms": durations[len(durations) // 2] * 1000,
+        "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+        "max_ms": durations[-1] * 1000,
+        "ops_per_sec": calls / sum(durations) if sum(durations) else None,
+    }
+
+
+# Function used to run every benchmark at one database size. Returns the results keyed by benchmark name.
+def run_size(work_directory, size, seed):
+    prepare_database(work_directory, size, seed)
+    rng = random.Random(seed)
+    customers, products = sample_entries(rng, size)
+
+    results = {}
+    for name, calls, function in benchmarks(rng, size, customers, products):
+        results[name] = time_calls(calls, function)
+        print(f"  {name:<32} p50 {results[name]['p50_ms']:>10.3f} ms   p95 {results[name]['p95_ms']:>10.3f} ms")
+
+    database.close_connection()
+    return results
+
+
+# Function used to time how long main.py and cli.py take to start, do one small thing and exit, each launched as its
+# own process the way scripts run them. Returns the results keyed by benchmark name, in the same form as run_size().
+# NOTE: The first launch against a new database file creates the schema, so it is timed separately from launches
+# against a file that is already at the newest schema version.
+def run_startup(work_directory, runs):
+    database_path = os.path.join(work_directory, "startup.db")
+    python = sys.executable
+    main_path = os.path.join(APPLICATION_DIRECTORY, "main.py")
+    cli_path = os.path.join(APPLICATION_DIRECTORY, "cli.py")
+
+    # Function used to launch the application once and wait for it to exit.
+    def launch(arguments, input=None):
+        subprocess.run([python, *arguments], input=input, cwd=work_directory, stdout=subprocess.DEVNULL, text=True, check=True)
+
+    # Function used to launch cli.py against a database file that doesn't exist yet.
+    def new_database(call):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database_path + suffix):
+                os.remove(database_path + suffix)
+        launch([cli_path, "--database", database_path, "customers", "--limit", "1"])
+
+    startup_benchmarks = [
+        ("cli.py --help", lambda call: launch([cli_path, "--help"])),
+        ("cli.py customers (new database)", new_database),
+        ("cli.py customers", lambda call: launch([cli_path, "--database", database_path, "customers", "--limit", "1"])),
+        ("cli.py late-customers", lambda call: launch([cli_path, "--database", database_path, "late-customers"])),
+        ("main.py (exit)", lambda call: launch([main_path, "--database", database_path], input="14\n")),
+        ("main.py (view a page, exit)", lambda call: launch([main_path, "--database", database_path], input="3\n\n\n14\n")),
+    ]
+
+    results = {}
+    for name, function in startup_benchmarks:
+        results[name] = time_calls(runs, function)
+        print(f"  {name:<32} p50 {results[name]['p50_ms']:>10.3f} ms   p95 {results[name]['p95_ms']:>10.3f} ms")
+    return results
+
+# Function used to time a mix of writes (payments posted and products assigned) committed one operation at a time
+# and committed GROUP_COMMIT_SIZE operations at a time, under every durability profile. Returns the results keyed by
+# benchmark name, in the same form as run_size(). Each timed call is GROUP_COMMIT_SIZE operations, and ops_per_sec
+# counts operations rather than calls.
+def run_group_commit(work_directory, operations, seed):
+    results = {}
+    for profile in database.DURABILITY_PROFILES:
+        # Switching the durability profile closes the connection to the last run's copy before it is replaced.
+        database.use_durability(profile)
+        prepare_database(work_directory, GROUP_COMMIT_DATABASE_SIZE, seed)
+        rng = random.Random(seed)
+        customers, products = sample_entries(rng, GROUP_COMMIT_DATABASE_SIZE)
+        timestamp = datetime.now().timestamp()
+
+        # Function used to run one write operation.
+        def write(operation):
+            id, name, location = customers[operation % len(customers)]
+            if operation % 2:
+                database.update_last_payment(timestamp - operation, id)
+            else:
+                product_id, product, price = products[operation % len(products)]
+                database.assign_product_to_customer(name, location, product, price)
+
+        # Function used to run one call's operations, each committed on its own.
+        def per_operation_commit(call):
+            for operation in range(call * GROUP_COMMIT_SIZE, (call + 1) * GROUP_COMMIT_SIZE):
+                write(operation)
+
+        # Function used to run one call's operations, all committed together.
+        def group_commit(call):
+            with database.unit_of_work():
+                per_operation_commit(call)
+
+        calls = max(1, operations // GROUP_COMMIT_SIZE)
+        for name, function in [(f"per-operation commit ({profile})", per_operation_commit),
+                               (f"group commit x{GROUP_COMMIT_SIZE} ({profile})", group_commit)]:
+            results[name] = time_calls(calls, function)
+            results[name]["ops_per_sec"] *= GROUP_COMMIT_SIZE
+            print(f"  {name:<32} {results[name]['ops_per_sec']:>10,.0f} ops/s")
+
+    database.use_durability("full")
+    return results
+
+# REPORT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to compare a report against an earlier one. Returns a list of (size, benchmark, old p50, new p50)
+# for every benchmark whose median time grew by more than the threshold.
+def find_regressions(report, baseline, threshold):
+    regressions = []
+    for size, results in report["results"].items():
+        for name, result in results.items():
+            old_result = baseline.get("results", {}).get(size, {}).get(name)
+            if old_result and result["p50_ms"] > old_result["p50_ms"] * threshold:
+                regressions.append((size, name, old_result["p50_ms"], result["p50_ms"]))
+    return regressions
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every public function in database.py at several data sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of customers to test at")
+    parser.add_argument("--output", default="benchmark_report.json", help="JSON report file (default: benchmark_report.json)")
+    parser.add_argument("--compare", help="earlier JSON report to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown factor counted as a regression")
+    parser.add_argument("--work-dir", help="directory generated databases are kept in (default: a temporary directory)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: 42)")
+    parser.add_argument("--startup-runs", type=int, default=DEFAULT_STARTUP_RUNS, help="launches timed per startup benchmark (0 to skip)")
+    parser.add_argument("--group-commit-ops", type=int, default=DEFAULT_GROUP_COMMIT_OPERATIONS, help="writes timed per group commit benchmark (0 to skip)")
+    args = parser.parse_args()
+
+    work_directory = args.work_dir or tempfile.mkdtemp(prefix="customer_benchmark_")
+    os.makedirs(work_directory, exist_ok=True)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "results": {},
+    }
+
+    # The startup results are reported alongside the sizes so --compare checks them for regressions too.
+    if args.startup_runs:
+        print(f"\nStartup ({args.startup_runs} launches each):")
+        report["results"]["startup"] = run_startup(work_directory, args.startup_runs)
+
+    if args.group_commit_ops:
+        print(f"\nGroup commit ({args.group_commit_ops} writes each, {GROUP_COMMIT_DATABASE_SIZE} customers):")
+        report["results"]["group_commit"] = run_group_commit(work_directory, args.group_commit_ops, args.seed)
+
+    for size in args.sizes:
+        print(f"\n{size} customers:")
+        report["results"][str(size)] = run_size(work_directory, size, args.seed)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if not args.work_dir:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = find_regressions(report, baseline, args.threshold)
+        for size, name, old_p50, new_p50 in regressions:
+            print(f"REGRESSION at {size} customers: {name} p50 {old_p50:.3f} ms -> {new_p50:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
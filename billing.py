@@ -0,0 +1,86 @@
+# NOTE: This file contains the monthly billing run. Instead of working out one customer's bill at a time like option 13
+# does, every customer's bill is calculated by SQLite in one grouped query and streamed out to a statement file, saved
+# to the bills table, or both.
+#
+# Usage: python billing.py [--month YYYY-MM] [--output statements.csv] [--save] [--snapshot file.db [--in-memory]]
+#
+# --snapshot writes the statements from a snapshot taken with snapshot.py instead of the live database, and
+# --in-memory loads the snapshot into memory first. Bills can't be saved from a snapshot.
+
+import argparse
+import csv
+import time
+from datetime import datetime
+
+import database
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+STATEMENT_FIELDS = ["billing_month", "customer_id", "name", "location", "product_count", "total"]
+
+# Number of bills read from the database at a time while writing the statement file.
+FETCH_SIZE = 5000
+
+# BILLING FUNCTIONS 👇 ------------------------------------------------------------------------------------------#
+
+# Function used to write every customer's bill for a billing month to a CSV statement file.
+# NOTE: Bills are read in chunks with fetchmany() and written as they arrive, so memory use doesn't grow with the
+# number of customers. Returns the number of bills written.
+def write_statements(billing_month, output_path):
+    bills = database.view_all_bills()
+    bill_count = 0
+
+    with open(output_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(STATEMENT_FIELDS)
+
+        while rows := bills.fetchmany(FETCH_SIZE):
+            writer.writerows((billing_month, *row) for row in rows)
+            bill_count += len(rows)
+
+    return bill_count
+
+
+# Function used to run the monthly billing for every customer. Returns the number of bills produced and the time
+# taken in seconds.
+def run_billing(billing_month, output_path=None, save=False):
+    start = time.perf_counter()
+    bill_count = 0
+
+    if output_path:
+        bill_count = write_statements(billing_month, output_path)
+    if save:
+        bill_count = database.save_bills(billing_month)
+
+    return bill_count, time.perf_counter() - start
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Produce every customer's monthly bill.")
+    parser.add_argument("--month", default=datetime.now().strftime("%Y-%m"), help="billing month, YYYY-MM (default: this month)")
+    parser.add_argument("--output", help="CSV statement file the bills are written to")
+    parser.add_argument("--save", action="store_true", help="save the bills to the bills table")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    parser.add_argument("--snapshot", help="snapshot (see snapshot.py) read instead of the live database")
+    parser.add_argument("--in-memory", action="store_true", help="load the snapshot into memory before billing")
+    args = parser.parse_args()
+    if args.snapshot and args.save:
+        parser.error("bills can't be saved from a snapshot, only to the live database")
+    if args.in_memory and not args.snapshot:
+        parser.error("--in-memory needs --snapshot")
+
+    # With no destination given, the statements are written to a file named after the billing month.
+    output_path = args.output or (None if args.save else f"statements_{args.month}.csv")
+
+    if args.database:
+        database.use_database(args.database)
+    if args.snapshot:
+        database.use_snapshot(args.snapshot, args.in_memory)
+    bill_count, elapsed = run_billing(args.month, output_path, args.save)
+
+    print(f"Billed {bill_count} customer locations for {args.month} in {elapsed:.2f}s ({bill_count / max(elapsed, 1e-9):,.0f} bills/s).")
+    if output_path:
+        print(f"Statements written to {output_path}")
+    if args.save:
+        print("Bills saved to the bills table.")
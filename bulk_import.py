@@ -0,0 +1,150 @@
+# NOTE: This file contains the bulk customer import. It streams customers from a CSV or JSONL file into the customers
+# table without going through the interactive prompts, which makes onboarding a large existing subscriber base possible.
+#
+# Usage: python bulk_import.py customers.csv [--errors rejected.csv] [--chunk-size 5000]
+#
+# The file must have the fields name, phone_num, location, card_num, sign_up_date and last_payment, with dates in the
+# same mm-dd-YYYY format the prompts use. Rows are read, validated and inserted one chunk at a time, so memory use
+# stays the same no matter how large the file is.
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import database
+import validation
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+CUSTOMER_FIELDS = ["name", "phone_num", "location", "card_num", "sign_up_date", "last_payment"]
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# READ / WRITE FUNCTIONS 👇 -------------------------------------------------------------------------------------#
+
+# Function used to work out if a file is CSV or JSONL from its extension when the format isn't given.
+def file_format(path, format=None):
+    if format:
+        return format
+    if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return "csv"
+
+
+# Function used to read customer rows one at a time from a CSV or JSONL file. A JSONL line that isn't a JSON object is
+# written to the error file (as its text under "line") instead of stopping the whole file.
+# NOTE: This is a generator, so only the row currently being processed is held in memory.
+def read_rows(file, format, write_error):
+    if format == "jsonl":
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                write_error({"line": line.rstrip("\r\n")}, "line is not valid JSON")
+                continue
+            if not isinstance(row, dict):
+                write_error({"line": line.rstrip("\r\n")}, "line is not a JSON object")
+                continue
+            yield row
+    else:
+        yield from csv.DictReader(file)
+
+
+# Function used to open the error file that rejected rows are written to. Returns a function that writes one
+# rejected row along with the reason it was rejected.
+def open_error_writer(file, format, fields=CUSTOMER_FIELDS):
+    if format == "jsonl":
+        def write_error(row, error):
+            file.write(json.dumps({**row, "error": error}) + "\n")
+    else:
+        writer = csv.DictWriter(file, fieldnames=fields + ["error"], extrasaction="ignore")
+        writer.writeheader()
+        def write_error(row, error):
+            writer.writerow({**row, "error": error})
+    return write_error
+
+# IMPORT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to validate and insert one chunk of customer rows. Rows that aren't valid, and customers whose name and
+# location combination already exists (in the database or earlier in the same chunk), are rejected rather than failing
+# the whole chunk. Returns the number of customers inserted.
+# NOTE: The whole chunk is validated in one validation.validate_batch() call, which converts the dates into timestamps
+# as it checks them.
+def import_chunk(rows, write_error):
+    values, errors = validation.validate_batch(rows, validation.CUSTOMER_VALIDATORS)
+    chunk = []
+    for fields, error, row in zip(values, errors, rows):
+        if error:
+            write_error(row, error)
+        else:
+            chunk.append((fields, row))
+
+    existing = database.customers_at_locations_check([(fields[0], fields[2]) for fields, row in chunk])
+
+    customers = []
+    for fields, row in chunk:
+        name_and_location = (fields[0], fields[2])
+        if name_and_location in existing:
+            write_error(row, "customer already present at location")
+        else:
+            existing.add(name_and_location)
+            customers.append(fields)
+
+    # NOTE: The count comes from the insert itself, so a customer added by someone else between the check above and
+    # the insert is skipped rather than counted or failing the chunk.
+    return database.add_new_customers(customers)
+
+
+# Function used to import every customer in a file. Rows are gathered into chunks that are each validated and inserted
+# in one transaction, and rejected rows are written to the error file.
+# Returns the number of customers imported, the number of rows rejected, and the time taken in seconds.
+def import_customers(path, error_path, format=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    format = file_format(path, format)
+    imported = rejected = 0
+    start = time.perf_counter()
+
+    with open(path, newline="", encoding="utf-8") as file, open(error_path, "w", newline="", encoding="utf-8") as error_file:
+        error_writer = open_error_writer(error_file, format)
+
+        # Rejected rows are counted as they are written so the error file and the summary always agree.
+        def write_error(row, error):
+            nonlocal rejected
+            rejected += 1
+            error_writer(row, error)
+
+        chunk = []
+        for row in read_rows(file, format, write_error):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                imported += import_chunk(chunk, write_error)
+                chunk = []
+
+        if chunk:
+            imported += import_chunk(chunk, write_error)
+
+    return imported, rejected, time.perf_counter() - start
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import customers from a CSV or JSONL file.")
+    parser.add_argument("path", help="CSV or JSONL file of customers to import")
+    parser.add_argument("--errors", help="file rejected rows are written to (default: <path>.rejected)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="file format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="customers inserted per transaction")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    args = parser.parse_args()
+
+    error_path = args.errors or f"{args.path}.rejected"
+
+    if args.database:
+        database.use_database(args.database)
+    imported, rejected, elapsed = import_customers(args.path, error_path, args.format, args.chunk_size)
+
+    print(f"Imported {imported} customers in {elapsed:.2f}s ({imported / max(elapsed, 1e-9):,.0f} rows/s).")
+    if rejected:
+        print(f"{rejected} rows rejected, see {error_path}")
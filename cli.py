@@ -0,0 +1,507 @@
+# NOTE: This file contains the non-interactive command mode of the customer tracking system. Each of the 13 menu
+# options in main.py is a subcommand that takes its input as arguments instead of through the prompts and prints its
+# result as JSON, so scripts and cron jobs can use the system without going through the menu.
+#
+# Usage: python cli.py [--database file.db] [--shards dir] <command> [arguments]     (python cli.py --help lists the commands)
+#
+# Commands that change the database print one JSON object with "ok" set to true or false. Commands that list entries
+# print one JSON object per line. The exit code is 0 when the command succeeded and 1 when it didn't (for example, a
+# customer that was already present or an id that doesn't exist).
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+import database
+import other_functions
+import queries
+import validation
+
+# NOTE: The report commands' modules (bulk_import, billing, export, invoices, payments, revenue and snapshot) are
+# imported by the commands that use them rather than here, so the other commands don't pay for loading them.
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+CUSTOMER_FIELDS = ["id", "name", "phone_num", "location", "card_num", "sign_up_date", "last_payment"]
+
+PRODUCT_FIELDS = ["id", "product", "product_type", "price"]
+
+ASSIGNMENT_FIELDS = ["id", "customer_name", "customer_location", "product_name", "product_price"]
+
+# The tables and views export.py can export (see export.EXPORTS).
+EXPORT_TABLES = ["customers", "products", "assignments", "late-customers", "bills"]
+
+# OUTPUT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to print the result of a command that changes the database. Returns the exit code for the command.
+def print_result(ok, **details):
+    print(json.dumps({"ok": ok, **details}))
+    return 0 if ok else 1
+
+
+# Function used to print customer entries, one JSON object per line, with their dates as YYYY-MM-DD.
+def print_customers(customers):
+    for id, name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp in customers:
+        sign_up_date = other_functions.timestamp_to_iso_date(sign_up_timestamp)
+        last_payment_date = other_functions.timestamp_to_iso_date(last_payment_timestamp)
+        print(json.dumps(dict(zip(CUSTOMER_FIELDS, (id, name, phone_num, location, card_num, sign_up_date, last_payment_date)))))
+    return 0
+
+
+# Function used to print entries of the products or customer_products table, one JSON object per line.
+def print_rows(fields, rows):
+    for row in rows:
+        print(json.dumps(dict(zip(fields, row))))
+    return 0
+
+
+# Function used to print a listing either in full or, if a page size is given, one page of it. A page is followed
+# by a line with the id the next page starts after, or null if it was the last page.
+def print_listing(args, view_all, view_page, print_entries):
+    if args.limit is not None:
+        rows, has_next_page = view_page(args.after_id, args.limit)
+        print_entries(rows)
+        print(json.dumps({"next_after_id": rows[-1][0] if has_next_page else None}))
+    else:
+        print_entries(view_all())
+    return 0
+
+# VALIDATION FUNCTIONS 👇 ---------------------------------------------------------------------------------------#
+
+# Function used to turn one of the parse functions in validation.py into an argparse type, so an invalid value is
+# reported with the reason it was rejected.
+def parsed_argument(label, parse):
+    def parse_argument(value):
+        try:
+            return parse(value)
+        except ValueError as error:
+            raise argparse.ArgumentTypeError(f"{label} {error}")
+    return parse_argument
+
+
+# Argparse types for dates (given in the same mm-dd-YYYY format as the prompts, and returned as their timestamp),
+# phone numbers (XXX-XXX-XXXX) and card numbers (13 to 19 digits).
+date_argument = parsed_argument("date", validation.parse_date)
+
+phone_argument = parsed_argument("phone number", validation.parse_phone_number)
+
+card_argument = parsed_argument("card number", validation.parse_card_number)
+
+
+# Function used as an argparse type for prices, which are rounded to cents like the prompts round them.
+def price_argument(price):
+    try:
+        return round(float(price), 2)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{price} is not a number")
+
+
+# Function used as an argparse type for counts that must be at least 1, like page sizes and chunk sizes.
+def positive_int_argument(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value} is not a whole number")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} must be at least 1")
+    return number
+
+# COMMAND FUNCTIONS 👇 ------------------------------------------------------------------------------------------#
+
+# Command used for 👇
+# 1. Add a customer
+def add_customer(args):
+    id = database.add_new_customer(args.name, args.phone, args.location, args.card, args.sign_up, args.last_payment)
+    if id is None:
+        return print_result(False, error=f"{args.name} already present at {args.location}")
+    return print_result(True, id=id)
+
+
+# Command used for 👇
+# 2. Remove a customer
+def remove_customer(args):
+    if not database.remove_customer(args.id, args.name):
+        return print_result(False, error=f"no entry {args.id} for customer {args.name}")
+    return print_result(True, id=args.id)
+
+
+# Command used for 👇
+# 3. View customer(s)
+def customers(args):
+    if args.location:
+        view_page = lambda after_id, limit: database.view_customers_page(after_id, args.location, limit)
+        view_all = lambda: iterate_pages(view_page)
+    else:
+        view_page = lambda after_id, limit: database.view_customers_page(after_id, None, limit)
+        view_all = database.view_customers
+    return print_listing(args, view_all, view_page, print_customers)
+
+
+# Command used for 👇
+# 4. View customers who currently have late payments
+def late_customers(args):
+    return print_customers(database.view_late_customers(args.bucket))
+
+
+# Command used for 👇
+# 5. Update a customer's last payment made
+def update_payment(args):
+    if not database.update_last_payment(args.date, args.id):
+        return print_result(False, error=f"no customer entry {args.id}")
+    return print_result(True, id=args.id)
+
+
+# Command used for 👇
+# 6. Add a product
+# NOTE: Like the add product prompt, equipment is always added at a price of $0.
+def add_product(args):
+    product_type = args.type.capitalize()
+    price = 0 if product_type == "Equipment" else args.price
+    if price is None:
+        return print_result(False, error="a service needs a --price")
+
+    id = database.add_new_product(args.name, product_type, price)
+    if id is None:
+        return print_result(False, error=f"{args.name} already present at ${price}")
+    return print_result(True, id=id)
+
+
+# Command used for 👇
+# 7. Remove a product
+def remove_product(args):
+    if not database.remove_product(args.id, args.name):
+        return print_result(False, error=f"no entry {args.id} for product {args.name}")
+    return print_result(True, id=args.id)
+
+
+# Command used for 👇
+# 8. View product(s)
+def products(args):
+    product_type = args.type.capitalize() if args.type else None
+    view_page = lambda after_id, limit: database.view_products_page(after_id, product_type, limit)
+    view_all = (lambda: iterate_pages(view_page)) if product_type else database.view_products
+    return print_listing(args, view_all, view_page, lambda rows: print_rows(PRODUCT_FIELDS, rows))
+
+
+# Command used for 👇
+# 9. Edit the price of a product
+def update_price(args):
+    if not database.update_price(args.price, args.id):
+        return print_result(False, error=f"no product entry {args.id}")
+    return print_result(True, id=args.id)
+
+
+# Command used for 👇
+# 10. Assign a product to a customer
+def assign(args):
+    id = database.assign_product_to_customer(args.customer, args.location, args.product, args.price)
+    if id is not None:
+        return print_result(True, id=id)
+    if not database.customer_at_location_check(args.customer, args.location):
+        return print_result(False, error=f"{args.customer} isn't present at {args.location}")
+    if not database.product_and_price_check(args.product, args.price):
+        return print_result(False, error=f"{args.product} at ${args.price} isn't a current product")
+    return print_result(False, error=f"{args.product} is already assigned to {args.customer} at {args.location}")
+
+
+# Command used for 👇
+# 11. Unassign a product from a customer
+def unassign(args):
+    if not database.remove_assignment(args.id):
+        return print_result(False, error=f"no product assignment {args.id}")
+    return print_result(True, id=args.id)
+
+
+# Command used for 👇
+# 12. View product assignment(s)
+def assignments(args):
+    view_page = lambda after_id, limit: database.view_assignments_page(after_id, args.location, limit)
+    view_all = (lambda: iterate_pages(view_page)) if args.location else database.view_assignments
+    return print_listing(args, view_all, view_page, lambda rows: print_rows(ASSIGNMENT_FIELDS, rows))
+
+
+# Command used for 👇
+# 13. View a customer's monthly bill
+def bill(args):
+    if not database.customer_assignment_check(args.name):
+        return print_result(False, error=f"{args.name} does not have any current products assigned to them")
+    total = database.view_monthly_bill(args.name).fetchone()[0]
+    return print_result(True, name=args.name, total=float(total))
+
+
+# Command used to import customers from a CSV or JSONL file (see bulk_import.py).
+def import_customers(args):
+    import bulk_import
+    error_path = args.errors or f"{args.path}.rejected"
+    chunk_size = args.chunk_size or bulk_import.DEFAULT_CHUNK_SIZE
+    imported, rejected, elapsed = bulk_import.import_customers(args.path, error_path, args.format, chunk_size)
+    return print_result(True, imported=imported, rejected=rejected, errors=error_path, seconds=round(elapsed, 3))
+
+
+# Command used to post the payments in a remittance file (see payments.py).
+def post_payments(args):
+    import payments
+    error_path = args.errors or f"{args.path}.rejected"
+    posted, skipped, rejected, elapsed = payments.post_payments(args.path, error_path, args.format)
+    return print_result(True, posted=posted, skipped=skipped, rejected=rejected, errors=error_path, seconds=round(elapsed, 3))
+
+
+# Command used to run the monthly billing for every customer (see billing.py).
+def billing_run(args):
+    import billing
+    if args.in_memory and not args.snapshot:
+        return print_result(False, error="--in-memory needs --snapshot")
+    if args.snapshot and args.save:
+        return print_result(False, error="bills can't be saved from a snapshot, only to the live database")
+    if args.snapshot:
+        database.use_snapshot(args.snapshot, args.in_memory)
+    output_path = args.output or (None if args.save else f"statements_{args.month}.csv")
+    bill_count, elapsed = billing.run_billing(args.month, output_path, args.save)
+    return print_result(True, month=args.month, bills=bill_count, output=output_path, saved=args.save, seconds=round(elapsed, 3))
+
+
+# Command used to export a table or view to a CSV or JSONL file (see export.py).
+def export_table(args):
+    import export
+    if args.in_memory and not args.snapshot:
+        return print_result(False, error="--in-memory needs --snapshot")
+    if args.snapshot:
+        database.use_snapshot(args.snapshot, args.in_memory)
+    output_path = args.output or f"export_{args.table}.{args.format}"
+    row_count, elapsed = export.export(args.table, output_path, args.format, args.mask_cards, args.iso_dates)
+    return print_result(True, table=args.table, rows=row_count, output=output_path, seconds=round(elapsed, 3))
+
+
+# Command used to print the monthly recurring revenue of every product, product type or location (see revenue.py).
+def revenue_report(args):
+    for key, assignments, mrr_cents in database.view_revenue(args.by)[:args.limit]:
+        print(json.dumps({"group": args.by, "value": key, "assignments": assignments, "mrr": round(mrr_cents / 100, 2)}))
+    return 0
+
+
+# Command used to check the revenue rollups against a recompute from every assignment.
+def verify_revenue(args):
+    differences = database.verify_revenue_rollups()
+    if differences and args.repair:
+        database.rebuild_revenue_rollups()
+    return print_result(not differences, differences=len(differences), repaired=bool(differences and args.repair))
+
+
+# Command used to write every customer's invoice for a billing month with a pool of worker processes (see invoices.py).
+def generate_invoices(args):
+    import invoices
+    output_dir = args.output_dir or f"invoices_{args.month}"
+    try:
+        invoice_count, written, skipped, elapsed = invoices.generate_invoices(
+            args.month, output_dir, args.workers, args.partition_size)
+    except ValueError as error:
+        return print_result(False, error=str(error))
+    return print_result(True, month=args.month, invoices=invoice_count, partitions=written, skipped=skipped,
+                        output=output_dir, seconds=round(elapsed, 3))
+
+
+# Command used to copy the live database to a snapshot for reporting (see snapshot.py).
+def take_snapshot(args):
+    import snapshot
+    snapshot_path = args.output or snapshot.DEFAULT_SNAPSHOT_PATH.format(time=datetime.now())
+    elapsed = snapshot.take_snapshot(snapshot_path, args.pages)
+    return print_result(True, snapshot=snapshot_path, seconds=round(elapsed, 3))
+
+
+# Command used to find customers from part of their name, location or phone number, best match first.
+def search(args):
+    return print_customers(database.search_customers(args.text, args.limit))
+
+
+# Command used to count the customers in each payment aging bucket (0, 30, 60 and 90+ days since their last payment).
+def aging(args):
+    summary = database.payment_aging_summary()
+    print(json.dumps({str(bucket): count for bucket, count in summary.items()}))
+    return 0
+
+
+# Command used to move customers into their next payment aging bucket as time passes (for running from cron).
+def sweep_aging(args):
+    return print_result(True, moved=database.sweep_payment_aging())
+
+
+# Function used to read every entry of a filtered listing one page at a time, for filters that only have a paged
+# query.
+def iterate_pages(view_page, page_size=1000):
+    after_id = 0
+    while True:
+        rows, has_next_page = view_page(after_id, page_size)
+        yield from rows
+        if not has_next_page:
+            break
+        after_id = rows[-1][0]
+
+# ARGUMENT PARSER 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to add the --limit and --after-id arguments to a listing command.
+def add_paging_arguments(parser):
+    parser.add_argument("--limit", type=positive_int_argument, help="only print this many entries (one page)")
+    parser.add_argument("--after-id", type=int, default=0, help="start the page after this id (from next_after_id)")
+
+
+# Function used to add the arguments that let a report read a snapshot instead of the live database.
+def add_snapshot_arguments(parser):
+    parser.add_argument("--snapshot", help="snapshot (see snapshot.py) read instead of the live database")
+    parser.add_argument("--in-memory", action="store_true", help="load the snapshot into memory first")
+
+
+# Function used to build the argument parser with a subcommand for every menu option.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Data Plus Fiber's customer tracking system (command mode).")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    parser.add_argument("--shards", help="shard directory made by shards.py (default: $CUSTOMER_DB_SHARD_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    command = commands.add_parser("add-customer", help="1. Add a customer")
+    command.add_argument("--name", required=True)
+    command.add_argument("--phone", required=True, type=phone_argument, help="XXX-XXX-XXXX")
+    command.add_argument("--location", required=True)
+    command.add_argument("--card", required=True, type=card_argument, help="card number with no dashes")
+    command.add_argument("--sign-up", required=True, type=date_argument, help="mm-dd-YYYY")
+    command.add_argument("--last-payment", required=True, type=date_argument, help="mm-dd-YYYY")
+    command.set_defaults(handler=add_customer)
+
+    command = commands.add_parser("remove-customer", help="2. Remove a customer")
+    command.add_argument("--id", required=True, type=int)
+    command.add_argument("--name", required=True)
+    command.set_defaults(handler=remove_customer)
+
+    command = commands.add_parser("customers", help="3. View customer(s)")
+    command.add_argument("--location", help="only customers at this location")
+    add_paging_arguments(command)
+    command.set_defaults(handler=customers)
+
+    command = commands.add_parser("late-customers", help="4. View customers who currently have late payments")
+    command.add_argument("--bucket", type=int, default=30, choices=[30, 60, 90], help="only customers at least this many days late")
+    command.set_defaults(handler=late_customers)
+
+    command = commands.add_parser("update-payment", help="5. Update a customer's last payment made")
+    command.add_argument("--id", required=True, type=int)
+    command.add_argument("--date", required=True, type=date_argument, help="mm-dd-YYYY")
+    command.set_defaults(handler=update_payment)
+
+    command = commands.add_parser("add-product", help="6. Add a product")
+    command.add_argument("--name", required=True)
+    command.add_argument("--type", required=True, type=str.lower, choices=["equipment", "service"])
+    command.add_argument("--price", type=price_argument, help="monthly fee (services only)")
+    command.set_defaults(handler=add_product)
+
+    command = commands.add_parser("remove-product", help="7. Remove a product")
+    command.add_argument("--id", required=True, type=int)
+    command.add_argument("--name", required=True)
+    command.set_defaults(handler=remove_product)
+
+    command = commands.add_parser("products", help="8. View product(s)")
+    command.add_argument("--type", type=str.lower, choices=["equipment", "service"], help="only products of this type")
+    add_paging_arguments(command)
+    command.set_defaults(handler=products)
+
+    command = commands.add_parser("update-price", help="9. Edit the price of a product")
+    command.add_argument("--id", required=True, type=int)
+    command.add_argument("--price", required=True, type=price_argument)
+    command.set_defaults(handler=update_price)
+
+    command = commands.add_parser("assign", help="10. Assign a product to a customer")
+    command.add_argument("--customer", required=True)
+    command.add_argument("--location", required=True)
+    command.add_argument("--product", required=True)
+    command.add_argument("--price", required=True, type=price_argument)
+    command.set_defaults(handler=assign)
+
+    command = commands.add_parser("unassign", help="11. Unassign a product from a customer")
+    command.add_argument("--id", required=True, type=int)
+    command.set_defaults(handler=unassign)
+
+    command = commands.add_parser("assignments", help="12. View product assignment(s)")
+    command.add_argument("--location", help="only assignments at this customer location")
+    add_paging_arguments(command)
+    command.set_defaults(handler=assignments)
+
+    command = commands.add_parser("bill", help="13. View a customer's monthly bill")
+    command.add_argument("--name", required=True)
+    command.set_defaults(handler=bill)
+
+    command = commands.add_parser("search", help="Find customers from part of their name, location or phone number")
+    command.add_argument("text", help='words to match as prefixes (e.g. "ben jo")')
+    command.add_argument("--limit", type=positive_int_argument, default=database.SEARCH_LIMIT, help="most customers to print")
+    command.set_defaults(handler=search)
+
+    command = commands.add_parser("aging", help="Count the customers in each payment aging bucket")
+    command.set_defaults(handler=aging)
+
+    command = commands.add_parser("sweep-aging", help="Move customers into their next payment aging bucket")
+    command.set_defaults(handler=sweep_aging)
+
+    command = commands.add_parser("import", help="Import customers from a CSV or JSONL file")
+    command.add_argument("path")
+    command.add_argument("--errors", help="file rejected rows are written to (default: <path>.rejected)")
+    command.add_argument("--format", choices=["csv", "jsonl"])
+    command.add_argument("--chunk-size", type=positive_int_argument,
+                         help="customers inserted per transaction (default: the same as bulk_import.py)")
+    command.set_defaults(handler=import_customers)
+
+    command = commands.add_parser("post-payments", help="Post the payments in a remittance file")
+    command.add_argument("path")
+    command.add_argument("--errors", help="file unmatched and invalid rows are written to (default: <path>.rejected)")
+    command.add_argument("--format", choices=["csv", "jsonl"])
+    command.set_defaults(handler=post_payments)
+
+    command = commands.add_parser("billing-run", help="Produce every customer's monthly bill")
+    command.add_argument("--month", default=datetime.now().strftime("%Y-%m"), help="YYYY-MM (default: this month)")
+    command.add_argument("--output", help="CSV statement file the bills are written to")
+    command.add_argument("--save", action="store_true", help="save the bills to the bills table")
+    add_snapshot_arguments(command)
+    command.set_defaults(handler=billing_run)
+
+    command = commands.add_parser("export", help="Export a table or view to a CSV or JSONL file")
+    command.add_argument("table", choices=EXPORT_TABLES)
+    command.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    command.add_argument("--output", help="file the rows are written to (default: export_<table>.<format>)")
+    command.add_argument("--mask-cards", action="store_true", help="only show the last 4 digits of card numbers")
+    command.add_argument("--iso-dates", action="store_true", help="write dates as YYYY-MM-DD instead of timestamps")
+    add_snapshot_arguments(command)
+    command.set_defaults(handler=export_table)
+
+    command = commands.add_parser("invoices", help="Write every customer's invoice with a pool of worker processes")
+    command.add_argument("--month", default=datetime.now().strftime("%Y-%m"), help="YYYY-MM (default: this month)")
+    command.add_argument("--output-dir", help="directory the invoice files are written to (default: invoices_<month>)")
+    command.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    command.add_argument("--partition-size", type=int, default=database.INVOICE_PARTITION_SIZE, help="customers per partition")
+    command.set_defaults(handler=generate_invoices)
+
+    command = commands.add_parser("revenue", help="Monthly recurring revenue by product, product type or location")
+    command.add_argument("--by", choices=list(queries.REVENUE_ROLLUPS), default="product-type")
+    command.add_argument("--limit", type=positive_int_argument, help="most groups printed, highest revenue first")
+    command.set_defaults(handler=revenue_report)
+
+    command = commands.add_parser("verify-revenue", help="Check the revenue rollups against the assignments")
+    command.add_argument("--repair", action="store_true", help="rebuild the rollups if they differ")
+    command.set_defaults(handler=verify_revenue)
+
+    command = commands.add_parser("snapshot", help="Copy the live database to a snapshot for reporting")
+    command.add_argument("output", nargs="?", help="snapshot file (default: snapshot_<date>_<time>.db)")
+    command.add_argument("--pages", type=int, default=database.SNAPSHOT_PAGES, help="pages copied per step")
+    command.set_defaults(handler=take_snapshot)
+
+    return parser
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+# Function used to run one command. Returns the command's exit code.
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.database:
+        database.use_database(args.database)
+    if args.shards:
+        database.use_shards(args.shards)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
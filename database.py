@@ -1,209 +1,1261 @@
-
-# NOTE: This file contains all functions that interact directly with the SQLite queries. Consider this file as the
-# "bridge" between the python and the SQL.
-
-import sqlite3
-from datetime import datetime, timedelta
-import queries
-
-#-----------------------------------------------------------------------------------------------------------------#
-
-connection = sqlite3.connect("customer_data.db")
-connection.execute("PRAGMA foreign_keys = ON")
-
-# MAIN FUNCTIONS 👇 ---------------------------------------------------------------------------------------------#
-
-# Function used to create tables if they do not already exist
-def create_tables():
-    with connection:
-        connection.execute(queries.CREATE_CUSTOMERS_TABLE)
-        connection.execute(queries.CREATE_PRODUCTS_TABLE)
-        connection.execute(queries.CREATE_CUSTOMER_PRODUCTS_TABLE)
-
-
-# Function used for 👇
-# 1. Add a customer
-def add_new_customer(name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp):
-    with connection:
-        connection.execute(queries.INSERT_CUSTOMER, (name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp))
-
-
-# Functions used for 👇
-# 2. Remove a customer
-def remove_customer(id, customer_name):
-    with connection:
-        connection.execute(queries.REMOVE_CUSTOMER, (id, customer_name))
-def view_customer_info(name):
-    cursor = connection.cursor()
-    cursor.execute(queries.VIEW_CUSTOMER_INFO, (name, ))
-    return cursor
-    
-
-# Function used for 👇
-# 3. View customer(s)
-def view_customers():
-    cursor = connection.cursor()
-    cursor.execute(queries.VIEW_ALL_CUSTOMERS)
-    return cursor
-
-
-# Function used for 👇
-# 4. View customers who currently have late payments
-def view_late_customers():
-    late_payment_threshold = (datetime.now() - timedelta(days=30)).timestamp()
-    cursor = connection.cursor()
-    cursor.execute(queries.VIEW_LATE_CUSTOMERS, (late_payment_threshold, ))
-    return cursor
-
-
-# Function used for 👇
-# 5. Update a customer's last payment made
-def update_last_payment(last_payment_timestamp, entry_to_update):
-    with connection:
-        connection.execute(queries.UPDATE_LAST_PAYMENT, (last_payment_timestamp, entry_to_update))
-# NOTE: view_customer_info() is also used for option # 5.
-
-
-# Function used for 👇
-# 6. Add a product
-def add_new_product(product, type, price):
-    with connection:
-        connection.execute(queries.INSERT_PRODUCT, (product, type, price))
-
-
-# Functions used for 👇
-# 7. Remove a product
-def remove_product(id, product):
-    with connection:
-        connection.execute(queries.REMOVE_PRODUCT, (id, product))
-def view_product_info(product):
-    cursor = connection.cursor()
-    cursor.execute(queries.VIEW_PRODUCT_INFO, (product, ))
-    return cursor
-
-
-# Function used for 👇
-# 8. View product(s)
-def view_products():
-    cursor = connection.cursor()
-    cursor.execute(queries.VIEW_ALL_PRODUCTS)
-    return cursor
-
-
-# Function used for 👇
-# 9. Edit the price of a product
-def update_price(price, entry_to_update):
-    with connection:
-        connection.execute(queries.UPDATE_PRICE, (price, entry_to_update))
-# NOTE: view_product_info() is also used for option # 5.
-
-
-# Function used for 👇
-# 10. View a customer's monthly bill
-def assign_product_to_customer(customer_name, customer_location, product_to_assign, price_to_assign):
-    with connection:
-        connection.execute(queries.ASSIGN_PRODUCT_TO_CUSTOMER, (customer_name, customer_location, product_to_assign, price_to_assign))
-
-
-# Function used for 👇
-# 11. Remove a product from a customer
-def remove_assignment(id):
-    with connection:
-        connection.execute(queries.REMOVE_ASSIGNMENT, (id, ))
-
-
-# Function used for 👇
-# 12. View product assignment(s)
-def view_assignments():
-    cursor = connection.cursor()
-    cursor.execute(queries.VIEW_ALL_ASSIGNMENTS)
-    return cursor
-
-
-# Function used for 👇
-# 13. View a customer's monthly bill
-def view_monthly_bill(name):
-    cursor = connection.cursor()
-    cursor.execute(queries.CUSTOMER_TOTAL_BILL, (name, ))
-    return cursor
-
-# CHECK FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
-
-# Function used to check if a specified customer and location combination exists in the database
-def customer_at_location_check(name, location):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_CUSTOMER_EXISTS_AT_LOCATION, (name, location))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
-
-
-# Function used to check if a specified product and price combination exists in the database.
-def product_and_price_check(product, price):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_PRODUCT_AND_PRICE_EXISTS, (product, price))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
-
-
-# Function used to check if a specified customer ID exists in the customers table
-def id_check_customers(id, name):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_CUSTOMER_ID, (id, name))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
-
-
-# Function used to check if a specified product ID exists in the products table
-def id_check_products(id, product):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_PRODUCT_ID, (id, product))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
-    
-
-# Function used to check if a specified product assignment ID exists in the customer_products table
-def id_check_customer_products(id):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_ASSIGNMENT_ID, (id, ))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
-    
-
-# Function used to check if a specified customer name exists in the customers table
-def customer_check(name):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_CUSTOMER_EXISTS, (name, ))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
-
-
-# Function used to check if a specified product name exists in the products table
-def product_check(product):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_PRODUCT_EXISTS, (product, ))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
-
-
-# Function used to check if a customer has any product assigned to them
-def customer_assignment_check(name):
-    cursor = connection.cursor()
-    cursor.execute(queries.CHECK_CUSTOMER_ASSIGNMENT_EXISTS, (name, ))
-    if len(cursor.fetchall()) == 0:
-        return False
-    else:
-        return True
+
+# NOTE: This file contains all functions that interact directly with the SQLite queries. Consider this file as the
+# "bridge" between the python and the SQL.
+
+import heapq
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import urllib.parse
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from itertools import chain, islice, zip_longest
+import queries
+import migrations
+import instrumentation
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+# NOTE: The database file can be changed with the CUSTOMER_DB_PATH environment variable or use_database() (main.py and
+# cli.py set it from their --database argument).
+DATABASE_PATH = os.environ.get("CUSTOMER_DB_PATH", "customer_data.db")
+
+# How long (in milliseconds) a connection waits on another connection's write lock before giving up.
+BUSY_TIMEOUT = 5000
+
+# The durability profiles a connection can be opened with: the journal mode and the synchronous level (how often
+# SQLite waits for the disk). "full" waits for the disk on every commit, so a committed change survives a power cut.
+# "normal" only waits at WAL checkpoints, so a power cut can lose the last few commits but never corrupts the file (an
+# application crash loses nothing). "off" never waits and is only meant for throwaway files such as benchmarks.
+DURABILITY_PROFILES = {
+    "full": ("WAL", "FULL"),
+    "normal": ("WAL", "NORMAL"),
+    "off": ("WAL", "OFF"),
+}
+
+# NOTE: The durability profile can be changed with the CUSTOMER_DB_DURABILITY environment variable or use_durability().
+DURABILITY = os.environ.get("CUSTOMER_DB_DURABILITY", "full")
+
+# NOTE: In read-only mode (see use_read_only()), connections are opened read-only and can't change the database. Used
+# by worker processes that only read, such as the invoice workers in invoices.py.
+READ_ONLY = False
+
+# NOTE: Each thread gets its own connection to the database (one per file in sharded mode), opened the first time that
+# thread calls a function in this file. A sqlite3 connection can't be shared between threads, and with the database in
+# WAL journal mode the connections of different threads can read in parallel (and alongside a writer) instead of
+# queueing on one handle.
+thread_connections = threading.local()
+
+# NOTE: In sharded mode, customers and their product assignments are split across one database file per region in
+# this directory instead of all living in DATABASE_PATH. It is turned on with the CUSTOMER_DB_SHARD_DIR environment
+# variable or use_shards() (see the SHARD FUNCTIONS below), and an existing file is split with shards.py.
+SHARD_DIRECTORY = os.environ.get("CUSTOMER_DB_SHARD_DIR") or None
+
+# The shards, in id order. A customer's shard is the region of the state at the end of their location (such as
+# "Gainesville, FL"), and locations without a known state go to the first shard.
+SHARDS = ["other", "northeast", "midwest", "south", "west"]
+
+SHARD_REGIONS = {
+    "northeast": ["CT", "MA", "ME", "NH", "NJ", "NY", "PA", "RI", "VT"],
+    "midwest": ["IA", "IL", "IN", "KS", "MI", "MN", "MO", "ND", "NE", "OH", "SD", "WI"],
+    "south": ["AL", "AR", "DC", "DE", "FL", "GA", "KY", "LA", "MD", "MS", "NC", "OK", "SC", "TN", "TX", "VA", "WV"],
+    "west": ["AK", "AZ", "CA", "CO", "HI", "ID", "MT", "NM", "NV", "OR", "UT", "WA", "WY"],
+}
+
+STATE_SHARDS = {state: SHARDS.index(region) for region, states in SHARD_REGIONS.items() for state in states}
+
+# NOTE: Each shard hands out customer and product assignment ids from its own range (shard 0 from 1, shard 1 from
+# SHARD_ID_RANGE + 1, and so on), so an id alone says which shard it is in.
+SHARD_ID_RANGE = 10 ** 12
+
+# The shard the products table is kept in. Every other shard keeps a copy of it (see sync_products()).
+PRODUCT_SHARD = 0
+
+# Rows read from a shard at a time, and the most of those chunks waiting to be read, when every shard's rows are
+# streamed back together (see fan_out_rows()).
+STREAM_CHUNK_SIZE = 1000
+STREAM_CHUNKS = 4
+
+# The worker threads that run a function on every shard at once. Created by the first fan out.
+shard_executor = None
+shard_executor_lock = threading.Lock()
+
+# Pages copied per step when a snapshot is taken. Between steps the live database is free for other connections, and
+# the progress of the copy is reported.
+SNAPSHOT_PAGES = 1024
+
+# Number of customers in each partition of an invoice run (see invoices.py). Each partition is one task for a worker
+# and one invoice file, so smaller partitions spread the work more evenly and lose less when a run is stopped, at the
+# cost of more files.
+INVOICE_PARTITION_SIZE = 5000
+
+# Number of rows shown per page by the paged listings.
+PAGE_SIZE = 20
+
+# Most customers returned by a customer search, and the most matches ranked to pick them from.
+SEARCH_LIMIT = 10
+SEARCH_CANDIDATES = 200
+
+# The payment aging buckets, in days since a customer's last payment. Customers in the 30 day bucket or later are late.
+AGING_BUCKETS = (0, 30, 60, 90)
+
+# URI of the in-memory copy of a snapshot (see use_snapshot()). Shared cache lets every thread's connection open the
+# same copy, and it is kept until the last connection to it is closed.
+MEMORY_COPY_URI = "file:snapshot_copy?mode=memory&cache=shared"
+
+# Connection that keeps the in-memory copy of a snapshot open while it is being used.
+memory_copy_connection = None
+
+# Database files this process has already brought up to the newest schema version, so only the first connection to
+# each file checks the stored schema version.
+migrated_paths = set()
+migration_lock = threading.Lock()
+
+# Most product catalog reads kept in the product cache before the least recently used one is dropped.
+PRODUCT_CACHE_SIZE = 256
+
+# NOTE: The product catalog is small and rarely changes, but the product prompts and checks read it over and over
+# (option 10 lists every product each time its loop runs), so those reads are kept in memory, keyed by the database
+# file, the function and its arguments. Every function in this file that changes the products table clears the cache.
+# Changes made to the file by another process aren't seen until clear_product_cache() is called.
+product_cache = OrderedDict()
+product_cache_lock = threading.Lock()
+product_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+# Number of times the product cache has been cleared, so a read that was running while the products changed doesn't
+# put its out of date result into the cache.
+product_cache_generation = 0
+
+# CONNECTION FUNCTIONS 👇 ---------------------------------------------------------------------------------------#
+
+# Function used to open a new connection to a database file (or shard) with the settings every connection needs.
+def open_connection(path, shard=None):
+    # NOTE: Connections are opened as InstrumentedConnections, which time every query when instrumentation is turned on
+    # (see instrumentation.py) and behave like plain connections when it isn't.
+    # NOTE: uri=True lets the in-memory copy of a snapshot be opened by its URI (see use_snapshot()). Plain file paths
+    # open the same way as before.
+    if READ_ONLY:
+        return open_read_only_connection(path)
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT / 1000, factory=instrumentation.InstrumentedConnection, uri=True)
+    journal_mode, synchronous = DURABILITY_PROFILES[DURABILITY]
+    connection.execute(f"PRAGMA journal_mode = {journal_mode}")
+    connection.execute(f"PRAGMA synchronous = {synchronous}")
+    connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT}")
+    connection.execute("PRAGMA foreign_keys = ON")
+
+    # NOTE: The schema is checked when the first connection to a file is opened rather than when the application
+    # starts, so commands that never touch the database (like printing the menu or --help) never open the file.
+    if path not in migrated_paths:
+        with migration_lock:
+            if path not in migrated_paths:
+                apply_migrations(connection)
+                if shard:
+                    start_shard_ids(connection, shard)
+                migrated_paths.add(path)
+    return connection
+
+
+# Function used to open a read-only connection to a database file (see use_read_only()).
+# NOTE: The file is opened with mode=ro, so SQLite itself refuses every write, and query_only makes the refusal an
+# error straight away. The journal mode and schema are left as they are, since changing them is a write. The file has
+# to have been brought up to the newest schema version by a read-write connection first.
+def open_read_only_connection(path):
+    uri = f"file:{urllib.parse.quote(os.path.abspath(path))}?mode=ro"
+    connection = sqlite3.connect(uri, timeout=BUSY_TIMEOUT / 1000, factory=instrumentation.InstrumentedConnection, uri=True)
+    connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT}")
+    connection.execute("PRAGMA query_only = ON")
+    return connection
+
+
+# Function used to get the path of the database file the calling thread is using: DATABASE_PATH, or the shard it is
+# running on in sharded mode.
+def current_path():
+    shard = getattr(thread_connections, "shard", None)
+    return DATABASE_PATH if shard is None else shard_path(shard)
+
+
+# Function used to get the calling thread's connection to the database, opening it if the thread doesn't have one yet.
+def get_connection():
+    path = current_path()
+    connections = getattr(thread_connections, "connections", None)
+    if connections is None:
+        connections = thread_connections.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        connection = connections[path] = open_connection(path, getattr(thread_connections, "shard", None))
+    return connection
+
+
+# Function used to close the calling thread's connections to the database (worker threads call this before they exit).
+def close_connection():
+    connections = getattr(thread_connections, "connections", None)
+    if connections:
+        for connection in connections.values():
+            connection.close()
+        connections.clear()
+
+
+# Function used to switch the calling thread to a different database file. The file is created and migrated when it
+# is first used.
+def use_database(path):
+    global DATABASE_PATH
+    close_connection()
+    DATABASE_PATH = path
+
+
+# Function used to switch to read-only mode, where every connection is opened read-only (see
+# open_read_only_connection()).
+def use_read_only():
+    global READ_ONLY
+    close_connection()
+    READ_ONLY = True
+
+
+# Function used to switch to a different durability profile (see DURABILITY_PROFILES). The calling thread's connection
+# is reopened with the new profile on its next use, and other threads' connections pick it up when they are next opened.
+def use_durability(profile):
+    global DURABILITY
+    if profile not in DURABILITY_PROFILES:
+        raise ValueError(f"unknown durability profile {profile!r} (choose from {', '.join(DURABILITY_PROFILES)})")
+    close_connection()
+    DURABILITY = profile
+
+# TRANSACTION FUNCTIONS 👇 --------------------------------------------------------------------------------------#
+
+# Function used to group database changes into one transaction (a unit of work), so they are committed together with
+# one commit instead of one commit (and one wait for the disk) each.
+#   with database.unit_of_work():
+#       database.update_last_payment(...)
+#       database.assign_product_to_customer(...)
+# Everything in the block is committed when it finishes, or rolled back if it raises an exception. A unit of work
+# opened inside another one is a savepoint: if it raises, only its own changes are rolled back, and the outer unit of
+# work can catch the exception and carry on. Every write function in this file runs in its own unit of work, so on its
+# own it commits straight away, and inside a caller's unit of work it is a savepoint that commits with the rest.
+# NOTE: The outermost unit of work starts with BEGIN IMMEDIATE, which takes the write lock straight away. A transaction
+# that starts out reading and later writes can fail with "database is locked" instead of waiting for another writer.
+# NOTE: In sharded mode, a unit of work opened outside this file yields None and only starts a transaction on a shard
+# when the first write in it reaches that shard (see join_shard_units()), so a unit of work for one customer only
+# takes that customer's shard's write lock. The writes are grouped into one commit per shard. Each shard commits on its
+# own, so the unit of work is only atomic within a shard: if one shard fails to commit, the shards committed before it
+# keep their changes. Two units of work that reach the same shards in a different order can fail with "database is
+# locked" after BUSY_TIMEOUT instead of waiting on each other for good.
+@contextmanager
+def unit_of_work():
+    if not routing():
+        connection = get_connection()
+        join_shard_units(connection)
+        with transaction(connection) as connection:
+            yield connection
+        return
+
+    shard_units = getattr(thread_connections, "shard_units", None)
+    if shard_units is None:
+        shard_units = thread_connections.shard_units = []
+    with ExitStack() as stack:
+        shard_units.append(stack)
+        try:
+            yield None
+        finally:
+            shard_units.pop()
+
+
+# Function used to bring a shard's connection into the calling thread's sharded units of work (see unit_of_work()) the
+# first time one of them reaches it. Each open sharded unit of work that hasn't reached the shard yet starts its
+# transaction (or, for a nested one, its savepoint) there, and commits or rolls it back when it ends.
+def join_shard_units(connection):
+    shard_units = getattr(thread_connections, "shard_units", None)
+    if not shard_units or getattr(thread_connections, "shard", None) is None:
+        return
+    for stack in shard_units[getattr(connection, "unit_depth", 0):]:
+        stack.enter_context(transaction(connection))
+
+
+# Function used to run a unit of work on one connection (see unit_of_work()).
+@contextmanager
+def transaction(connection):
+    depth = getattr(connection, "unit_depth", 0)
+    savepoint = f"unit_of_work_{depth}"
+    connection.execute(f"SAVEPOINT {savepoint}" if depth else "BEGIN IMMEDIATE")
+    connection.unit_depth = depth + 1
+
+    try:
+        yield connection
+    except BaseException:
+        if depth:
+            connection.execute(f"ROLLBACK TO {savepoint}")
+            connection.execute(f"RELEASE {savepoint}")
+        else:
+            connection.rollback()
+        raise
+    else:
+        if depth:
+            connection.execute(f"RELEASE {savepoint}")
+        else:
+            connection.commit()
+    finally:
+        connection.unit_depth = depth
+
+        # The product cache is cleared again once the changes are committed (or rolled back), so nothing read while
+        # they were uncommitted stays cached.
+        if depth == 0 and getattr(thread_connections, "products_changed", False):
+            thread_connections.products_changed = False
+            clear_product_cache()
+
+
+# Function used to check if the calling thread is inside a unit of work (a sharded one, or one on any of its
+# connections).
+def in_unit_of_work():
+    if getattr(thread_connections, "shard_units", None):
+        return True
+    connections = getattr(thread_connections, "connections", None) or {}
+    return any(getattr(connection, "unit_depth", 0) for connection in connections.values())
+
+# MAIN FUNCTIONS 👇 ---------------------------------------------------------------------------------------------#
+
+# Function used to create the tables and bring an existing database file up to the newest schema version.
+# NOTE: The first connection to a file does this on its own (see open_connection()), so this only needs to be called
+# to check a file that may have been replaced or upgraded since it was opened.
+def migrate_database():
+    if routing():
+        return fan_out(migrate_database)
+    apply_migrations(get_connection())
+
+
+# Function used to apply every migration newer than the version stored in the database file, in order and each inside
+# its own transaction, so a migration that fails leaves the file at the last version that fully applied and no data is
+# lost. A file already at the newest version is left untouched.
+def apply_migrations(connection):
+    current_version = connection.execute(queries.GET_SCHEMA_VERSION).fetchone()[0]
+    if current_version >= migrations.SCHEMA_VERSION:
+        return
+
+    for version, migration in enumerate(migrations.MIGRATIONS[current_version:], start=current_version + 1):
+        with connection:
+            # NOTE: sqlite3 doesn't open a transaction on its own before CREATE statements, so one is opened here.
+            connection.execute("BEGIN")
+            for statement in migration:
+                connection.execute(statement)
+            connection.execute(queries.SET_SCHEMA_VERSION.format(version=version))
+
+
+# Function used for 👇
+# 1. Add a customer
+# Returns the new customer's id, or None if the customer is already present at the location.
+def add_new_customer(name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp):
+    if routing():
+        return on_shard(location_shard(location), add_new_customer, name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp)
+    with unit_of_work() as connection:
+        return insert_returning_id(connection, queries.INSERT_CUSTOMER, (name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp))
+
+
+# Function used to add many customers at once (bulk customer import).
+# NOTE: All of the customers are inserted with a single executemany inside one transaction. Customers already present
+# at their location are skipped. Returns the number of customers added.
+def add_new_customers(customers):
+    if routing():
+        return sum(fan_out_groups(add_new_customers, customers, lambda customer: location_shard(customer[2])))
+    with unit_of_work() as connection:
+        return connection.executemany(queries.INSERT_CUSTOMERS, customers).rowcount
+
+
+# Functions used for 👇
+# 2. Remove a customer
+# Returns True if the customer entry was removed, or False if no entry with that id belongs to the customer.
+def remove_customer(id, customer_name):
+    if routing():
+        return on_shard(id_shard(id), remove_customer, id, customer_name)
+    with unit_of_work() as connection:
+        return connection.execute(queries.REMOVE_CUSTOMER, (id, customer_name)).rowcount == 1
+def view_customer_info(name):
+    if routing():
+        return MergedRows(chain.from_iterable(fan_out(fetch_all, view_customer_info, name)))
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.VIEW_CUSTOMER_INFO, (name, ))
+    return cursor
+    
+
+# Function used for 👇
+# 3. View customer(s)
+def view_customers():
+    if routing():
+        return stream_shards(view_customers)
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.VIEW_ALL_CUSTOMERS)
+    return cursor
+
+
+# Function used for 👇
+# 3. View customer(s) (one page at a time)
+# Returns the page of customers after the given id, optionally only those at a location, and whether there are more
+# customers after this page.
+def view_customers_page(after_id=0, location=None, page_size=PAGE_SIZE):
+    if routing():
+        if location:
+            return on_shard(location_shard(location), view_customers_page, after_id, location, page_size)
+        return fan_out_page(view_customers_page, after_id, page_size)
+    if location:
+        return fetch_page(queries.VIEW_CUSTOMERS_AT_LOCATION_PAGE, (location, ), after_id, page_size)
+    return fetch_page(queries.VIEW_CUSTOMERS_PAGE, (), after_id, page_size)
+
+
+# Function used for 👇
+# 4. View customers who currently have late payments
+# Returns the customers in the given aging bucket or later (by default every late customer), latest bucket first.
+# NOTE: In sharded mode, each shard's late customers are already sorted latest bucket first, so they are merged into
+# one list as they are read instead of being gathered and sorted again.
+def view_late_customers(min_bucket=30):
+    sweep_payment_aging()
+    return read_late_customers(min_bucket)
+
+
+# Function used to get the late customers like view_late_customers() without running the payment aging sweep first,
+# for callers that have already run it (see adatabase.py).
+# NOTE: In sharded mode, the shards are read by reader threads, so the sweep must already have run on every shard from
+# the calling thread; a reader thread never has to take a shard's write lock.
+def read_late_customers(min_bucket=30):
+    if routing():
+        streams, stop = fan_out_rows(view_late_customer_buckets, min_bucket)
+        merged = heapq.merge(*streams, key=lambda row: -row[-1])
+        return MergedRows((row[:-1] for row in merged), stop)
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.VIEW_LATE_CUSTOMERS, (min_bucket, ))
+    return cursor
+
+
+# Function used for 👇
+# 5. Update a customer's last payment made
+# Returns True if the customer entry was updated, or False if there is no customer entry with that id.
+def update_last_payment(last_payment_timestamp, entry_to_update):
+    if routing():
+        return on_shard(id_shard(entry_to_update), update_last_payment, last_payment_timestamp, entry_to_update)
+    with unit_of_work() as connection:
+        return connection.execute(queries.UPDATE_LAST_PAYMENT, (last_payment_timestamp, entry_to_update)).rowcount == 1
+# NOTE: view_customer_info() is also used for option # 5.
+
+
+# Function used to post many payments at once (bulk payment posting from a remittance file).
+# NOTE: payments is a list of (last_payment_timestamp, customer_id) pairs, posted with a single executemany inside one
+# transaction. A payment older than the customer's last payment is skipped. Returns the number of customers updated.
+def post_payments(payments):
+    if routing():
+        return sum(fan_out_groups(post_payments, payments, lambda payment: id_shard(payment[1])))
+    with unit_of_work() as connection:
+        return connection.executemany(queries.POST_PAYMENT, payments).rowcount
+
+
+# Function used for 👇
+# 6. Add a product
+# Returns the new product's id, or None if the product is already present at that price.
+def add_new_product(product, type, price):
+    if routing():
+        return write_products(add_new_product, product, type, price)
+    with unit_of_work() as connection:
+        id = insert_returning_id(connection, queries.INSERT_PRODUCT, (product, type, price))
+    if id is not None:
+        clear_product_cache()
+    return id
+
+
+# Function used to add many products at once (synthetic data generator).
+# NOTE: Products already present at their price are skipped. Returns the number of products added.
+def add_new_products(products):
+    if routing():
+        return write_products(add_new_products, products)
+    with unit_of_work() as connection:
+        added = connection.executemany(queries.INSERT_PRODUCTS, products).rowcount
+    if added:
+        clear_product_cache()
+    return added
+
+
+# Functions used for 👇
+# 7. Remove a product
+# Returns True if the product entry was removed, or False if no entry with that id belongs to the product.
+def remove_product(id, product):
+    if routing():
+        return write_products(remove_product, id, product)
+    with unit_of_work() as connection:
+        removed = connection.execute(queries.REMOVE_PRODUCT, (id, product)).rowcount == 1
+    if removed:
+        clear_product_cache()
+    return removed
+
+
+# Returns a list of the product's entries (from the product cache when possible).
+def view_product_info(product):
+    return cached_product_read("view_product_info", queries.VIEW_PRODUCT_INFO, (product, ))
+
+
+# Function used for 👇
+# 8. View product(s)
+# Returns a list of every product (from the product cache when possible).
+def view_products():
+    return cached_product_read("view_products", queries.VIEW_ALL_PRODUCTS, ())
+
+
+# Function used for 👇
+# 8. View product(s) (one page at a time)
+# Returns the page of products after the given id, optionally only those of a product type, and whether there are
+# more products after this page.
+def view_products_page(after_id=0, product_type=None, page_size=PAGE_SIZE):
+    if routing():
+        return on_shard(PRODUCT_SHARD, view_products_page, after_id, product_type, page_size)
+    if product_type:
+        return fetch_page(queries.VIEW_PRODUCTS_OF_TYPE_PAGE, (product_type, ), after_id, page_size)
+    return fetch_page(queries.VIEW_PRODUCTS_PAGE, (), after_id, page_size)
+
+
+# Function used for 👇
+# 9. Edit the price of a product
+# Returns True if the product entry was updated, or False if there is no product entry with that id.
+def update_price(price, entry_to_update):
+    if routing():
+        return write_products(update_price, price, entry_to_update)
+    with unit_of_work() as connection:
+        updated = connection.execute(queries.UPDATE_PRICE, (price, entry_to_update)).rowcount == 1
+    if updated:
+        clear_product_cache()
+    return updated
+# NOTE: view_product_info() is also used for option # 5.
+
+
+# Function used for 👇
+# 10. Assign a product to a customer
+# Returns the new assignment's id, or None if the product is already assigned to the customer at the location.
+def assign_product_to_customer(customer_name, customer_location, product_to_assign, price_to_assign):
+    if routing():
+        return on_shard(location_shard(customer_location), assign_product_to_customer, customer_name, customer_location, product_to_assign, price_to_assign)
+    with unit_of_work() as connection:
+        return insert_returning_id(connection, queries.ASSIGN_PRODUCT_TO_CUSTOMER, (customer_name, customer_location, product_to_assign, price_to_assign))
+
+
+# Function used to assign many products to customers at once by their ids (synthetic data generator).
+# NOTE: Assignments that already exist are skipped. Returns the number of assignments added.
+def assign_products_by_id(customer_and_product_ids):
+    if routing():
+        return sum(fan_out_groups(assign_products_by_id, customer_and_product_ids, lambda ids: id_shard(ids[0])))
+    with unit_of_work() as connection:
+        return connection.executemany(queries.ASSIGN_PRODUCTS_BY_ID, customer_and_product_ids).rowcount
+
+
+# Function used for 👇
+# 11. Remove a product from a customer
+# Returns True if the product assignment was removed, or False if there is no assignment with that id.
+def remove_assignment(id):
+    if routing():
+        return on_shard(id_shard(id), remove_assignment, id)
+    with unit_of_work() as connection:
+        return connection.execute(queries.REMOVE_ASSIGNMENT, (id, )).rowcount == 1
+
+
+# Function used for 👇
+# 12. View product assignment(s)
+def view_assignments():
+    if routing():
+        return stream_shards(view_assignments)
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.VIEW_ALL_ASSIGNMENTS)
+    return cursor
+
+
+# Function used for 👇
+# 12. View product assignment(s) (one page at a time)
+# Returns the page of product assignments after the given id, optionally only those at a customer location, and
+# whether there are more assignments after this page.
+def view_assignments_page(after_id=0, location=None, page_size=PAGE_SIZE):
+    if routing():
+        if location:
+            return on_shard(location_shard(location), view_assignments_page, after_id, location, page_size)
+        return fan_out_page(view_assignments_page, after_id, page_size)
+    if location:
+        return fetch_page(queries.VIEW_ASSIGNMENTS_AT_LOCATION_PAGE, (location, ), after_id, page_size)
+    return fetch_page(queries.VIEW_ASSIGNMENTS_PAGE, (), after_id, page_size)
+
+
+# Function used for 👇
+# 13. View a customer's monthly bill
+# NOTE: In sharded mode, the customer's entries can be in more than one shard, so each shard's total is added up here.
+def view_monthly_bill(name):
+    if routing():
+        totals = [amount for amount in fan_out(view_monthly_bill_amount, name) if amount is not None]
+        return MergedRows([("%.2f" % sum(totals) if totals else None, )])
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.CUSTOMER_TOTAL_BILL, (name, ))
+    return cursor
+
+# INSERT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to run one of the INSERT queries, which return the new entry's id, or nothing if the entry was
+# already present. Returns the id or None.
+# NOTE: Every returned row is fetched so the statement has finished before its transaction is committed.
+def insert_returning_id(connection, query, parameters):
+    rows = connection.execute(query, parameters).fetchall()
+    return rows[0][0] if rows else None
+
+# PAGING FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to fetch one page of rows with a keyset paged query. One row more than the page size is fetched so it
+# is known whether another page follows without running a second query.
+def fetch_page(query, parameters, after_id, page_size):
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(query, (*parameters, after_id, page_size + 1))
+    rows = cursor.fetchall()
+    return rows[:page_size], len(rows) > page_size
+
+# BILLING FUNCTIONS 👇 ------------------------------------------------------------------------------------------#
+
+# Function used to get every customer's monthly bill (one row per customer location) for the monthly billing run.
+# NOTE: The cursor is returned unread so the caller can stream the bills out with fetchmany().
+def view_all_bills():
+    if routing():
+        return stream_shards(view_all_bills)
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.ALL_CUSTOMER_BILLS)
+    return cursor
+
+
+# Function used to save every customer's monthly bill for a billing month (YYYY-MM) to the bills table.
+# The bills are calculated and saved by SQLite in a single statement. Returns the number of bills saved.
+def save_bills(billing_month):
+    if routing():
+        return sum(fan_out(save_bills, billing_month))
+    with unit_of_work() as connection:
+        return connection.execute(queries.SAVE_CUSTOMER_BILLS, (billing_month, )).rowcount
+
+
+# Function used to get a customer's monthly bill as a number rather than formatted text (see view_monthly_bill()).
+def view_monthly_bill_amount(name):
+    return get_connection().execute(queries.CUSTOMER_BILL_AMOUNT, (name, )).fetchone()[0]
+
+# INVOICE FUNCTIONS 👇 ------------------------------------------------------------------------------------------#
+
+# Function used to split the customers into partitions of up to partition_size customers each, by id range, for the
+# invoice run (see invoices.py). Returns a list of each partition's first id and the id after its last.
+# NOTE: The partitions are cut from the customers' actual ids rather than even steps of the id range, so every
+# partition has the same number of customers however sparse the ids are. In sharded mode, no partition spans two
+# shards.
+def invoice_partitions(partition_size):
+    if routing():
+        return list(chain.from_iterable(fan_out(invoice_partitions, partition_size)))
+    connection = get_connection()
+    starts = [row[0] for row in connection.execute(queries.INVOICE_PARTITION_STARTS, (partition_size, ))]
+    if not starts:
+        return []
+    last_id = connection.execute(queries.LAST_CUSTOMER_ID).fetchone()[0]
+    return list(zip(starts, starts[1:] + [last_id + 1]))
+
+
+# Function used to get the invoice line items of the customers in an id range (from start_id up to but not including
+# end_id): each customer's id, name and location, the product, product type and price of one of their assignments, and
+# the customer's total. The rows are in customer id order, so each customer's line items are together.
+def view_invoice_lines(start_id, end_id):
+    if routing():
+        return on_shard(id_shard(start_id), view_invoice_lines, start_id, end_id)
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.INVOICE_LINE_ITEMS, (start_id, end_id))
+    return cursor
+
+# EXPORT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to get every product straight from the database for an export (see export.py).
+# NOTE: view_products() reads through the product cache and returns a list, so this returns an unread cursor instead
+# for the caller to stream out with fetchmany() like the other tables.
+def view_all_products():
+    if routing():
+        return on_shard(PRODUCT_SHARD, view_all_products)
+    connection = get_connection()
+    cursor = connection.cursor()
+    cursor.execute(queries.VIEW_ALL_PRODUCTS)
+    return cursor
+
+# SEARCH FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to find customers from part of their name, location or phone number, for the prompts that ask for a
+# customer's name (options 2, 5 and 13). Returns up to limit customers, best match first.
+# NOTE: Every word typed is matched as a prefix, so "ben jo" finds Ben Jones and "412-53" finds the phone number
+# 121-412-5342. Only letters and digits are kept, which also stops typed text from being read as FTS5 query syntax.
+def search_customers(text, limit=SEARCH_LIMIT):
+    if routing():
+        # Each shard's best matches are taken in turn, so every shard's best match comes before any shard's second.
+        rows = zip_longest(*fan_out(search_customers, text, limit))
+        return [row for ranked in rows for row in ranked if row is not None][:limit]
+    words = re.findall(r"\w+", text)
+    if not words:
+        return []
+    match = " ".join(f'"{word}"*' for word in words)
+    return get_connection().execute(queries.SEARCH_CUSTOMERS, (match, max(limit, SEARCH_CANDIDATES), limit)).fetchall()
+
+# AGING FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to move customers into their next payment aging bucket once enough time has passed since their last
+# payment. Returns the number of customers moved.
+# NOTE: New customers and payments are put in their bucket by triggers as they happen, so only the passing of time has
+# to be swept for. The index on next_change is checked first, so a sweep with nobody due doesn't take the write lock.
+def sweep_payment_aging(now=None):
+    now = datetime.now().timestamp() if now is None else now
+    if routing():
+        return sum(fan_out(sweep_payment_aging, now))
+    if not run_check(queries.CHECK_PAYMENT_AGING_DUE, (now, )):
+        return 0
+    with unit_of_work() as connection:
+        return connection.execute(queries.SWEEP_PAYMENT_AGING, (now, now)).rowcount
+
+
+# Function used to get the late customers like read_late_customers(), with each customer's aging bucket added as the
+# last column so the customers of every shard can be merged in bucket order. The shard must already have been swept.
+def view_late_customer_buckets(min_bucket):
+    return get_connection().execute(queries.VIEW_LATE_CUSTOMERS_WITH_BUCKET, (min_bucket, ))
+
+
+# Function used to count the customers in each payment aging bucket. Returns a dictionary of bucket to count.
+def payment_aging_summary():
+    sweep_payment_aging()
+    return read_payment_aging_summary()
+
+
+# Function used to count the customers in each payment aging bucket like payment_aging_summary() without running the
+# payment aging sweep first, for callers that have already run it (see adatabase.py).
+def read_payment_aging_summary():
+    counts = dict.fromkeys(AGING_BUCKETS, 0)
+    if routing():
+        for shard_counts in fan_out(read_payment_aging_summary):
+            for bucket, count in shard_counts.items():
+                counts[bucket] += count
+        return counts
+    counts.update(get_connection().execute(queries.PAYMENT_AGING_SUMMARY).fetchall())
+    return counts
+
+# REVENUE FUNCTIONS 👇 ------------------------------------------------------------------------------------------#
+
+# NOTE: The revenue rollup tables are kept up to date by triggers (see the REVENUE ROLLUP STATEMENTS in queries.py), so
+# these functions only read them. The groups are "product", "product-type" and "location".
+
+
+# Function used to get the monthly recurring revenue of every product, product type or customer location.
+# Returns a list of each group's value (the product id, product type or location), its number of assignments and its
+# monthly total in cents, highest revenue first.
+def view_revenue(group):
+    if routing():
+        totals = {}
+        for rows in fan_out(view_revenue, group):
+            for key, assignments, mrr_cents in rows:
+                total_assignments, total_cents = totals.get(key, (0, 0))
+                totals[key] = (total_assignments + assignments, total_cents + mrr_cents)
+        return sorted(((key, *total) for key, total in totals.items()), key=lambda row: -row[2])
+    return get_connection().execute(queries.VIEW_REVENUE_ROLLUP.format(**queries.REVENUE_ROLLUPS[group])).fetchall()
+
+
+# Function used to check the revenue rollup tables by recomputing them from every assignment. Returns a list of the
+# differences found: the group, the group's value, and its (assignments, cents) in the table and recomputed (None
+# where the group is missing).
+# NOTE: Both are read in one read transaction, so a change committed by another connection while the check runs
+# can't show up as a difference. Can't be called inside a unit of work.
+def verify_revenue_rollups():
+    if routing():
+        return list(chain.from_iterable(fan_out(verify_revenue_rollups)))
+
+    connection = get_connection()
+    differences = []
+    connection.execute("BEGIN")
+    try:
+        for group, rollup in queries.REVENUE_ROLLUPS.items():
+            stored = {key: tuple(totals) for key, *totals in connection.execute(queries.VIEW_REVENUE_ROLLUP.format(**rollup))}
+            recomputed = {key: tuple(totals) for key, *totals in connection.execute(queries.RECOMPUTE_REVENUE_ROLLUP.format(**rollup))}
+            for key in sorted(stored.keys() | recomputed.keys(), key=str):
+                if stored.get(key) != recomputed.get(key):
+                    differences.append((group, key, stored.get(key), recomputed.get(key)))
+    finally:
+        connection.commit()
+    return differences
+
+
+# Function used to rebuild the revenue rollup tables from every assignment, such as after verify_revenue_rollups()
+# found differences.
+def rebuild_revenue_rollups():
+    if routing():
+        fan_out(rebuild_revenue_rollups)
+        return
+    with unit_of_work() as connection:
+        for rollup in queries.REVENUE_ROLLUPS.values():
+            connection.execute(queries.CLEAR_REVENUE_ROLLUP.format(**rollup))
+            connection.execute(queries.REVENUE_ROLLUP_UPSERT.format(sign="", where="true", **rollup))
+
+# CACHE FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to run a query against the products table through the product cache. Returns the rows as a list.
+# NOTE: The rows are tuples and a new list is returned on every call, so a caller can't change what is cached.
+def cached_product_read(function_name, query, parameters):
+    if routing():
+        return on_shard(PRODUCT_SHARD, cached_product_read, function_name, query, parameters)
+
+    # NOTE: A thread that has changed the products in a unit of work that hasn't committed yet reads the products
+    # straight from its connection, so it sees its own changes and other threads are never served them from the cache.
+    if getattr(thread_connections, "products_changed", False):
+        return get_connection().execute(query, parameters).fetchall()
+
+    key = (current_path(), function_name, parameters)
+    with product_cache_lock:
+        rows = product_cache.get(key)
+        if rows is not None:
+            product_cache.move_to_end(key)
+            product_cache_stats["hits"] += 1
+            return list(rows)
+        product_cache_stats["misses"] += 1
+        generation = product_cache_generation
+
+    rows = get_connection().execute(query, parameters).fetchall()
+
+    with product_cache_lock:
+        if generation == product_cache_generation:
+            product_cache[key] = rows
+            product_cache.move_to_end(key)
+            while len(product_cache) > PRODUCT_CACHE_SIZE:
+                product_cache.popitem(last=False)
+    return list(rows)
+
+
+# Function used to run one of the CHECK queries on the products table through the product cache.
+def cached_product_check(function_name, query, parameters):
+    return cached_product_read(function_name, query, parameters)[0][0] == 1
+
+
+# Function used to empty the product cache. Called by every function that changes the products table, and can be
+# called after another process has changed the products. Inside a unit of work, the cache is cleared again when the
+# unit of work ends (see unit_of_work()).
+def clear_product_cache():
+    global product_cache_generation
+    with product_cache_lock:
+        product_cache.clear()
+        product_cache_generation += 1
+        product_cache_stats["invalidations"] += 1
+    if in_unit_of_work():
+        thread_connections.products_changed = True
+
+
+# Function used to get the product cache's hit, miss and invalidation counts along with its current size.
+def get_product_cache_stats():
+    with product_cache_lock:
+        return {**product_cache_stats, "size": len(product_cache), "max_size": PRODUCT_CACHE_SIZE}
+
+# CHECK FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to run one of the CHECK queries, which return a single 1 if a matching entry exists and 0 if not.
+def run_check(query, parameters):
+    connection = get_connection()
+    return connection.execute(query, parameters).fetchone()[0] == 1
+
+
+# Function used to check if a specified customer and location combination exists in the database
+def customer_at_location_check(name, location):
+    if routing():
+        return on_shard(location_shard(location), customer_at_location_check, name, location)
+    return run_check(queries.CHECK_CUSTOMER_EXISTS_AT_LOCATION, (name, location))
+
+
+# Function used to check which of the specified customer name and location combinations exist in the database.
+# Returns a set of the (name, location) combinations that are already present.
+def customers_at_locations_check(names_and_locations):
+    if not names_and_locations:
+        return set()
+    if routing():
+        checks = fan_out_groups(customers_at_locations_check, names_and_locations, lambda entry: location_shard(entry[1]))
+        return set().union(*checks)
+    connection = get_connection()
+    placeholders = ", ".join(["(?, ?)"] * len(names_and_locations))
+    parameters = [value for name_and_location in names_and_locations for value in name_and_location]
+    cursor = connection.cursor()
+    cursor.execute(queries.CHECK_CUSTOMERS_EXIST_AT_LOCATIONS.format(placeholders=placeholders), parameters)
+    return set(cursor.fetchall())
+
+
+# Function used to find which of the specified customer ids exist in the database.
+# Returns a dictionary of each existing customer's id and last payment timestamp.
+def find_customers_by_id(ids):
+    if not ids:
+        return {}
+    if routing():
+        return merge_dictionaries(fan_out_groups(find_customers_by_id, ids, id_shard))
+    connection = get_connection()
+    placeholders = ", ".join(["(?)"] * len(ids))
+    cursor = connection.cursor()
+    cursor.execute(queries.FIND_CUSTOMERS_BY_ID.format(placeholders=placeholders), list(ids))
+    return dict(cursor.fetchall())
+
+
+# Function used to find the customers at the specified customer name and location combinations.
+# Returns a dictionary of each existing (name, location) combination and its customer's id and last payment timestamp.
+def find_customers_at_locations(names_and_locations):
+    if not names_and_locations:
+        return {}
+    if routing():
+        found = fan_out_groups(find_customers_at_locations, names_and_locations, lambda entry: location_shard(entry[1]))
+        return merge_dictionaries(found)
+    connection = get_connection()
+    placeholders = ", ".join(["(?, ?)"] * len(names_and_locations))
+    parameters = [value for name_and_location in names_and_locations for value in name_and_location]
+    cursor = connection.cursor()
+    cursor.execute(queries.FIND_CUSTOMERS_AT_LOCATIONS.format(placeholders=placeholders), parameters)
+    return {(name, location): (id, last_payment) for name, location, id, last_payment in cursor.fetchall()}
+
+
+# Function used to check if a specified product and price combination exists in the database.
+def product_and_price_check(product, price):
+    return cached_product_check("product_and_price_check", queries.CHECK_PRODUCT_AND_PRICE_EXISTS, (product, price))
+
+
+# Function used to check if a specified customer ID exists in the customers table
+def id_check_customers(id, name):
+    if routing():
+        return on_shard(id_shard(id), id_check_customers, id, name)
+    return run_check(queries.CHECK_CUSTOMER_ID, (id, name))
+
+
+# Function used to check if a specified product ID exists in the products table
+def id_check_products(id, product):
+    return cached_product_check("id_check_products", queries.CHECK_PRODUCT_ID, (id, product))
+    
+
+# Function used to check if a specified product assignment ID exists in the customer_products table
+def id_check_customer_products(id):
+    if routing():
+        return on_shard(id_shard(id), id_check_customer_products, id)
+    return run_check(queries.CHECK_ASSIGNMENT_ID, (id, ))
+    
+
+# Function used to check if a specified customer name exists in the customers table
+def customer_check(name):
+    if routing():
+        return any(fan_out(customer_check, name))
+    return run_check(queries.CHECK_CUSTOMER_EXISTS, (name, ))
+
+
+# Function used to check if a specified product name exists in the products table
+def product_check(product):
+    return cached_product_check("product_check", queries.CHECK_PRODUCT_EXISTS, (product, ))
+
+
+# Function used to check if a customer has any product assigned to them
+def customer_assignment_check(name):
+    if routing():
+        return any(fan_out(customer_assignment_check, name))
+    return run_check(queries.CHECK_CUSTOMER_ASSIGNMENT_EXISTS, (name, ))
+
+# SHARD FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# NOTE: In sharded mode, every function above works out which shard (or shards) it needs and runs itself there, so the
+# rest of the application doesn't know the data is split:
+#   - a function for one customer or assignment runs on the one shard it is in, found from its location or id
+#   - a function for many customers runs on each of their shards at once, with the customers grouped by shard
+#   - a listing or check over every customer runs on every shard at once and the results are merged
+#   - the products are read from PRODUCT_SHARD, and changes to them are copied to the other shards
+# A function running on a shard sees thread_connections.shard set, so it runs normally against that shard's file.
+
+
+# Function used to switch to sharded mode with the shards in a directory, or back to DATABASE_PATH with None. The
+# directory and its shard files are created when they are first used.
+def use_shards(directory):
+    global SHARD_DIRECTORY
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    close_connection()
+    SHARD_DIRECTORY = directory
+
+
+# Function used to get the path of a shard's database file.
+def shard_path(shard):
+    return os.path.join(SHARD_DIRECTORY, f"{SHARDS[shard]}.db")
+
+
+# Function used to find the shard of a customer's location from the state at its end (such as "Gainesville, FL").
+def location_shard(location):
+    state = str(location).rsplit(",", 1)[-1].strip().upper()
+    return STATE_SHARDS.get(state, 0)
+
+
+# Function used to find the shard of a customer or product assignment id (see SHARD_ID_RANGE).
+def id_shard(id):
+    return min(max(int(id) - 1, 0) // SHARD_ID_RANGE, len(SHARDS) - 1)
+
+
+# Function used to start a new shard's customer and assignment ids at the start of its id range.
+def start_shard_ids(connection, shard):
+    with connection:
+        for table in ("customers", "customer_products"):
+            connection.execute(queries.INSERT_SHARD_SEQUENCE, (table, shard * SHARD_ID_RANGE))
+            connection.execute(queries.UPDATE_SHARD_SEQUENCE, (table, shard * SHARD_ID_RANGE))
+
+
+# Function used to check if a call has to be routed to the shards: sharded mode is on and the calling thread isn't
+# already running on a shard.
+def routing():
+    return SHARD_DIRECTORY is not None and getattr(thread_connections, "shard", None) is None
+
+
+# Function used to run a function on one shard in the calling thread. Returns what the function returns.
+def on_shard(shard, function, *args):
+    previous = getattr(thread_connections, "shard", None)
+    thread_connections.shard = shard
+    try:
+        return function(*args)
+    finally:
+        thread_connections.shard = previous
+
+
+# Function used to get the worker threads the shards are run on, starting them on first use.
+def get_shard_executor():
+    global shard_executor
+    with shard_executor_lock:
+        if shard_executor is None:
+            shard_executor = ThreadPoolExecutor(len(SHARDS), thread_name_prefix="shard")
+    return shard_executor
+
+
+# Function used to run a function on several shards at once. calls is a list of each shard and the arguments the
+# function is run with there. Returns what the function returned on each shard, in the order of calls.
+# NOTE: Inside a unit of work the calling thread holds the write lock of every shard, so the calls are run one after
+# the other in the calling thread instead of waiting on that lock in the worker threads.
+def run_on_shards(function, calls):
+    if len(calls) == 1 or in_unit_of_work():
+        return [on_shard(shard, function, *args) for shard, args in calls]
+    executor = get_shard_executor()
+    futures = [executor.submit(on_shard, shard, function, *args) for shard, args in calls]
+    return [future.result() for future in futures]
+
+
+# Function used to run a function with the same arguments on every shard at once. Returns each shard's result.
+def fan_out(function, *args):
+    return run_on_shards(function, [(shard, args) for shard in range(len(SHARDS))])
+
+
+# Function used to split a list of entries (customers, payments, ...) by shard and run a function on each shard's
+# entries at once. entry_shard finds the shard of one entry. Returns the result of each shard that had entries.
+def fan_out_groups(function, entries, entry_shard):
+    groups = {}
+    for entry in entries:
+        groups.setdefault(entry_shard(entry), []).append(entry)
+    return run_on_shards(function, [(shard, (group, )) for shard, group in groups.items()])
+
+
+# Function used to run a function that returns a cursor and fetch its rows, so the rows can be handed back from a
+# worker thread (a cursor can only be read by the thread that made it).
+def fetch_all(function, *args):
+    return function(*args).fetchall()
+
+
+# Function used to merge a list of dictionaries into one.
+def merge_dictionaries(dictionaries):
+    merged = {}
+    for dictionary in dictionaries:
+        merged.update(dictionary)
+    return merged
+
+
+# Function used to fetch one page of a keyset paged listing across the shards (see fetch_page()). The shards are read
+# in id order starting from the shard after_id is in, until the page is full.
+def fan_out_page(function, after_id, page_size):
+    rows = []
+    for shard in range(id_shard(after_id + 1), len(SHARDS)):
+        # A shard asked for 0 rows still fetches one, which says whether another page follows.
+        page, more_rows = on_shard(shard, function, after_id, None, page_size - len(rows))
+        rows += page
+        if more_rows:
+            return rows, True
+    return rows, False
+
+
+# Function used to run a function that returns a cursor on every shard at once and stream back the rows of every shard.
+# Returns a row iterator per shard, and the event that tells the shards to stop reading once the rows are no longer
+# wanted.
+# NOTE: Each shard is read by its own thread, STREAM_CHUNK_SIZE rows at a time, into a queue holding up to
+# STREAM_CHUNKS chunks. The shards are all read at once, but only a few chunks ahead of the caller, so memory use
+# doesn't grow with the size of the listing. Inside a unit of work the shards are read one after the other by the
+# calling thread instead (like run_on_shards()), so the rows include the unit of work's own uncommitted changes.
+def fan_out_rows(function, *args):
+    stop = threading.Event()
+    if in_unit_of_work():
+        return [on_shard(shard, function, *args) for shard in range(len(SHARDS))], stop
+
+    streams = []
+    for shard in range(len(SHARDS)):
+        chunks = queue.Queue(STREAM_CHUNKS)
+        threading.Thread(target=stream_shard_rows, args=(shard, function, args, chunks, stop), daemon=True).start()
+        streams.append(read_stream(chunks))
+    return streams, stop
+
+
+# Function used to read a shard's rows into a queue for fan_out_rows(). An empty chunk marks the end of the rows, and
+# an exception is put in the queue for the caller to raise.
+def stream_shard_rows(shard, function, args, chunks, stop):
+    try:
+        cursor = on_shard(shard, function, *args)
+        while not stop.is_set():
+            rows = cursor.fetchmany(STREAM_CHUNK_SIZE)
+            put_chunk(chunks, rows, stop)
+            if not rows:
+                break
+    except Exception as error:
+        put_chunk(chunks, error, stop)
+    finally:
+        close_connection()
+
+
+# Function used to put a chunk in a queue, giving up if the rows stop being wanted while the queue is full.
+def put_chunk(chunks, chunk, stop):
+    while not stop.is_set():
+        try:
+            chunks.put(chunk, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+# Function used to read the rows streamed into a queue by stream_shard_rows().
+def read_stream(chunks):
+    while rows := chunks.get():
+        if isinstance(rows, Exception):
+            raise rows
+        yield from rows
+
+
+# Function used to stream the rows of a function that returns a cursor from every shard, in shard order. The shards
+# hand out ids in ranges (see SHARD_ID_RANGE), so a listing in id order stays in id order.
+def stream_shards(function, *args):
+    streams, stop = fan_out_rows(function, *args)
+    return MergedRows(chain.from_iterable(streams), stop)
+
+
+# Function used to copy the products in PRODUCT_SHARD to every other shard, so each shard can join its assignments
+# with the products. Products removed from PRODUCT_SHARD are removed from the other shards (and so are their
+# assignments).
+# NOTE: The product catalog is small, so it is copied in full rather than working out what changed. It is copied in
+# the calling thread, which may be holding the shards' write locks in a unit of work.
+def sync_products():
+    products = on_shard(PRODUCT_SHARD, fetch_all, view_all_products)
+    ids = json.dumps([product[0] for product in products])
+    for shard in range(len(SHARDS)):
+        if shard != PRODUCT_SHARD:
+            on_shard(shard, copy_products, ids, products)
+
+
+# Function used to replace the products in the shard the calling thread is running on (see sync_products()).
+def copy_products(ids, products):
+    with unit_of_work() as connection:
+        connection.execute(queries.DELETE_PRODUCTS_NOT_IN, (ids, ))
+        connection.executemany(queries.UPSERT_PRODUCT, products)
+
+
+# Function used to run a function that changes the products on PRODUCT_SHARD, then copy the products to the other
+# shards if anything changed. Returns what the function returns.
+def write_products(function, *args):
+    result = on_shard(PRODUCT_SHARD, function, *args)
+    if result:
+        sync_products()
+    return result
+
+
+# Rows merged from the shards, which can be read like the cursor the same function returns when the database isn't
+# sharded: iterated over, or read with fetchone(), fetchmany() or fetchall().
+class MergedRows:
+
+    def __init__(self, rows, stop=None):
+        self.rows = iter(rows)
+        # Once the rows are no longer referenced, the shards still reading them are told to stop.
+        if stop is not None:
+            weakref.finalize(self, stop.set)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.rows)
+
+    def fetchone(self):
+        return next(self.rows, None)
+
+    def fetchmany(self, size=1):
+        return list(islice(self.rows, size))
+
+    def fetchall(self):
+        return list(self.rows)
+
+# SNAPSHOT FUNCTIONS 👇 -----------------------------------------------------------------------------------------#
+
+# NOTE: A snapshot is a copy of the database taken with SQLite's online backup API while the application keeps running.
+# Heavy reports (exports and billing runs) can then read the snapshot instead of the live database, so they don't
+# compete with the operators for it. See snapshot.py.
+
+
+# Function used to take a snapshot of the database into a file (or, in sharded mode, of every shard into a directory).
+# progress is called after every step with the backup status, the pages left to copy and the total pages, like the
+# progress argument of sqlite3's Connection.backup().
+# NOTE: The copy is made SNAPSHOT_PAGES pages at a time over its own connection, which holds one read transaction open
+# for the whole copy. In WAL journal mode a reader never blocks writers, so the operators carry on during the copy, and
+# every step reads the database as it was when the copy started. (Without the read transaction, SQLite starts the copy
+# again from the first page whenever another connection writes between steps, so it never finishes while operators
+# are busy.) The copy is written to a .partial file that replaces the snapshot once it is complete, so a failed
+# snapshot never leaves a half written file behind.
+def snapshot_database(snapshot_path, pages=SNAPSHOT_PAGES, progress=None):
+    if routing():
+        # Each shard is copied at its own point in time.
+        os.makedirs(snapshot_path, exist_ok=True)
+        for shard in range(len(SHARDS)):
+            shard_snapshot_path = os.path.join(snapshot_path, os.path.basename(shard_path(shard)))
+            on_shard(shard, snapshot_database, shard_snapshot_path, pages, progress)
+        return
+
+    partial_path = f"{snapshot_path}.partial"
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    source = open_connection(current_path(), getattr(thread_connections, "shard", None))
+    snapshot = sqlite3.connect(partial_path)
+    try:
+        source.execute("BEGIN")
+        source.execute(queries.GET_SCHEMA_VERSION).fetchone()
+        source.backup(snapshot, pages=pages, progress=progress)
+    finally:
+        snapshot.close()
+        source.close()
+    os.replace(partial_path, snapshot_path)
+
+
+# Function used to switch to reading a snapshot instead of the live database. A snapshot directory taken in sharded mode
+# is used as shards. With in_memory, a snapshot file is loaded into memory first, so reports never wait on the disk.
+# NOTE: Nothing stops a function from writing to the snapshot, so only reports should be run against it.
+def use_snapshot(snapshot_path, in_memory=False):
+    global memory_copy_connection
+    if not os.path.exists(snapshot_path):
+        raise FileNotFoundError(f"{snapshot_path} does not exist")
+    if os.path.isdir(snapshot_path):
+        if in_memory:
+            raise ValueError("a snapshot of a shard directory can't be loaded into memory")
+        use_shards(snapshot_path)
+        return
+
+    use_shards(None)
+    if not in_memory:
+        use_database(snapshot_path)
+        return
+
+    if memory_copy_connection is not None:
+        memory_copy_connection.close()
+    memory_copy_connection = sqlite3.connect(MEMORY_COPY_URI, uri=True)
+    snapshot = sqlite3.connect(snapshot_path)
+    try:
+        snapshot.backup(memory_copy_connection)
+    finally:
+        snapshot.close()
+    use_database(MEMORY_COPY_URI)
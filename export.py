@@ -0,0 +1,136 @@
+# NOTE: This file contains the export of the database for finance. A table (customers, products or assignments) or one
+# of the late customer or bill views is streamed to a CSV or JSONL file. Rows are read in chunks with fetchmany() and
+# written as they arrive, so memory use stays the same however large the table is.
+#
+# Usage: python export.py <customers|products|assignments|late-customers|bills> [--format csv|jsonl] [--output file]
+#                         [--mask-cards] [--iso-dates] [--database file.db] [--snapshot file.db [--in-memory]]
+#
+# --mask-cards replaces all but the last four digits of every card number with *, and --iso-dates writes the sign up
+# and last payment dates as YYYY-MM-DD instead of the timestamps stored in the database. --snapshot reads a snapshot
+# taken with snapshot.py instead of the live database, and --in-memory loads the snapshot into memory first.
+
+import argparse
+import csv
+import json
+import time
+
+import database
+import other_functions
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+CUSTOMER_FIELDS = ["id", "name", "phone_num", "location", "card_num", "sign_up_date", "last_payment"]
+
+PRODUCT_FIELDS = ["id", "product", "product_type", "price"]
+
+ASSIGNMENT_FIELDS = ["id", "customer_name", "customer_location", "product_name", "product_price"]
+
+BILL_FIELDS = ["customer_id", "name", "location", "product_count", "total"]
+
+# Each export's fields and the function in database.py that returns its rows as an unread cursor.
+EXPORTS = {
+    "customers": (CUSTOMER_FIELDS, database.view_customers),
+    "products": (PRODUCT_FIELDS, database.view_all_products),
+    "assignments": (ASSIGNMENT_FIELDS, database.view_assignments),
+    "late-customers": (CUSTOMER_FIELDS, database.view_late_customers),
+    "bills": (BILL_FIELDS, database.view_all_bills),
+}
+
+FORMATS = ["csv", "jsonl"]
+
+# Number of rows read from the database at a time while writing the export file.
+FETCH_SIZE = 5000
+
+# Number of digits at the end of a card number left showing when card numbers are masked.
+CARD_DIGITS_SHOWN = 4
+
+# CONVERSION FUNCTIONS 👇 ---------------------------------------------------------------------------------------#
+
+# Function used to mask a card number, leaving only its last few digits.
+def mask_card_number(card_num):
+    card_num = str(card_num)
+    return "*" * (len(card_num) - CARD_DIGITS_SHOWN) + card_num[-CARD_DIGITS_SHOWN:]
+
+
+# Function used to build the function each row of an export is passed through before it is written. Returns None if
+# the rows are written as they are.
+# NOTE: Only customer rows have card numbers and dates, so the other exports are never converted.
+def build_row_converter(fields, mask_cards, iso_dates):
+    if fields is not CUSTOMER_FIELDS or not (mask_cards or iso_dates):
+        return None
+    keep = lambda value: value
+    convert_card = mask_card_number if mask_cards else keep
+    convert_date = other_functions.timestamp_to_iso_date if iso_dates else keep
+
+    def convert_row(row):
+        id, name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp = row
+        return (id, name, phone_num, location, convert_card(card_num), convert_date(sign_up_timestamp),
+                convert_date(last_payment_timestamp))
+
+    return convert_row
+
+# EXPORT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to write chunks of rows to a CSV file.
+def write_csv(file, fields, chunks):
+    writer = csv.writer(file)
+    writer.writerow(fields)
+    for rows in chunks:
+        writer.writerows(rows)
+
+
+# Function used to write chunks of rows to a JSONL file, one JSON object per row.
+def write_jsonl(file, fields, chunks):
+    for rows in chunks:
+        file.writelines(json.dumps(dict(zip(fields, row))) + "\n" for row in rows)
+
+
+# Function used to read the rows of a cursor in chunks with fetchmany(), converting each row if needed. Adds the size
+# of each chunk to counts so the caller knows how many rows were written.
+def read_chunks(cursor, convert_row, counts):
+    while rows := cursor.fetchmany(FETCH_SIZE):
+        if convert_row:
+            rows = [convert_row(row) for row in rows]
+        counts.append(len(rows))
+        yield rows
+
+
+# Function used to export a table or view to a file. Returns the number of rows written and the time taken in
+# seconds.
+def export(name, output_path, format="csv", mask_cards=False, iso_dates=False):
+    start = time.perf_counter()
+    fields, view = EXPORTS[name]
+    convert_row = build_row_converter(fields, mask_cards, iso_dates)
+    write_rows = write_csv if format == "csv" else write_jsonl
+    counts = []
+
+    with open(output_path, "w", newline="", encoding="utf-8") as file:
+        write_rows(file, fields, read_chunks(view(), convert_row, counts))
+
+    return sum(counts), time.perf_counter() - start
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a table or view of the database to a CSV or JSONL file.")
+    parser.add_argument("table", choices=list(EXPORTS))
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="file format (default: csv)")
+    parser.add_argument("--output", help="file the rows are written to (default: export_<table>.<format>)")
+    parser.add_argument("--mask-cards", action="store_true", help="only show the last 4 digits of card numbers")
+    parser.add_argument("--iso-dates", action="store_true", help="write dates as YYYY-MM-DD instead of timestamps")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    parser.add_argument("--snapshot", help="snapshot (see snapshot.py) read instead of the live database")
+    parser.add_argument("--in-memory", action="store_true", help="load the snapshot into memory before exporting")
+    args = parser.parse_args()
+    if args.in_memory and not args.snapshot:
+        parser.error("--in-memory needs --snapshot")
+
+    output_path = args.output or f"export_{args.table}.{args.format}"
+
+    if args.database:
+        database.use_database(args.database)
+    if args.snapshot:
+        database.use_snapshot(args.snapshot, args.in_memory)
+    row_count, elapsed = export(args.table, output_path, args.format, args.mask_cards, args.iso_dates)
+
+    print(f"Exported {row_count} {args.table} rows to {output_path} in {elapsed:.2f}s.")
@@ -0,0 +1,145 @@
+# NOTE: This file contains the synthetic data generator. It fills a new database file with any number of made up
+# customers, products and product assignments so the application can be measured at scale (see benchmark.py). The
+# same seed always produces the same data, with payment dates counted back from the day it is run.
+#
+# Usage: python generate_data.py bench.db --customers 100000 --products 50 --assignments 300000 [--seed 42]
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import database
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+FIRST_NAMES = ["Ben", "Nancy", "Tim", "Howard", "Maria", "James", "Aisha", "Wei", "Sofia", "Liam", "Priya", "Omar",
+               "Grace", "Mateo", "Hannah", "Kenji", "Olivia", "Noah", "Fatima", "Lucas"]
+
+LAST_NAMES = ["Jones", "Pelling", "Baker", "Duck", "Garcia", "Smith", "Khan", "Chen", "Rossi", "Murphy", "Patel",
+              "Haddad", "Lee", "Lopez", "Schmidt", "Tanaka", "Brown", "Wilson", "Ali", "Silva"]
+
+STREETS = ["Galloping Ln.", "Bronco Ave.", "Gator Cir.", "Turtle Rd.", "Redwood Ave.", "Airbud Dr.", "Maple St.",
+           "Canyon Blvd.", "Harbor Way", "Aspen Ct."]
+
+CITIES = ["Fort Collins, CO", "Denver, CO", "Gainesville, FL", "Baltimore, MD", "Morgantown, WV", "Sacremento, CA",
+          "Austin, TX", "Portland, OR", "Columbus, OH", "Raleigh, NC", "Phoenix, AZ", "Madison, WI"]
+
+SPEEDS = ["1G", "2.5G", "5G", "10G"]
+
+EQUIPMENT = ["Router", "Extender", "Modem", "Mesh Node"]
+
+SERVICES = ["Residential Service", "Enterprise Service", "Business Service", "Static IP"]
+
+# How many days ago customers last paid, as (share of customers, fewest days, most days). Most customers are up to
+# date, with a smaller share in each of the 30, 60 and 90+ day late buckets.
+PAYMENT_SPREAD = [(0.72, 0, 29), (0.14, 30, 59), (0.07, 60, 89), (0.07, 90, 365)]
+
+# Number of rows inserted per transaction.
+CHUNK_SIZE = 10000
+
+# GENERATOR FUNCTIONS 👇 ----------------------------------------------------------------------------------------#
+
+# Function used to pick how many days ago a customer last paid, following PAYMENT_SPREAD.
+def days_since_payment(rng):
+    roll = rng.random()
+    for share, fewest_days, most_days in PAYMENT_SPREAD:
+        if roll < share:
+            return rng.randint(fewest_days, most_days)
+        roll -= share
+    return rng.randint(fewest_days, most_days)
+
+
+# Function used to generate customers one at a time, in the same form add_new_customer() takes them.
+# NOTE: Each customer's location includes its position, so every name and location combination is unique. Names
+# repeat, so many customers have entries at more than one location like the real data does.
+def generate_customers(rng, count):
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+
+    for number in range(1, count + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        phone_num = f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+        location = f"{number} {rng.choice(STREETS)} {rng.choice(CITIES)}"
+        card_num = "".join(rng.choice("0123456789") for digit in range(16))
+
+        # Dates are whole days, the same as the dates entered through the prompts.
+        last_payment = today - timedelta(days=days_since_payment(rng))
+        sign_up = last_payment - timedelta(days=rng.randint(0, 8 * 365))
+
+        yield name, phone_num, location, card_num, sign_up.timestamp(), last_payment.timestamp()
+
+
+# Function used to generate the product catalog, in the same form add_new_product() takes it.
+# NOTE: Equipment is complementary (a price of $0) just like products added through the prompts.
+def generate_products(rng, count):
+    for number in range(1, count + 1):
+        speed = SPEEDS[number % len(SPEEDS)]
+        if rng.random() < 0.4:
+            yield f"{speed} {rng.choice(EQUIPMENT)} #{number}", "Equipment", 0
+        else:
+            yield f"{speed} {rng.choice(SERVICES)} #{number}", "Service", round(rng.uniform(40, 450), 2)
+
+
+# Function used to insert rows from a generator in chunks, one transaction per chunk. Returns the number of rows
+# inserted.
+def insert_in_chunks(rows, insert):
+    inserted = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            inserted += insert(chunk)
+            chunk = []
+    if chunk:
+        inserted += insert(chunk)
+    return inserted
+
+
+# Function used to assign random products to random customers until the requested number of assignments exist.
+# NOTE: A customer can only have each product assigned once, so pairs that were already picked are skipped and more
+# are drawn. The count is capped at every customer having every product.
+def generate_assignments(rng, customer_count, product_count, count):
+    count = min(count, customer_count * product_count)
+    assigned = 0
+    while assigned < count:
+        chunk_size = min(CHUNK_SIZE, count - assigned)
+        chunk = [(rng.randint(1, customer_count), rng.randint(1, product_count)) for pair in range(chunk_size)]
+        assigned += database.assign_products_by_id(chunk)
+    return assigned
+
+
+# Function used to fill a new database file with synthetic data. Returns the number of customers, products and
+# assignments created.
+# NOTE: The file must not already exist, so the new customers and products get the ids 1 to N that the assignments
+# are drawn from.
+def generate_database(path, customer_count, product_count, assignment_count, seed=42):
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+
+    rng = random.Random(seed)
+    database.use_database(path)
+
+    customers = insert_in_chunks(generate_customers(rng, customer_count), database.add_new_customers)
+    products = insert_in_chunks(generate_products(rng, product_count), database.add_new_products)
+    assignments = generate_assignments(rng, customers, products, assignment_count) if customers and products else 0
+
+    return customers, products, assignments
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a new database file with synthetic customers and products.")
+    parser.add_argument("path", help="database file to create")
+    parser.add_argument("--customers", type=int, default=10000, help="number of customers (default: 10000)")
+    parser.add_argument("--products", type=int, default=50, help="number of products (default: 50)")
+    parser.add_argument("--assignments", type=int, help="number of product assignments (default: 3 per customer)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: 42)")
+    args = parser.parse_args()
+
+    assignment_count = args.assignments if args.assignments is not None else args.customers * 3
+
+    start = time.perf_counter()
+    customers, products, assignments = generate_database(args.path, args.customers, args.products, assignment_count, args.seed)
+    print(f"Created {customers} customers, {products} products and {assignments} assignments in {args.path} "
+          f"({time.perf_counter() - start:.1f}s).")
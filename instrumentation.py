@@ -0,0 +1,261 @@
+# NOTE: This file contains the query instrumentation for database.py. When it is turned on, every query run through a
+# database connection is timed and counted under the name of its constant in queries.py, and queries slower than a
+# threshold are written to a slow-query log with their bound parameters redacted.
+#
+# Instrumentation is off by default and is turned on with environment variables:
+#   CUSTOMER_DB_INSTRUMENT=1            time every query and print the statistics when main.py exits
+#   CUSTOMER_DB_SLOW_QUERY_MS=100       queries taking longer than this many milliseconds are logged (default: 100)
+#   CUSTOMER_DB_SLOW_QUERY_LOG=path     file the slow queries are logged to (default: slow_queries.log)
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import queries
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+enabled = os.environ.get("CUSTOMER_DB_INSTRUMENT") == "1"
+
+slow_query_ms = float(os.environ.get("CUSTOMER_DB_SLOW_QUERY_MS", "100"))
+
+slow_query_log_path = os.environ.get("CUSTOMER_DB_SLOW_QUERY_LOG", "slow_queries.log")
+
+# Number of recent run times kept per query for working out percentiles, so memory use stays bounded in a
+# long-running process.
+SAMPLE_LIMIT = 10000
+
+# Each query's SQL mapped to the name of its constant in queries.py, so statistics are reported by name.
+QUERY_NAMES = {value: name for name, value in vars(queries).items() if name.isupper() and isinstance(value, str)}
+
+# Queries that have values formatted into them (like SET_SCHEMA_VERSION) are matched by the text before the first
+# value instead.
+QUERY_TEMPLATE_NAMES = [(value.split("{")[0], name) for value, name in QUERY_NAMES.items() if "{" in value]
+
+# Query statistics keyed by query name: [number of runs, total seconds, recent run times in seconds].
+query_stats = {}
+stats_lock = threading.Lock()
+
+# NOTE: The logger (and the logging module) is only set up once the first slow query is logged, since importing logging
+# noticeably adds to how long every short-lived run of main.py or cli.py takes to start.
+slow_query_logger = None
+
+# SETUP FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to turn instrumentation on from code instead of environment variables. Only connections opened after
+# this is called are instrumented.
+def enable(slow_query_threshold_ms=None, slow_query_log=None):
+    global enabled, slow_query_ms, slow_query_log_path
+    enabled = True
+    if slow_query_threshold_ms is not None:
+        slow_query_ms = slow_query_threshold_ms
+    if slow_query_log is not None:
+        slow_query_log_path = slow_query_log
+        if slow_query_logger is not None:
+            for handler in list(slow_query_logger.handlers):
+                slow_query_logger.removeHandler(handler)
+                handler.close()
+
+
+# Function used to name a query for the statistics. Queries from queries.py are named after their constant, and any
+# other SQL (such as the PRAGMA statements run when a connection opens) by its first line.
+def query_name(sql):
+    name = QUERY_NAMES.get(sql)
+    if name is None:
+        name = next((name for prefix, name in QUERY_TEMPLATE_NAMES if sql.startswith(prefix)), None)
+    if name is None:
+        name = sql.strip().splitlines()[0][:60]
+    return name
+
+
+# Function used to redact bound parameters for the slow-query log. Numbers (ids, timestamps and prices) are kept,
+# but every string is replaced by its length, since strings hold the names, phone numbers and card numbers.
+def redact(parameters):
+    if isinstance(parameters, dict):
+        return {key: redact([value])[0] for key, value in parameters.items()}
+    return [value if value is None or isinstance(value, (int, float)) else f"<redacted {len(str(value))} chars>"
+            for value in parameters]
+
+# RECORDING FUNCTIONS 👇 ----------------------------------------------------------------------------------------#
+
+# Function used to record one finished run of a query, and to log it if it was slow.
+def record_query(sql, parameters, seconds, row_count=None):
+    name = query_name(sql)
+    with stats_lock:
+        stats = query_stats.get(name)
+        if stats is None:
+            stats = query_stats[name] = [0, 0.0, deque(maxlen=SAMPLE_LIMIT)]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2].append(seconds)
+
+    if seconds * 1000 >= slow_query_ms:
+        log_slow_query(name, parameters, seconds, row_count)
+
+
+# Function used to write a slow query to the slow-query log file.
+def log_slow_query(name, parameters, seconds, row_count):
+    global slow_query_logger
+    import logging
+    if slow_query_logger is None:
+        slow_query_logger = logging.getLogger("customer_tracking.slow_queries")
+        slow_query_logger.propagate = False
+    if not slow_query_logger.handlers:
+        handler = logging.FileHandler(slow_query_log_path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_query_logger.addHandler(handler)
+        slow_query_logger.setLevel(logging.INFO)
+
+    # For executemany the parameters are every row inserted, so only the number of rows is logged.
+    if row_count is not None:
+        parameters = f"<{row_count} rows>"
+    else:
+        parameters = redact(parameters)
+    slow_query_logger.info(f"{seconds * 1000:.1f} ms {name} parameters={parameters}")
+
+
+# Function used to get the statistics for every query, slowest total time first. Each entry has the query's name,
+# number of runs, total time, and its 50th, 95th and 99th percentile run times in milliseconds.
+def get_stats():
+    with stats_lock:
+        snapshot = [(name, count, total, sorted(samples)) for name, (count, total, samples) in query_stats.items()]
+
+    stats = []
+    for name, count, total, samples in sorted(snapshot, key=lambda entry: entry[2], reverse=True):
+        percentile = lambda fraction: samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+        stats.append({
+            "query": name,
+            "count": count,
+            "total_ms": total * 1000,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        })
+    return stats
+
+
+# Function used to clear the statistics gathered so far.
+def reset_stats():
+    with stats_lock:
+        query_stats.clear()
+
+
+# Function used to print the statistics for every query as a table.
+def print_stats():
+    stats = get_stats()
+    if not stats:
+        return
+    print(f"\n{'Query':<42} {'Count':>8} {'Total ms':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for entry in stats:
+        print(f"{entry['query']:<42} {entry['count']:>8} {entry['total_ms']:>11.2f} "
+              f"{entry['p50_ms']:>9.3f} {entry['p95_ms']:>9.3f} {entry['p99_ms']:>9.3f}")
+
+
+# Function used to write the statistics for every query to a JSON file.
+def write_stats(path):
+    import json
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(get_stats(), file, indent=2)
+
+# CONNECTION CLASSES 👇 -----------------------------------------------------------------------------------------#
+
+# Cursor that times the queries it runs. A query's time includes reading its rows, so queries whose cursor is returned
+# to the caller (like view_customers()) are timed up to when the caller has read the last row, the cursor is closed,
+# or the cursor is reused for another query.
+class InstrumentedCursor(sqlite3.Cursor):
+
+    pending_query = None
+
+    def execute(self, sql, parameters=()):
+        self.finish_query()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self.pending_query = [sql, parameters, time.perf_counter() - start]
+
+        # Statements that don't return rows are finished as soon as they have run.
+        if self.description is None:
+            self.finish_query()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish_query()
+
+        # The rows are counted as SQLite reads them, so a generator of rows isn't read into memory first.
+        row_count = 0
+        def counted_rows():
+            nonlocal row_count
+            for parameters in seq_of_parameters:
+                row_count += 1
+                yield parameters
+
+        start = time.perf_counter()
+        super().executemany(sql, counted_rows())
+        record_query(sql, None, time.perf_counter() - start, row_count=row_count)
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return super().__next__()
+        except StopIteration:
+            self.finish_query()
+            raise
+        finally:
+            if self.pending_query:
+                self.pending_query[2] += time.perf_counter() - start
+
+    def fetchone(self):
+        return next(self, None)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self.pending_query:
+            self.pending_query[2] += time.perf_counter() - start
+            if not rows:
+                self.finish_query()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self.pending_query:
+            self.pending_query[2] += time.perf_counter() - start
+            self.finish_query()
+        return rows
+
+    def close(self):
+        self.finish_query()
+        super().close()
+
+    def __del__(self):
+        self.finish_query()
+
+    # Records the query the cursor last ran, if it hasn't been recorded yet.
+    def finish_query(self):
+        if self.pending_query:
+            sql, parameters, seconds = self.pending_query
+            self.pending_query = None
+            record_query(sql, parameters, seconds)
+
+
+# Connection whose cursors are InstrumentedCursors while instrumentation is turned on. Connection.execute() and
+# executemany() are sent through a cursor so they are timed too.
+class InstrumentedConnection(sqlite3.Connection):
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = InstrumentedCursor if enabled else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        if not enabled:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not enabled:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
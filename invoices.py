@@ -0,0 +1,140 @@
+# NOTE: This file contains the invoice run. Every customer with products assigned gets a formatted invoice listing
+# each product and their total. The customers are split into partitions by id range, and the partitions are written
+# by a pool of worker processes at once, each reading the database over its own read-only connection, so the run
+# scales with the number of cores instead of formatting every invoice in one thread.
+#
+# Usage: python invoices.py [--month YYYY-MM] [--output-dir invoices_YYYY-MM] [--workers N] [--partition-size 5000]
+#
+# Each partition is written to its own file in the output directory (invoices_00000.txt, invoices_00001.txt, ...).
+# The partitions are saved in manifest.json when the run starts, so a run that is stopped part way can be started
+# again with the same command and only writes the partitions that aren't finished.
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from itertools import groupby
+
+import database
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+MANIFEST_NAME = "manifest.json"
+
+PARTITION_FILE_NAME = "invoices_{index:05d}.txt"
+
+INVOICE_WIDTH = 64
+
+# FORMAT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to format one customer's invoice from their line items (rows of view_invoice_lines()).
+def format_invoice(billing_month, lines):
+    customer_id, name, location, *_, total = lines[0]
+    rule = "-" * INVOICE_WIDTH + "\n"
+    items = "".join(f"{product[:34]:<34} {product_type[:14]:<14} {f'${price:,.2f}':>14}\n"
+                    for *_, product, product_type, price, total in lines)
+    return (f"INVOICE {billing_month}{f'Customer #{customer_id}':>{INVOICE_WIDTH - 15}}\n"
+            f"{name}\n{location}\n" + rule + items + rule +
+            f"{'Total due':<49} {f'${float(total):,.2f}':>14}\n\n")
+
+# WORKER FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to set up a worker process: the same database file (or shards) as the run, opened read-only.
+def start_worker(database_path, shard_directory):
+    database.use_database(database_path)
+    database.use_shards(shard_directory)
+    database.use_read_only()
+
+
+# Function used to write the invoices of one partition. Returns the partition's index and the number of invoices.
+# NOTE: The invoices are written to a .partial file that is renamed once it is complete, so a partition's file only
+# exists once every one of its invoices has been written, which is what lets a stopped run pick up where it left off.
+def write_partition(job):
+    index, start_id, end_id, billing_month, output_dir = job
+    path = os.path.join(output_dir, PARTITION_FILE_NAME.format(index=index))
+    invoice_count = 0
+
+    with open(f"{path}.partial", "w", encoding="utf-8") as file:
+        for customer_id, lines in groupby(database.view_invoice_lines(start_id, end_id), key=lambda line: line[0]):
+            file.write(format_invoice(billing_month, list(lines)))
+            invoice_count += 1
+    os.replace(f"{path}.partial", path)
+    return index, invoice_count
+
+# RUN FUNCTIONS 👇 ----------------------------------------------------------------------------------------------#
+
+# Function used to get the partitions of a run: from its manifest if the run was started before, or worked out from
+# the customers and saved to a new manifest.
+def load_partitions(billing_month, output_dir, partition_size):
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest["month"] != billing_month:
+            raise ValueError(f"{output_dir} holds the invoices for {manifest['month']}, not {billing_month}")
+        return manifest["partitions"]
+
+    partitions = database.invoice_partitions(partition_size)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as file:
+        json.dump({"month": billing_month, "partition_size": partition_size, "partitions": partitions}, file)
+    return partitions
+
+
+# Function used to run the invoices for a billing month. progress is called with the number of partitions finished
+# and the total after each partition. Returns the number of invoices written, the number of partitions written and
+# skipped (already finished by an earlier run), and the time taken in seconds.
+# NOTE: The workers are started with the spawn method, so each starts from a fresh interpreter and opens its own
+# connections rather than inheriting this process's (a SQLite connection must never be used on both sides of a fork).
+def generate_invoices(billing_month, output_dir, workers=None, partition_size=database.INVOICE_PARTITION_SIZE, progress=None):
+    start = time.perf_counter()
+
+    # The partitions are worked out (and the database brought up to the newest schema version) here, before the
+    # read-only workers open it.
+    partitions = load_partitions(billing_month, output_dir, partition_size)
+    jobs = [(index, start_id, end_id, billing_month, output_dir)
+            for index, (start_id, end_id) in enumerate(partitions)
+            if not os.path.exists(os.path.join(output_dir, PARTITION_FILE_NAME.format(index=index)))]
+    skipped = len(partitions) - len(jobs)
+    invoice_count = 0
+
+    if jobs:
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        context = multiprocessing.get_context("spawn")
+        initargs = (database.DATABASE_PATH, database.SHARD_DIRECTORY)
+        with context.Pool(workers, initializer=start_worker, initargs=initargs) as pool:
+            for finished, (index, count) in enumerate(pool.imap_unordered(write_partition, jobs), start=skipped + 1):
+                invoice_count += count
+                if progress:
+                    progress(finished, len(partitions))
+
+    return invoice_count, len(jobs), skipped, time.perf_counter() - start
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write every customer's invoice for a billing month.")
+    parser.add_argument("--month", default=datetime.now().strftime("%Y-%m"), help="billing month, YYYY-MM (default: this month)")
+    parser.add_argument("--output-dir", help="directory the invoice files are written to (default: invoices_<month>)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--partition-size", type=int, default=database.INVOICE_PARTITION_SIZE, help="customers per partition")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or f"invoices_{args.month}"
+    show_progress = lambda finished, total: print(f"\rWrote {finished} of {total} partitions", end="", flush=True)
+
+    if args.database:
+        database.use_database(args.database)
+    try:
+        invoice_count, written, skipped, elapsed = generate_invoices(
+            args.month, output_dir, args.workers, args.partition_size, show_progress)
+    except ValueError as error:
+        parser.error(str(error))
+
+    print(f"\nWrote {invoice_count} invoices in {written} partitions to {output_dir} in {elapsed:.2f}s "
+          f"({invoice_count / max(elapsed, 1e-9):,.0f} invoices/s).")
+    if skipped:
+        print(f"{skipped} partitions were already written by an earlier run.")
@@ -0,0 +1,149 @@
+# NOTE: This file contains the load generator for the JSON service (server.py). It opens a number of keep-alive
+# connections to a running server, sends a mix of customer, product, search, bill and payment requests over them for a
+# set time, and reports the requests per second and the response time percentiles. With --batch, each round trip is a
+# batch request holding that many operations, which shows how much of the time per request is the round trip itself.
+#
+# Usage: python load_test.py [--host 127.0.0.1] [--port 8080] [--connections 16] [--duration 10] [--batch 1]
+#                            [--write-share 0.1] [--output load_report.json]
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote
+
+import server
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+DEFAULT_CONNECTIONS = 16
+DEFAULT_DURATION = 10
+
+# Share of the operations that write (a payment posted for a customer) instead of read.
+DEFAULT_WRITE_SHARE = 0.1
+
+# Number of customers fetched before the test starts for the requests to pick from.
+SAMPLE_SIZE = 1000
+
+# CLIENT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to send one request over an open connection and read its response. Returns the status and body.
+async def send_request(reader, writer, host, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    length = 0
+    for line in header_lines:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    return int(status_line.split(" ")[1]), json.loads(await reader.readexactly(length))
+
+
+# Function used to pick one random operation from the request mix. Returns its method, path and body.
+def random_operation(rng, customers, write_share):
+    id, name = rng.choice(customers)
+    if rng.random() < write_share:
+        return "POST", f"/customers/{id}/payment", {"date": time.strftime("%m-%d-%Y")}
+
+    return rng.choice([
+        ("GET", f"/customers?after_id={id - 1}&limit=20", None),
+        ("GET", f"/customers/search?q={quote(name.split()[0][:3])}", None),
+        ("GET", f"/customers/search?q={quote(name)}", None),
+        ("GET", "/products", None),
+        ("GET", f"/assignments?after_id={id - 1}&limit=20", None),
+        ("GET", f"/bills/{quote(name)}", None),
+    ])
+
+# LOAD FUNCTIONS 👇 ---------------------------------------------------------------------------------------------#
+
+# Function used to keep one connection busy until the deadline. Adds the time of every round trip to latencies and
+# returns the number of operations sent and the number that failed with a server error.
+async def run_connection(host, port, customers, deadline, batch, write_share, seed, latencies):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    operations = errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if batch > 1:
+                requests = [dict(zip(("method", "path", "body"), random_operation(rng, customers, write_share))) for call in range(batch)]
+                status, body = await send_request(reader, writer, host, "POST", "/batch", requests)
+                errors += sum(1 for response in body if response["status"] >= 500) if status == 200 else batch
+                operations += batch
+            else:
+                method, path, request_body = random_operation(rng, customers, write_share)
+                status, body = await send_request(reader, writer, host, method, path, request_body)
+                errors += status >= 500
+                operations += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+    return operations, errors
+
+
+# Function used to run the load test. Returns a report of the requests per second and response times.
+async def run_load_test(host, port, connections, duration, batch, write_share, seed):
+    reader, writer = await asyncio.open_connection(host, port)
+    status, page = await send_request(reader, writer, host, "GET", f"/customers?limit={SAMPLE_SIZE}")
+    writer.close()
+    customers = [(entry["id"], entry["name"]) for entry in page.get("entries", [])]
+    if not customers:
+        raise SystemExit("The server's database has no customers to send requests for.")
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_connection(host, port, customers, deadline, batch, write_share, seed + number, latencies)
+        for number in range(connections)])
+    elapsed = time.perf_counter() - start
+
+    operations = sum(result[0] for result in results)
+    latencies.sort()
+    percentile = lambda fraction: latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+    return {
+        "connections": connections,
+        "batch": batch,
+        "write_share": write_share,
+        "seconds": elapsed,
+        "requests": len(latencies),
+        "operations": operations,
+        "errors": sum(result[1] for result in results),
+        "requests_per_sec": len(latencies) / elapsed,
+        "operations_per_sec": operations / elapsed,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the requests per second a running server.py can answer.")
+    parser.add_argument("--host", default=server.DEFAULT_HOST, help=f"server address (default: {server.DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=server.DEFAULT_PORT, help=f"server port (default: {server.DEFAULT_PORT})")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds to send requests for")
+    parser.add_argument("--batch", type=int, default=1, help="operations sent per batch request (1 = no batching)")
+    parser.add_argument("--write-share", type=float, default=DEFAULT_WRITE_SHARE, help="share of operations that write")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: 42)")
+    parser.add_argument("--output", help="JSON file the report is also written to")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args.host, args.port, args.connections, args.duration, args.batch, args.write_share, args.seed))
+
+    print(f"{report['requests']} requests ({report['operations']} operations) in {report['seconds']:.1f}s over "
+          f"{report['connections']} connections")
+    print(f"{report['requests_per_sec']:,.0f} requests/s, {report['operations_per_sec']:,.0f} operations/s, "
+          f"{report['errors']} errors")
+    print(f"Response time p50 {report['p50_ms']:.2f} ms   p95 {report['p95_ms']:.2f} ms   p99 {report['p99_ms']:.2f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,100 @@
+# NOTE: This file contains the ordered list of schema migrations for the database. Each migration is a list of SQLite
+# queries from queries.py, and its schema version is its position in the list (starting at 1). The version a database
+# file is currently at is stored inside the file itself with PRAGMA user_version.
+
+# NOTE: Migrations are only ever appended to this list. Editing or reordering a migration that has already shipped
+# would leave existing customer_data.db files out of step with newly created ones.
+
+import queries
+
+# MIGRATIONS 👇 -------------------------------------------------------------------------------------------------#
+
+MIGRATIONS = [
+
+    # Version 1. Create the customers, products and customer_products tables.
+    # NOTE: Database files created before schema versioning already have these tables and report version 0, so the
+    # IF NOT EXISTS clauses let them pass through this migration untouched.
+    [
+        queries.CREATE_CUSTOMERS_TABLE,
+        queries.CREATE_PRODUCTS_TABLE,
+        queries.CREATE_CUSTOMER_PRODUCTS_TABLE,
+    ],
+
+    # Version 2. Index the late payment lookup (option 4) and the product side of customer_products so that removing
+    # a product or editing its price doesn't scan every assignment to apply the cascade.
+    [
+        queries.CREATE_LATE_PAYMENT_INDEX,
+        queries.CREATE_ASSIGNMENT_PRODUCT_INDEX,
+    ],
+
+    # Version 3. Index customer locations so the location filter on the paged customer and assignment listings seeks
+    # straight to the matching rows (the index also carries each row's id, which the pages are ordered by).
+    [
+        queries.CREATE_CUSTOMER_LOCATION_INDEX,
+        queries.CREATE_ASSIGNMENT_LOCATION_INDEX,
+    ],
+
+    # Version 4. Create the bills table that the monthly billing run saves each customer's bill to.
+    # NOTE: Bills are a record of what was charged, so they keep the customer's name and location and have no foreign
+    # keys; removing a customer doesn't remove the bills they were sent.
+    [
+        queries.CREATE_BILLS_TABLE,
+    ],
+
+    # Version 5. Rebuild customer_products to reference customers and products by id instead of copying each customer's
+    # name / location and product's name / price into every assignment, then index the product side.
+    # NOTE: SQLite can't change a table's columns or constraints in place, so the new table is created, filled from the
+    # old one, and renamed over it. Assignments whose customer or product no longer exists are left behind.
+    [
+        queries.CREATE_CUSTOMER_PRODUCTS_BY_ID_TABLE,
+        queries.COPY_ASSIGNMENTS_TO_IDS,
+        queries.DROP_CUSTOMER_PRODUCTS_TABLE,
+        queries.RENAME_CUSTOMER_PRODUCTS_BY_ID_TABLE,
+        queries.CREATE_ASSIGNMENT_PRODUCT_ID_INDEX,
+    ],
+
+    # Version 6. Create the payment_aging table that keeps each customer's 30 / 60 / 90 day late bucket, fill it from
+    # the customers' last payments, and add the triggers that keep it up to date as customers are added and pay.
+    # NOTE: The table is filled before it is indexed, so the indexes are built once instead of row by row.
+    [
+        queries.CREATE_PAYMENT_AGING_TABLE,
+        queries.FILL_PAYMENT_AGING,
+        queries.CREATE_AGING_BUCKET_INDEX,
+        queries.CREATE_AGING_NEXT_CHANGE_INDEX,
+        queries.CREATE_AGING_INSERT_TRIGGER,
+        queries.CREATE_AGING_UPDATE_TRIGGER,
+    ],
+
+    # Version 7. Create the customer_search full-text index over each customer's name, location and phone number,
+    # index the existing customers, and add the triggers that keep it in sync with the customers table.
+    [
+        queries.CREATE_CUSTOMER_SEARCH_TABLE,
+        queries.REBUILD_CUSTOMER_SEARCH,
+        queries.CREATE_SEARCH_INSERT_TRIGGER,
+        queries.CREATE_SEARCH_DELETE_TRIGGER,
+        queries.CREATE_SEARCH_UPDATE_TRIGGER,
+    ],
+
+    # Version 8. Create the revenue rollup tables that keep the monthly recurring revenue of every product, product type
+    # and customer location, fill them from the existing assignments, and add the triggers that keep them up to date.
+    [
+        queries.CREATE_REVENUE_BY_PRODUCT_TABLE,
+        queries.CREATE_REVENUE_BY_PRODUCT_TYPE_TABLE,
+        queries.CREATE_REVENUE_BY_LOCATION_TABLE,
+        queries.FILL_REVENUE_BY_PRODUCT,
+        queries.FILL_REVENUE_BY_PRODUCT_TYPE,
+        queries.FILL_REVENUE_BY_LOCATION,
+        queries.CREATE_REVENUE_ASSIGNMENT_INSERT_TRIGGER,
+        queries.CREATE_REVENUE_ASSIGNMENT_DELETE_TRIGGER,
+        queries.CREATE_REVENUE_CUSTOMER_DELETE_TRIGGER,
+        queries.CREATE_REVENUE_PRODUCT_DELETE_TRIGGER,
+        queries.CREATE_REVENUE_PRODUCT_BEFORE_UPDATE_TRIGGER,
+        queries.CREATE_REVENUE_PRODUCT_AFTER_UPDATE_TRIGGER,
+        queries.CREATE_REVENUE_CUSTOMER_BEFORE_UPDATE_TRIGGER,
+        queries.CREATE_REVENUE_CUSTOMER_AFTER_UPDATE_TRIGGER,
+    ],
+]
+
+
+# The schema version a fully migrated database file is at.
+SCHEMA_VERSION = len(MIGRATIONS)
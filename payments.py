@@ -0,0 +1,144 @@
+# NOTE: This file contains the bulk payment posting. Instead of updating one customer's last payment at a time through
+# option 5, every payment in the bank's daily remittance file (CSV or JSONL) is matched to its customer and posted in
+# chunks, with one lookup and one transaction per chunk.
+#
+# Usage: python payments.py remittance.csv [--errors unmatched.csv] [--chunk-size 5000]
+#
+# Each row has a payment_date in the same mm-dd-YYYY format the prompts use and either a customer_id or the customer's
+# name and location. A payment only moves a customer's last payment forward, so a payment older than the one already
+# recorded is skipped. Rows that are invalid or don't match a customer are written to an error file with the reason.
+
+import argparse
+import time
+
+import bulk_import
+import database
+import validation
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+PAYMENT_FIELDS = ["customer_id", "name", "location", "payment_date"]
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# VALIDATION FUNCTIONS 👇 ---------------------------------------------------------------------------------------#
+
+# Function used to validate a payment row and convert it into the customer it is for and the payment's timestamp.
+# The customer is an id, or a (name, location) combination when the row has no id.
+# Returns the customer, the timestamp and None if the row is valid, or None, None and the reason it was rejected.
+def validate_row(row):
+    customer_id, name, location, payment_date = (str(row.get(field) or "").strip() for field in PAYMENT_FIELDS)
+
+    if customer_id:
+        if not customer_id.isdigit():
+            return None, None, "customer_id must be a whole number"
+        customer = int(customer_id)
+    elif name and location:
+        customer = (name, location)
+    else:
+        return None, None, "missing customer_id or name and location"
+
+    try:
+        return customer, validation.parse_date(payment_date), None
+    except ValueError as error:
+        return None, None, f"payment date {error}"
+
+# POSTING FUNCTIONS 👇 ------------------------------------------------------------------------------------------#
+
+# Function used to post one chunk of validated payments. The chunk's customers are looked up with one query for ids
+# and one for names and locations, and the payments that match are posted in one transaction.
+# Returns the number of customers updated and the number of payments skipped for not being newer.
+def post_chunk(chunk, write_error):
+    by_id = database.find_customers_by_id({customer for customer, timestamp, row in chunk if isinstance(customer, int)})
+    by_location = database.find_customers_at_locations(
+        list({customer for customer, timestamp, row in chunk if isinstance(customer, tuple)}))
+
+    payments = []
+    skipped = 0
+    for customer, timestamp, row in chunk:
+        # NOTE: A customer can exist with no last payment (NULL), so whether the customer was found is checked by key
+        # rather than by the last payment being None.
+        if isinstance(customer, int):
+            found = customer in by_id
+            id, last_payment = customer, by_id.get(customer)
+        else:
+            found = customer in by_location
+            id, last_payment = by_location.get(customer, (None, None))
+
+        if not found:
+            write_error(row, "no matching customer")
+        elif last_payment is not None and timestamp <= last_payment:
+            skipped += 1
+        else:
+            payments.append((timestamp, id))
+
+    # NOTE: The payments are posted in customer id order so each update lands near the last one in the customers table
+    # and its indexes instead of jumping around the file. The update itself also only moves last payments forward, so
+    # a customer paid twice in one chunk keeps the latest payment and one paid by someone else since the lookup isn't
+    # moved back. Those payments are counted as skipped too.
+    payments.sort(key=lambda payment: payment[1])
+    posted = database.post_payments(payments)
+    return posted, skipped + len(payments) - posted
+
+
+# Function used to post every payment in a remittance file. Valid rows are gathered into chunks that are each posted
+# in one transaction, and rejected rows are written to the error file.
+# Returns the number of customers updated, the number of payments skipped for not being newer, the number of rows
+# rejected, and the time taken in seconds.
+def post_payments(path, error_path, format=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    format = bulk_import.file_format(path, format)
+    posted = skipped = rejected = 0
+    start = time.perf_counter()
+
+    with open(path, newline="", encoding="utf-8") as file, open(error_path, "w", newline="", encoding="utf-8") as error_file:
+        error_writer = bulk_import.open_error_writer(error_file, format, PAYMENT_FIELDS)
+
+        # Rejected rows are counted as they are written so the error file and the summary always agree.
+        def write_error(row, error):
+            nonlocal rejected
+            rejected += 1
+            error_writer(row, error)
+
+        chunk = []
+        for row in bulk_import.read_rows(file, format, write_error):
+            customer, timestamp, error = validate_row(row)
+            if error:
+                write_error(row, error)
+                continue
+
+            chunk.append((customer, timestamp, row))
+            if len(chunk) == chunk_size:
+                chunk_posted, chunk_skipped = post_chunk(chunk, write_error)
+                posted += chunk_posted
+                skipped += chunk_skipped
+                chunk = []
+
+        if chunk:
+            chunk_posted, chunk_skipped = post_chunk(chunk, write_error)
+            posted += chunk_posted
+            skipped += chunk_skipped
+
+    return posted, skipped, rejected, time.perf_counter() - start
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post the payments in a remittance file to the customers' last payments.")
+    parser.add_argument("path", help="CSV or JSONL remittance file of payments to post")
+    parser.add_argument("--errors", help="file unmatched and invalid rows are written to (default: <path>.rejected)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="file format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="payments posted per transaction")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    args = parser.parse_args()
+
+    error_path = args.errors or f"{args.path}.rejected"
+
+    if args.database:
+        database.use_database(args.database)
+    posted, skipped, rejected, elapsed = post_payments(args.path, error_path, args.format, args.chunk_size)
+
+    print(f"Posted {posted} payments in {elapsed:.2f}s ({posted / max(elapsed, 1e-9):,.0f} rows/s).")
+    if skipped:
+        print(f"{skipped} payments skipped, not newer than the customer's last payment")
+    if rejected:
+        print(f"{rejected} rows unmatched or rejected, see {error_path}")
@@ -1,250 +1,347 @@
-
-# NOTE: This file contains all of the prompts used to gather user input for a multitude of different functions across
-# the main file. This is the only file in the application that takes user input.
-
-import other_functions
-from datetime import datetime
-
-# INSERT PROMPTS 👇 ---------------------------------------------------------------------------------------------#
-
-# Prompt used for gathering customer information from user input
-# Prompt takes a customer's name, phone number, location, card number, the date they signed
-# up, and the last date they made a payment.
-# NOTE: A customer can have multiple entries as long as their location is unique for each entry.
-def prompt_add_customer():
-
-    name = input("\nCustomer's name: ")
-
-    phone_num = input("Phone number (XXX-XXX-XXXX format): ")
-    # The application loops until the user enters a valid phone number in XXX-XXX-XXXX format.
-    while not other_functions.valid_phone_number(phone_num):
-            phone_num = input("Phone number (XXX-XXX-XXXX format): ")
-
-    location = input("Location: ")
-
-    card_num = input("Customer's card number (enter number with no dashes): ")
-    # The application loops until the user enters a valid card number length.
-    while len(card_num) < 13 or len(card_num) > 19:
-        card_num = input("Customer's card number (enter number with no dashes): ")
-    
-    sign_up = input("Customer sign-up date (mm-dd-YYYY): ")
-    # The application loops until the user enters a valid date in mm-dd-YYYY format.
-    while not other_functions.valid_date(sign_up):
-            sign_up = input("Customer sign-up date (mm-dd-YYYY): ")
-
-    # The sign up date is converted into a timestamp in order to be used properly in SQLite queries.
-    sign_up_date = datetime.strptime(sign_up, "%m-%d-%Y")
-    sign_up_timestamp = sign_up_date.timestamp()
-
-    last_payment = input("Date of last payment (mm-dd-YYYY): ")
-    # The application loops until the user enters a valid date in mm-dd-YYYY format.
-    while not other_functions.valid_date(last_payment):
-            last_payment = input("Date of last payment (mm-dd-YYYY): ")
-
-    # The last payment date is converted into a timestamp in order to be used properly in SQLite queries. 
-    last_payment_date = datetime.strptime(last_payment, "%m-%d-%Y")
-    last_payment_timestamp = last_payment_date.timestamp()
-
-    # The prompt returns the inputs which will be used to fill the corresponding fields in the customers 
-    # table.
-    return name, phone_num, location, str(card_num), sign_up_timestamp, last_payment_timestamp
-
-
-# Prompt used for gathering product information from user input
-# Prompt takes a product's name, if that product is a piece of equipment or a service, and
-# its setup price (if equipment) / monthly fee (if service).
-def prompt_add_product():
-
-    product = input("\nProduct's name: ")
-
-    product_type =  input("Equipment or Service: ").strip().lower()
-    # The application loops until a valid product type is entered.
-    while True:
-        if product_type == "equipment" or product_type == "service":
-            break
-        else:
-            product_type =  input("Equipment or Service: ").strip().lower()
-
-    # If the product is a piece of equipment, the price is set to $0 as the equipment is complementary.
-    if product_type == "equipment":
-        price = 0
-
-    # If the product is a service, then the user must manually enter the product's monthly fee.
-    else:
-
-        # The application loops until a floating point number is entered. 
-        while True:
-            try:
-                price = round((float(input("Service monthly fee: $"))), 2)
-                break
-            except ValueError:
-                print("Enter a number!")
-
-    # The prompt returns the inputs which will be used to fill the corresponding fields in the products 
-    # table.
-    return product, product_type.capitalize(), price
-
-
-# Prompt used for gathering customer information from user input to add to customer_products table.
-# Prompt takes a customer's name and location as input
-def prompt_add_customer_name_location():
-    
-    customer_to_assign = input("Enter customer name: ")
-    location_to_assign = input("Enter customer's location: ")
-
-    return customer_to_assign, location_to_assign
-
-
-# Prompt used for gathering customer information from user input to add to customer_products table.
-# Prompt takes a customer's name and location as input
-def prompt_add_product_name_price():
-    
-    product_to_assign = input("Choose product to assign to customer: ")
-    
-    # The application loops until a floating point number is entered. 
-    while True:
-        try:
-            price_to_assign = round((float(input("Choose a price to assign to customer: "))), 2)
-            break
-
-        # If a non-integer is inputted from the user, the application loops again.
-        except ValueError:
-            print("Enter a number!")
-
-    return product_to_assign, price_to_assign
-
-# VIEW PROMPTS 👇 -----------------------------------------------------------------------------------------------#
-
-# Prompt used to view customers in database. What customers are returned depend on the option selected by the user.
-def prompt_view_customers(title, customers):
-    print(f"\n🛜------{title}-----🛜")
-    for id, name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp in customers:
-
-        # Process to convert the last payment timestamp back into the proper mm-dd-YYYY format.
-        sign_up_object = datetime.fromtimestamp(sign_up_timestamp)
-        sign_up_date = sign_up_object.strftime("%b %d %Y")
-
-        # Process to convert the last payment timestamp back into the proper mm-dd-YYYY format.
-        last_payment_object = datetime.fromtimestamp(last_payment_timestamp)
-        last_payment_date = last_payment_object.strftime("%b %d %Y")
-
-        print(f"{id}. | Name: {name} | Phone: {phone_num} | Address: {location} | Card: {card_num} | Joined: {sign_up_date} | Last Payment: {last_payment_date}")
-    print("---------------------------")
-
-
-# Prompt used to view products in database. What customers are returned depend on the option selected by the user.
-def prompt_view_products(title, products):
-    print(f"\n🛜------{title}-----🛜")
-    for id, product, product_type, price in products:
-        print(f"{id}. | Name: {product} | Type: {product_type} | Price: {price}")
-    print("---------------------------")
-
-
-# Prompt used to view product assignments in database.
-def prompt_view_assignments(title, assignments):
-    print(f"\n🛜------{title}-----🛜")
-    for id, customer_name, customer_location, product_name, product_price in assignments:
-        print(f"{id}. | Name: {customer_name} | Location: {customer_location} | Product: {product_name} | Price: {product_price}")
-    print("---------------------------")
-
-
-# Prompt used to view a specified customer's monthly bill.
-def prompt_view_monthly_bill(title, bill):
-    print(f"\n🛜------{title}-----🛜")
-    for bill in bill:
-        print(f"💵------------${bill[0]}----------💵")
-    print("---------------------------------")
-
-# DELETE / UPDATE PROMPTS 👇 ----------------------------------------------------------------------------------#
-
-# Prompt used to choose a customer to remove from the database, to have their last payment date updated, or to
-# have their monthly bill displayed.
-def prompt_choose_customer(remove=False, update=False, bill=False):
-
-    if remove:
-        name = input("\nEnter name of customer to remove: ")
-        return name
-    
-    elif update:
-        name = input("\nEnter name of customer to update last made payment: ")
-        return name
-    
-    elif bill:
-        name = input("\nEnter name of customer to view monthly bill: ")
-        return name
-
-
-# Prompt used to update a customer's last made payment.
-def prompt_update_last_payment():
-
-    last_payment = input("\nDate of last payment (mm-dd-YYYY): ")
-    # The application loops until the user enters a valid date in mm-dd-YYYY format.
-    while not other_functions.valid_date(last_payment):
-            last_payment = input("Date of last payment (mm-dd-YYYY): ")
-
-    # The new last payment date is converted into a timestamp in order to be used properly in SQLite queries.
-    last_payment_date = datetime.strptime(last_payment, "%m-%d-%Y")
-    last_payment_timestamp = last_payment_date.timestamp()
-
-    # The last payment date is also updated to a string in a seperate variable which will be used in the print
-    # statement when a last payment date is updated.
-    last_payment_date = last_payment_date.strftime("%m-%d-%Y")
-
-    # The newly updated last payment date timestamp is returned.
-    return last_payment_timestamp, last_payment_date
-
-
-# Prompt used to choose a product either to remove from the products table. or to have its price updated.
-def prompt_choose_product(remove=False, update=False):
-
-    if remove:
-        name = input("\nEnter name of product to remove: ")
-        return name
-    
-    elif update:
-        name = input("\nEnter name of product to update price: ")
-        return name
-
-
-# Prompt used to update a product's price.
-def prompt_update_price():
-    print("")
-
-    # The application loops until a floating point number is entered
-    while True:
-        try:
-            price = round((float(input("New price of product ($): "))), 2)
-            break
-        except ValueError:
-            print("Enter a number!")
-
-    # The newly updated product price is returned.
-    return price
-
-
-# Prompt used to choose a product assignment to remove from the customer_products table.
-def prompt_remove_assignment():
-
-    #  The application loops until an integer is entered.
-    while True:
-
-        try:
-            id = int(input("\nEnter assignment to remove (id): "))
-            break
-
-        except ValueError:
-            print("Enter a number!")
-
-    return id
-
-
-# Prompt used to choose entry ID for a multitude of functions spanning all 3 tables of the database.
-def prompt_choose_id(remove=False, update=False):
-
-    if remove:
-        id = int(input("\nChoose entry to remove (id): "))
-        return id
-    
-    elif update:
-        name = int(input("Choose entry to update (id): "))
-        return name
+
+# NOTE: This file contains all of the prompts used to gather user input for a multitude of different functions across
+# the main file. This is the only file in the application that takes user input.
+
+import render
+import validation
+from datetime import datetime
+
+# NOTE: readline isn't available on every platform (such as Windows). Without it customer names can't be completed with
+# Tab, but the search matches are still listed after a name is entered.
+try:
+    import readline
+except ImportError:
+    readline = None
+
+# INSERT PROMPTS 👇 ---------------------------------------------------------------------------------------------#
+
+# Prompt used for gathering customer information from user input
+# Prompt takes a customer's name, phone number, location, card number, the date they signed
+# up, and the last date they made a payment.
+# NOTE: A customer can have multiple entries as long as their location is unique for each entry.
+def prompt_add_customer():
+
+    name = input("\nCustomer's name: ")
+
+    # The application loops until the user enters a valid phone number in XXX-XXX-XXXX format.
+    phone_num = prompt_valid("Phone number (XXX-XXX-XXXX format): ", "phone number", validation.parse_phone_number)
+
+    location = input("Location: ")
+
+    # The application loops until the user enters a card number of 13 to 19 digits.
+    card_num = prompt_valid("Customer's card number (enter number with no dashes): ", "card number", validation.parse_card_number)
+
+    # The application loops until the user enters a valid date in mm-dd-YYYY format. The dates are converted into
+    # timestamps in order to be used properly in SQLite queries.
+    sign_up_timestamp = prompt_valid("Customer sign-up date (mm-dd-YYYY): ", "sign-up date", validation.parse_date)
+    last_payment_timestamp = prompt_valid("Date of last payment (mm-dd-YYYY): ", "last payment date", validation.parse_date)
+
+    # The prompt returns the inputs which will be used to fill the corresponding fields in the customers 
+    # table.
+    return name, phone_num, location, str(card_num), sign_up_timestamp, last_payment_timestamp
+
+
+# Prompt used to ask for a value until one passes its parse function from validation.py. Returns the parsed value
+# (for a date, its timestamp).
+def prompt_valid(message, label, parse):
+    while True:
+        try:
+            return parse(input(message).strip())
+        except ValueError as error:
+            print(f"{label.capitalize()} {error}!")
+
+
+# Prompt used for gathering product information from user input
+# Prompt takes a product's name, if that product is a piece of equipment or a service, and
+# its setup price (if equipment) / monthly fee (if service).
+def prompt_add_product():
+
+    product = input("\nProduct's name: ")
+
+    product_type =  input("Equipment or Service: ").strip().lower()
+    # The application loops until a valid product type is entered.
+    while True:
+        if product_type == "equipment" or product_type == "service":
+            break
+        else:
+            product_type =  input("Equipment or Service: ").strip().lower()
+
+    # If the product is a piece of equipment, the price is set to $0 as the equipment is complementary.
+    if product_type == "equipment":
+        price = 0
+
+    # If the product is a service, then the user must manually enter the product's monthly fee.
+    else:
+
+        # The application loops until a floating point number is entered. 
+        while True:
+            try:
+                price = round((float(input("Service monthly fee: $"))), 2)
+                break
+            except ValueError:
+                print("Enter a number!")
+
+    # The prompt returns the inputs which will be used to fill the corresponding fields in the products 
+    # table.
+    return product, product_type.capitalize(), price
+
+
+# Prompt used for gathering customer information from user input to add to customer_products table.
+# Prompt takes a customer's name and location as input
+def prompt_add_customer_name_location():
+    
+    customer_to_assign = input("Enter customer name: ")
+    location_to_assign = input("Enter customer's location: ")
+
+    return customer_to_assign, location_to_assign
+
+
+# Prompt used for gathering customer information from user input to add to customer_products table.
+# Prompt takes a customer's name and location as input
+def prompt_add_product_name_price():
+    
+    product_to_assign = input("Choose product to assign to customer: ")
+    
+    # The application loops until a floating point number is entered. 
+    while True:
+        try:
+            price_to_assign = round((float(input("Choose a price to assign to customer: "))), 2)
+            break
+
+        # If a non-integer is inputted from the user, the application loops again.
+        except ValueError:
+            print("Enter a number!")
+
+    return product_to_assign, price_to_assign
+
+# VIEW PROMPTS 👇 -----------------------------------------------------------------------------------------------#
+
+# NOTE: The view prompts write their listings through render.render_table(), which lines the entries up in columns,
+# writes them in large blocks and pages long listings.
+
+CUSTOMER_COLUMNS = ["ID", "Name", "Phone", "Address", "Card", "Joined", "Last Payment"]
+
+PRODUCT_COLUMNS = ["ID", "Name", "Type", "Price"]
+
+ASSIGNMENT_COLUMNS = ["ID", "Name", "Location", "Product", "Price"]
+
+
+# Prompt used to view customers in database. What customers are returned depend on the option selected by the user.
+def prompt_view_customers(title, customers):
+
+    # The sign up and last payment timestamps are converted back into dates (such as Jan 05 2024).
+    def convert_row(customer):
+        id, name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp = customer
+        return (str(id), name, phone_num, location, str(card_num), render.format_date(sign_up_timestamp),
+                render.format_date(last_payment_timestamp))
+
+    render.render_table(title, CUSTOMER_COLUMNS, customers, convert_row)
+
+
+# Prompt used to view products in database. What customers are returned depend on the option selected by the user.
+def prompt_view_products(title, products):
+    render.render_table(title, PRODUCT_COLUMNS, products)
+
+
+# Prompt used to view product assignments in database.
+def prompt_view_assignments(title, assignments):
+    render.render_table(title, ASSIGNMENT_COLUMNS, assignments)
+
+
+# Prompt used to view a specified customer's monthly bill.
+def prompt_view_monthly_bill(title, bill):
+    render.render_table(title, ["Monthly Bill"], bill, lambda bill: (f"💵 ${bill[0]}", ))
+
+# PAGING PROMPTS 👇 ---------------------------------------------------------------------------------------------#
+
+# Prompt used to choose an optional filter for a paged listing. Returns None if the user leaves it blank so the
+# listing shows every entry.
+def prompt_choose_filter(location=False, product_type=False):
+
+    if location:
+        location = input("\nFilter by location (leave blank for all): ").strip()
+        return location or None
+
+    elif product_type:
+        product_type = input("\nFilter by Equipment or Service (leave blank for all): ").strip().lower()
+        return product_type.capitalize() or None
+
+
+# Prompt used to page through a listing instead of printing every entry at once. fetch_page is called with the id
+# that a page starts after and returns the page's rows and whether there is another page after it. view_page is the
+# view prompt used to display the rows (prompt_view_customers, prompt_view_products or prompt_view_assignments).
+def prompt_page_through(title, fetch_page, view_page):
+
+    # The id each visited page starts after is kept so the user can step back through the pages they have seen.
+    page_starts = [0]
+
+    # The application loops until the user presses Enter to return to the menu.
+    while True:
+        rows, has_next_page = fetch_page(page_starts[-1])
+        if rows:
+            view_page(f"{title} (ids {rows[0][0]}-{rows[-1][0]})", rows)
+        else:
+            view_page(title, rows)
+
+        choice = input("n = next page, p = previous page, j <id> = jump to id, Enter = back to menu: ").strip().lower()
+
+        if choice == "":
+            break
+
+        elif choice == "n":
+            if has_next_page:
+                page_starts.append(rows[-1][0])
+            else:
+                print("Already on the last page!")
+
+        elif choice == "p":
+            if len(page_starts) > 1:
+                page_starts.pop()
+            else:
+                print("Already on the first page!")
+
+        # Jumping to an id shows the page starting at the first entry with that id or higher.
+        elif choice.startswith("j"):
+            try:
+                page_starts.append(int(choice[1:]) - 1)
+            except ValueError:
+                print("Enter an id to jump to! (e.g. j 250)")
+
+        else:
+            print("Invalid selection!")
+
+# DELETE / UPDATE PROMPTS 👇 ----------------------------------------------------------------------------------#
+
+# Prompt used to choose a customer to remove from the database, to have their last payment date updated, or to
+# have their monthly bill displayed.
+# NOTE: If a search function is given (database.search_customers), the user can type part of a customer's name,
+# location or phone number and pick from the best matches instead of typing the exact name.
+def prompt_choose_customer(remove=False, update=False, bill=False, search=None):
+
+    if remove:
+        name = prompt_customer_name("\nEnter name of customer to remove: ", search)
+    
+    elif update:
+        name = prompt_customer_name("\nEnter name of customer to update last made payment: ", search)
+    
+    elif bill:
+        name = prompt_customer_name("\nEnter name of customer to view monthly bill: ", search)
+
+    if search:
+        name = prompt_choose_search_match(name, search)
+    return name
+
+
+# Prompt used to read a customer name. While typing, the user can press Tab to list or complete the names of the
+# customers best matching what they have typed so far.
+def prompt_customer_name(message, search):
+    if not (search and readline):
+        return input(message)
+
+    # The completer is called with state 0, 1, 2, ... until it returns None, so the matches are searched once on state 0.
+    names = []
+    def complete(text, state):
+        if state == 0:
+            names[:] = dict.fromkeys(name for id, name, *fields in search(text)) if text.strip() else []
+        return names[state] if state < len(names) else None
+
+    # The whole line is completed (not just the last word), since names contain spaces.
+    previous_completer, previous_delims = readline.get_completer(), readline.get_completer_delims()
+    readline.set_completer(complete)
+    readline.set_completer_delims("")
+    readline.parse_and_bind("tab: complete")
+    try:
+        return input(message)
+    finally:
+        readline.set_completer(previous_completer)
+        readline.set_completer_delims(previous_delims)
+
+
+# Prompt used to pick a customer from the best search matches when what the user typed isn't a customer's exact name.
+# Returns the name of the customer picked, or what was typed if there are no matches or the user doesn't pick one.
+def prompt_choose_search_match(text, search):
+    matches = search(text)
+    if not matches or any(name == text for id, name, *fields in matches):
+        return text
+
+    print(f"\n🔎------Customers matching \"{text}\"-----🔎")
+    for number, (id, name, phone_num, location, *fields) in enumerate(matches, start=1):
+        print(f"{number}. | Name: {name} | Phone: {phone_num} | Address: {location}")
+    print("---------------------------")
+
+    choice = input("Choose a match # (Enter to keep what you typed): ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(matches):
+        return matches[int(choice) - 1][1]
+    return text
+
+
+# Prompt used to update a customer's last made payment.
+def prompt_update_last_payment():
+
+    # The application loops until the user enters a valid date in mm-dd-YYYY format. The new last payment date is
+    # converted into a timestamp in order to be used properly in SQLite queries.
+    print()
+    last_payment_timestamp = prompt_valid("Date of last payment (mm-dd-YYYY): ", "last payment date", validation.parse_date)
+
+    # The last payment date is also kept as a string in a seperate variable which will be used in the print
+    # statement when a last payment date is updated.
+    last_payment_date = datetime.fromtimestamp(last_payment_timestamp).strftime("%m-%d-%Y")
+
+    # The newly updated last payment date timestamp is returned.
+    return last_payment_timestamp, last_payment_date
+
+
+# Prompt used to choose a product either to remove from the products table. or to have its price updated.
+def prompt_choose_product(remove=False, update=False):
+
+    if remove:
+        name = input("\nEnter name of product to remove: ")
+        return name
+    
+    elif update:
+        name = input("\nEnter name of product to update price: ")
+        return name
+
+
+# Prompt used to update a product's price.
+def prompt_update_price():
+    print("")
+
+    # The application loops until a floating point number is entered
+    while True:
+        try:
+            price = round((float(input("New price of product ($): "))), 2)
+            break
+        except ValueError:
+            print("Enter a number!")
+
+    # The newly updated product price is returned.
+    return price
+
+
+# Prompt used to choose a product assignment to remove from the customer_products table.
+def prompt_remove_assignment():
+
+    #  The application loops until an integer is entered.
+    while True:
+
+        try:
+            id = int(input("\nEnter assignment to remove (id): "))
+            break
+
+        except ValueError:
+            print("Enter a number!")
+
+    return id
+
+
+# Prompt used to choose entry ID for a multitude of functions spanning all 3 tables of the database.
+def prompt_choose_id(remove=False, update=False):
+
+    if remove:
+        id = int(input("\nChoose entry to remove (id): "))
+        return id
+    
+    elif update:
+        name = int(input("Choose entry to update (id): "))
+        return name
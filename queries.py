@@ -1,112 +1,609 @@
- 
-# NOTE: This file contains all the SQLite queries that are needed for every present functionality in the application.
-
-# CREATE STATEMENTS 👇 ------------------------------------------------------------------------------------------#
-
-CREATE_CUSTOMERS_TABLE = """CREATE TABLE IF NOT EXISTS customers(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    phone_num VARCHAR(12),
-    location TEXT,
-    card_num TEXT,
-    sign_up_date REAL,
-    last_payment REAL,
-    UNIQUE(name, location));"""
-
-
-CREATE_PRODUCTS_TABLE = """CREATE TABLE IF NOT EXISTS products(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    product TEXT,
-    product_type TEXT,
-    price FLOAT,
-    UNIQUE(product, price));"""
-
-
-CREATE_CUSTOMER_PRODUCTS_TABLE = """CREATE TABLE IF NOT EXISTS customer_products(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    customer_name TEXT,
-    customer_location TEXT,
-    product_name TEXT,
-    product_price FLOAT,
-    unique(customer_name, customer_location, product_name, product_price),
-    FOREIGN KEY (customer_name, customer_location) REFERENCES customers(name, location) ON DELETE CASCADE ON UPDATE CASCADE,
-    FOREIGN KEY (product_name, product_price) REFERENCES products(product, price) ON DELETE CASCADE ON UPDATE CASCADE);"""
-
-# INSERT STATEMENTS 👇 ----------------------------------------------------------------------------------------#
-
-INSERT_CUSTOMER = """INSERT INTO customers(name, phone_num, location, card_num, sign_up_date, last_payment)
-    VALUES (?, ?, ?, ?, ?, ?);"""
-
-
-INSERT_PRODUCT = "INSERT INTO products(product, product_type, price) VALUES (?, ?, ?);"
-
-
-ASSIGN_PRODUCT_TO_CUSTOMER = "INSERT INTO customer_products(customer_name, customer_location, product_name, product_price) VALUES (?, ?, ?, ?);"
-
-# VIEW STATEMENTS 👇 ----------------------------------------------------------------------------------------#
-
-VIEW_ALL_CUSTOMERS = "SELECT id, name, phone_num, location, card_num, sign_up_date, last_payment FROM customers;"
-
-
-VIEW_ALL_PRODUCTS = "SELECT id, product, product_type, price FROM products;"
-
-
-VIEW_ALL_ASSIGNMENTS = "SELECT id, customer_name, customer_location, product_name, product_price FROM customer_products;"
-
-
-VIEW_CUSTOMER_INFO = "SELECT id, name, phone_num, location, card_num, sign_up_date, last_payment FROM customers WHERE name = ?;"
-
-
-VIEW_PRODUCT_INFO = "SELECT id, product, product_type, price FROM products WHERE product = ?;"
-
-
-VIEW_LATE_CUSTOMERS = "SELECT id, name, phone_num, location, card_num, sign_up_date, last_payment FROM customers WHERE last_payment < ?;"
-
-
-VIEW_CUSTOMER_NAME_LOCATION = "SELECT name, location FROM customers WHERE id = ?;"
-
-# DELETE STATEMENTS 👇 ----------------------------------------------------------------------------------------#
-
-REMOVE_CUSTOMER = "DELETE FROM customers WHERE id = ? and name = ?;"
-
-
-REMOVE_PRODUCT = "DELETE FROM products WHERE id = ? and product = ?;"
-
-
-REMOVE_ASSIGNMENT = "DELETE FROM customer_products WHERE id = ?"
-
-# UPDATE STATEMENTS 👇 ----------------------------------------------------------------------------------------#
-
-UPDATE_LAST_PAYMENT = "UPDATE customers SET last_payment = ? WHERE id = ?;"
-
-
-UPDATE_PRICE = "UPDATE products SET price = ? WHERE id = ?;"
-
-# CHECK STATEMENTS 👇 -----------------------------------------------------------------------------------------#
-
-CHECK_CUSTOMER_EXISTS_AT_LOCATION = "SELECT * FROM customers WHERE name = ? AND location = ?;"
-
-
-CHECK_PRODUCT_AND_PRICE_EXISTS = "SELECT * FROM products WHERE product = ? AND price = ?;"
-
-
-CHECK_CUSTOMER_ASSIGNMENT_EXISTS = "SELECT * FROM customer_products WHERE customer_name = ?;"
-
-
-CHECK_CUSTOMER_ID = "SELECT * FROM customers WHERE id = ? AND name = ?;"
-
-
-CHECK_PRODUCT_ID = "SELECT * FROM products WHERE id = ? and product = ?;"
-
-
-CHECK_ASSIGNMENT_ID = "SELECT * FROM customer_products WHERE id = ?;"
-
-
-CHECK_CUSTOMER_EXISTS = "SELECT * FROM customers WHERE name = ?;"
-
-
-CHECK_PRODUCT_EXISTS = "SELECT * FROM products WHERE product = ?;"
-
-# SUM STATEMENT 👇 -----------------------------------------------------------------------------------------#
-
-CUSTOMER_TOTAL_BILL = "SELECT printf(\"%.2f\", SUM(product_price)) FROM customer_products WHERE customer_name = ?;"
+ 
+# NOTE: This file contains all the SQLite queries that are needed for every present functionality in the application.
+
+# CREATE STATEMENTS 👇 ------------------------------------------------------------------------------------------#
+
+CREATE_CUSTOMERS_TABLE = """CREATE TABLE IF NOT EXISTS customers(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    phone_num VARCHAR(12),
+    location TEXT,
+    card_num TEXT,
+    sign_up_date REAL,
+    last_payment REAL,
+    UNIQUE(name, location));"""
+
+
+CREATE_PRODUCTS_TABLE = """CREATE TABLE IF NOT EXISTS products(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product TEXT,
+    product_type TEXT,
+    price FLOAT,
+    UNIQUE(product, price));"""
+
+
+# NOTE: This is the original shape of the customer_products table, which is only used by migration 1. Migration 5
+# rebuilds it as CREATE_CUSTOMER_PRODUCTS_BY_ID_TABLE below.
+CREATE_CUSTOMER_PRODUCTS_TABLE = """CREATE TABLE IF NOT EXISTS customer_products(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_name TEXT,
+    customer_location TEXT,
+    product_name TEXT,
+    product_price FLOAT,
+    unique(customer_name, customer_location, product_name, product_price),
+    FOREIGN KEY (customer_name, customer_location) REFERENCES customers(name, location) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (product_name, product_price) REFERENCES products(product, price) ON DELETE CASCADE ON UPDATE CASCADE);"""
+
+CREATE_BILLS_TABLE = """CREATE TABLE IF NOT EXISTS bills(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    billing_month TEXT,
+    customer_id INTEGER,
+    customer_name TEXT,
+    customer_location TEXT,
+    product_count INTEGER,
+    total FLOAT,
+    UNIQUE(billing_month, customer_id));"""
+
+# NOTE: Product assignments reference the customer and product by id. The customer name / location and product name /
+# price aren't copied into every assignment, and changing a product's price only has to update the products table.
+CREATE_CUSTOMER_PRODUCTS_BY_ID_TABLE = """CREATE TABLE customer_products_by_id(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    UNIQUE(customer_id, product_id),
+    FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE);"""
+
+# NOTE: Each customer's payment aging bucket: 0 (paid within the last 30 days), 30, 60 or 90 (90 or more days since
+# their last payment), and the time they move into the next bucket if they don't pay (NULL once they are in the 90 day
+# bucket). The table is kept up to date by the triggers and sweep below, so late customers are read from its index.
+CREATE_PAYMENT_AGING_TABLE = """CREATE TABLE IF NOT EXISTS payment_aging(
+    customer_id INTEGER PRIMARY KEY REFERENCES customers(id) ON DELETE CASCADE,
+    bucket INTEGER NOT NULL,
+    next_change REAL
+);"""
+
+# NOTE: Full-text index of each customer's name, location and phone number, used to find customers from part of what
+# the operator types. It is an external content table, so it only holds the index and reads the text from customers.
+# The prefix option also indexes the first 1, 2 and 3 characters of every word, so short prefixes are read from one
+# list in the index instead of merging the lists of every word they start.
+CREATE_CUSTOMER_SEARCH_TABLE = """CREATE VIRTUAL TABLE IF NOT EXISTS customer_search USING fts5(
+    name, location, phone_num,
+    content = 'customers', content_rowid = 'id', prefix = '1 2 3'
+);"""
+
+# MIGRATION STATEMENTS 👇 ---------------------------------------------------------------------------------------#
+
+# NOTE: Used by migration 5 to copy each product assignment into customer_products_by_id with the ids of the customer
+# and product it references. Every assignment keeps its id.
+COPY_ASSIGNMENTS_TO_IDS = """INSERT INTO customer_products_by_id(id, customer_id, product_id)
+    SELECT customer_products.id, customers.id, products.id FROM customer_products
+    JOIN customers ON customers.name = customer_products.customer_name AND customers.location = customer_products.customer_location
+    JOIN products ON products.product = customer_products.product_name AND products.price = customer_products.product_price;"""
+
+
+DROP_CUSTOMER_PRODUCTS_TABLE = "DROP TABLE customer_products;"
+
+
+RENAME_CUSTOMER_PRODUCTS_BY_ID_TABLE = "ALTER TABLE customer_products_by_id RENAME TO customer_products;"
+
+# INDEX STATEMENTS 👇 -------------------------------------------------------------------------------------------#
+
+# NOTE: Lookups on customers.name and products.product are already served by the indexes SQLite builds for each
+# table's UNIQUE constraint, since those columns come first in the constraint. The customer_products indexes on names
+# and prices below are only used by migrations 2 and 3; migration 5 drops them along with the columns they index.
+
+CREATE_LATE_PAYMENT_INDEX = "CREATE INDEX IF NOT EXISTS idx_customers_last_payment ON customers(last_payment);"
+
+
+CREATE_ASSIGNMENT_PRODUCT_INDEX = """CREATE INDEX IF NOT EXISTS idx_customer_products_product
+    ON customer_products(product_name, product_price);"""
+
+
+CREATE_CUSTOMER_LOCATION_INDEX = "CREATE INDEX IF NOT EXISTS idx_customers_location ON customers(location);"
+
+
+CREATE_ASSIGNMENT_LOCATION_INDEX = """CREATE INDEX IF NOT EXISTS idx_customer_products_location
+    ON customer_products(customer_location);"""
+
+
+# NOTE: Lookups by customer_id are served by the UNIQUE(customer_id, product_id) index.
+CREATE_ASSIGNMENT_PRODUCT_ID_INDEX = "CREATE INDEX IF NOT EXISTS idx_customer_products_product_id ON customer_products(product_id);"
+
+CREATE_AGING_BUCKET_INDEX = "CREATE INDEX IF NOT EXISTS idx_payment_aging_bucket ON payment_aging(bucket);"
+
+
+# NOTE: Only customers who can still move into a later bucket are indexed, so the sweep only looks at the ones due.
+CREATE_AGING_NEXT_CHANGE_INDEX = """CREATE INDEX IF NOT EXISTS idx_payment_aging_next_change
+    ON payment_aging(next_change) WHERE next_change IS NOT NULL;"""
+
+# NOTE: Used by migration 7 to index every existing customer.
+REBUILD_CUSTOMER_SEARCH = "INSERT INTO customer_search(customer_search) VALUES ('rebuild');"
+
+
+# NOTE: The triggers keep customer_search in sync with customers. An external content table has to be told the old
+# text of a row to remove it from the index, which is what the 'delete' inserts do.
+CREATE_SEARCH_INSERT_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_search_insert AFTER INSERT ON customers BEGIN
+    INSERT INTO customer_search(rowid, name, location, phone_num) VALUES (NEW.id, NEW.name, NEW.location, NEW.phone_num);
+END;"""
+
+
+CREATE_SEARCH_DELETE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_search_delete AFTER DELETE ON customers BEGIN
+    INSERT INTO customer_search(customer_search, rowid, name, location, phone_num)
+        VALUES ('delete', OLD.id, OLD.name, OLD.location, OLD.phone_num);
+END;"""
+
+
+CREATE_SEARCH_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_search_update AFTER UPDATE OF name, location, phone_num ON customers BEGIN
+    INSERT INTO customer_search(customer_search, rowid, name, location, phone_num)
+        VALUES ('delete', OLD.id, OLD.name, OLD.location, OLD.phone_num);
+    INSERT INTO customer_search(rowid, name, location, phone_num) VALUES (NEW.id, NEW.name, NEW.location, NEW.phone_num);
+END;"""
+
+# SCHEMA VERSION STATEMENTS 👇 ----------------------------------------------------------------------------------#
+
+GET_SCHEMA_VERSION = "PRAGMA user_version;"
+
+
+# NOTE: PRAGMA statements can't take bound parameters, so the version number is formatted into the statement.
+SET_SCHEMA_VERSION = "PRAGMA user_version = {version};"
+
+# INSERT STATEMENTS 👇 ----------------------------------------------------------------------------------------#
+
+# NOTE: Inserts that would break a UNIQUE constraint do nothing instead of raising an error, and each insert returns the
+# id of the new row. No row coming back means the entry was already present, so no separate check query is needed
+# before inserting and two operators adding the same entry at once can't both get past a check.
+
+INSERT_CUSTOMER = """INSERT INTO customers(name, phone_num, location, card_num, sign_up_date, last_payment)
+    VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(name, location) DO NOTHING RETURNING id;"""
+
+
+# NOTE: Used with executemany for bulk inserts, which can't return rows, so the number of rows inserted is read from
+# the cursor's rowcount instead.
+INSERT_CUSTOMERS = """INSERT INTO customers(name, phone_num, location, card_num, sign_up_date, last_payment)
+    VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(name, location) DO NOTHING;"""
+
+
+INSERT_PRODUCT = """INSERT INTO products(product, product_type, price) VALUES (?, ?, ?)
+    ON CONFLICT(product, price) DO NOTHING RETURNING id;"""
+
+
+# NOTE: Used with executemany by the synthetic data generator (generate_data.py).
+INSERT_PRODUCTS = """INSERT INTO products(product, product_type, price) VALUES (?, ?, ?)
+    ON CONFLICT(product, price) DO NOTHING;"""
+
+
+# NOTE: The customer and product ids are looked up from the customer name / location and product name / price inside
+# the insert. If either doesn't exist, nothing is inserted and no id is returned.
+ASSIGN_PRODUCT_TO_CUSTOMER = """INSERT INTO customer_products(customer_id, product_id)
+    SELECT customers.id, products.id FROM customers, products
+    WHERE customers.name = ? AND customers.location = ? AND products.product = ? AND products.price = ?
+    ON CONFLICT(customer_id, product_id) DO NOTHING RETURNING id;"""
+
+
+# NOTE: Used with executemany by the synthetic data generator, which already knows the customer and product ids.
+ASSIGN_PRODUCTS_BY_ID = """INSERT INTO customer_products(customer_id, product_id) VALUES (?, ?)
+    ON CONFLICT(customer_id, product_id) DO NOTHING;"""
+
+# VIEW STATEMENTS 👇 ----------------------------------------------------------------------------------------#
+
+VIEW_ALL_CUSTOMERS = "SELECT id, name, phone_num, location, card_num, sign_up_date, last_payment FROM customers;"
+
+
+VIEW_ALL_PRODUCTS = "SELECT id, product, product_type, price FROM products;"
+
+
+VIEW_ALL_ASSIGNMENTS = """SELECT customer_products.id, customers.name, customers.location, products.product, products.price FROM customer_products
+    JOIN customers ON customers.id = customer_products.customer_id
+    JOIN products ON products.id = customer_products.product_id
+    ORDER BY customer_products.id;"""
+
+
+VIEW_CUSTOMER_INFO = "SELECT id, name, phone_num, location, card_num, sign_up_date, last_payment FROM customers WHERE name = ?;"
+
+
+VIEW_PRODUCT_INFO = "SELECT id, product, product_type, price FROM products WHERE product = ?;"
+
+
+# NOTE: Reads the customers in the given aging bucket or later from the payment_aging index, latest bucket first.
+VIEW_LATE_CUSTOMERS = """SELECT customers.id, name, phone_num, location, card_num, sign_up_date, last_payment FROM payment_aging
+    JOIN customers ON customers.id = payment_aging.customer_id
+    WHERE bucket >= ? ORDER BY bucket DESC;"""
+
+
+VIEW_CUSTOMER_NAME_LOCATION = "SELECT name, location FROM customers WHERE id = ?;"
+
+# NOTE: Finds the customers matching a full-text query (see database.search_customers()), best match first. Matches in
+# the name count for more than matches in the location or phone number. Only the first matches (the first LIMIT in
+# id order) are ranked, since ranking every match of a short prefix across a million customers takes far longer than
+# the prompt can wait, and the customer being looked for is usually narrowed down by the next word typed.
+SEARCH_CUSTOMERS = """SELECT customers.id, customers.name, customers.phone_num, customers.location, customers.card_num,
+    customers.sign_up_date, customers.last_payment FROM (
+        SELECT rowid, bm25(customer_search, 10.0, 1.0, 1.0) AS score FROM customer_search
+        WHERE customer_search MATCH ? LIMIT ?
+    ) AS matches
+    JOIN customers ON customers.id = matches.rowid
+    ORDER BY score LIMIT ?;"""
+
+# PAGED VIEW STATEMENTS 👇 ------------------------------------------------------------------------------------#
+
+# NOTE: Pages are fetched with keyset pagination. Each page starts after the last id of the page before it, so a page
+# deep into a table is found with an index seek instead of counting past every row in front of it like OFFSET does.
+
+VIEW_CUSTOMERS_PAGE = """SELECT id, name, phone_num, location, card_num, sign_up_date, last_payment FROM customers
+    WHERE id > ? ORDER BY id LIMIT ?;"""
+
+
+VIEW_CUSTOMERS_AT_LOCATION_PAGE = """SELECT id, name, phone_num, location, card_num, sign_up_date, last_payment FROM customers
+    WHERE location = ? AND id > ? ORDER BY id LIMIT ?;"""
+
+
+VIEW_PRODUCTS_PAGE = "SELECT id, product, product_type, price FROM products WHERE id > ? ORDER BY id LIMIT ?;"
+
+
+VIEW_PRODUCTS_OF_TYPE_PAGE = """SELECT id, product, product_type, price FROM products
+    WHERE product_type = ? AND id > ? ORDER BY id LIMIT ?;"""
+
+
+VIEW_ASSIGNMENTS_PAGE = """SELECT customer_products.id, customers.name, customers.location, products.product, products.price FROM customer_products
+    JOIN customers ON customers.id = customer_products.customer_id
+    JOIN products ON products.id = customer_products.product_id
+    WHERE customer_products.id > ? ORDER BY customer_products.id LIMIT ?;"""
+
+
+VIEW_ASSIGNMENTS_AT_LOCATION_PAGE = """SELECT customer_products.id, customers.name, customers.location, products.product, products.price FROM customer_products
+    JOIN customers ON customers.id = customer_products.customer_id
+    JOIN products ON products.id = customer_products.product_id
+    WHERE customers.location = ? AND customer_products.id > ? ORDER BY customer_products.id LIMIT ?;"""
+
+# DELETE STATEMENTS 👇 ----------------------------------------------------------------------------------------#
+
+REMOVE_CUSTOMER = "DELETE FROM customers WHERE id = ? and name = ?;"
+
+
+REMOVE_PRODUCT = "DELETE FROM products WHERE id = ? and product = ?;"
+
+
+REMOVE_ASSIGNMENT = "DELETE FROM customer_products WHERE id = ?"
+
+# UPDATE STATEMENTS 👇 ----------------------------------------------------------------------------------------#
+
+UPDATE_LAST_PAYMENT = "UPDATE customers SET last_payment = ? WHERE id = ?;"
+
+
+UPDATE_PRICE = "UPDATE products SET price = ? WHERE id = ?;"
+
+
+# NOTE: Used for bulk payment posting. A payment only moves a customer's last payment forward, so an older or repeated
+# payment in a remittance file leaves the customer as it is. A customer with no last payment yet takes any payment.
+POST_PAYMENT = "UPDATE customers SET last_payment = ?1 WHERE id = ?2 AND (last_payment IS NULL OR last_payment < ?1);"
+
+# CHECK STATEMENTS 👇 -----------------------------------------------------------------------------------------#
+
+# NOTE: Each check returns a single 1 or 0. EXISTS stops at the first matching row and reads no columns from it,
+# instead of every matching row being fetched just to be counted.
+
+CHECK_CUSTOMER_EXISTS_AT_LOCATION = "SELECT EXISTS(SELECT 1 FROM customers WHERE name = ? AND location = ?);"
+
+
+CHECK_PRODUCT_AND_PRICE_EXISTS = "SELECT EXISTS(SELECT 1 FROM products WHERE product = ? AND price = ?);"
+
+
+CHECK_CUSTOMER_ASSIGNMENT_EXISTS = """SELECT EXISTS(SELECT 1 FROM customers
+    JOIN customer_products ON customer_products.customer_id = customers.id WHERE customers.name = ?);"""
+
+
+CHECK_CUSTOMER_ID = "SELECT EXISTS(SELECT 1 FROM customers WHERE id = ? AND name = ?);"
+
+
+CHECK_PRODUCT_ID = "SELECT EXISTS(SELECT 1 FROM products WHERE id = ? and product = ?);"
+
+
+CHECK_ASSIGNMENT_ID = "SELECT EXISTS(SELECT 1 FROM customer_products WHERE id = ?);"
+
+
+CHECK_CUSTOMER_EXISTS = "SELECT EXISTS(SELECT 1 FROM customers WHERE name = ?);"
+
+
+CHECK_PRODUCT_EXISTS = "SELECT EXISTS(SELECT 1 FROM products WHERE product = ?);"
+
+
+# NOTE: The placeholders are formatted in with one "(?, ?)" pair per customer name and location being checked. The
+# pairs are joined against customers (rather than used in an IN list) so each one is a lookup on the UNIQUE index.
+CHECK_CUSTOMERS_EXIST_AT_LOCATIONS = """WITH candidates(name, location) AS (VALUES {placeholders})
+    SELECT customers.name, customers.location FROM candidates
+    JOIN customers ON customers.name = candidates.name AND customers.location = candidates.location;"""
+
+# NOTE: These look up the customers a chunk of remittance payments is for, with the placeholders formatted in like
+# CHECK_CUSTOMERS_EXIST_AT_LOCATIONS above.
+FIND_CUSTOMERS_BY_ID = """WITH candidates(id) AS (VALUES {placeholders})
+    SELECT customers.id, customers.last_payment FROM candidates
+    JOIN customers ON customers.id = candidates.id;"""
+
+
+FIND_CUSTOMERS_AT_LOCATIONS = """WITH candidates(name, location) AS (VALUES {placeholders})
+    SELECT customers.name, customers.location, customers.id, customers.last_payment FROM candidates
+    JOIN customers ON customers.name = candidates.name AND customers.location = candidates.location;"""
+
+# SUM STATEMENT 👇 -----------------------------------------------------------------------------------------#
+
+CUSTOMER_TOTAL_BILL = """SELECT printf("%.2f", SUM(products.price)) FROM customers
+    JOIN customer_products ON customer_products.customer_id = customers.id
+    JOIN products ON products.id = customer_products.product_id
+    WHERE customers.name = ?;"""
+
+
+# NOTE: Every customer's monthly bill (per location) in one grouped aggregate. The rows are grouped in the order of the
+# customer_products UNIQUE index, so SQLite walks that index once instead of sorting the assignments.
+ALL_CUSTOMER_BILLS = """SELECT customers.id, customers.name, customers.location, COUNT(*), printf("%.2f", SUM(products.price))
+    FROM customer_products
+    JOIN customers ON customers.id = customer_products.customer_id
+    JOIN products ON products.id = customer_products.product_id
+    GROUP BY customer_products.customer_id;"""
+
+
+# NOTE: Running the same billing month again replaces that month's bills instead of adding duplicates.
+SAVE_CUSTOMER_BILLS = """INSERT INTO bills(billing_month, customer_id, customer_name, customer_location, product_count, total)
+    SELECT ?, customers.id, customers.name, customers.location, COUNT(*), round(SUM(products.price), 2)
+    FROM customer_products
+    JOIN customers ON customers.id = customer_products.customer_id
+    JOIN products ON products.id = customer_products.product_id
+    GROUP BY customer_products.customer_id
+    ON CONFLICT(billing_month, customer_id) DO UPDATE SET
+        customer_name = excluded.customer_name, customer_location = excluded.customer_location,
+        product_count = excluded.product_count, total = excluded.total;"""
+
+# INVOICE STATEMENTS 👇 ----------------------------------------------------------------------------------------#
+
+# NOTE: Finds the id of every partition_size'th customer, which start the partitions of the invoice run. Reads only the
+# customers' ids, from the table's own id order.
+INVOICE_PARTITION_STARTS = """SELECT id FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS row FROM customers)
+    WHERE (row - 1) % ? = 0;"""
+
+
+LAST_CUSTOMER_ID = "SELECT MAX(id) FROM customers;"
+
+
+# NOTE: The line items of every customer in an id range, each with the customer's total formatted like
+# CUSTOMER_TOTAL_BILL. The range is read from the customer_products UNIQUE(customer_id, product_id) index, so the rows
+# come out in customer order without a sort.
+INVOICE_LINE_ITEMS = """SELECT customers.id, customers.name, customers.location, products.product, products.product_type,
+    products.price, printf("%.2f", SUM(products.price) OVER (PARTITION BY customer_products.customer_id))
+    FROM customer_products
+    JOIN customers ON customers.id = customer_products.customer_id
+    JOIN products ON products.id = customer_products.product_id
+    WHERE customer_products.customer_id >= ? AND customer_products.customer_id < ?
+    ORDER BY customer_products.customer_id, customer_products.product_id;"""
+
+# PAYMENT AGING STATEMENTS 👇 -----------------------------------------------------------------------------------#
+
+# NOTE: Puts the customers matching {where} in their aging bucket as of the time {now}. The bucket is the number of
+# whole 30 day periods since the last payment (up to 90), so a customer moves into the next bucket exactly 30 days
+# after moving into the last one. The statements below fill in {now} and {where}.
+PAYMENT_AGING_UPSERT = """INSERT INTO payment_aging(customer_id, bucket, next_change)
+    SELECT id, bucket, CASE WHEN bucket < 90 THEN last_payment + (bucket + 30) * 86400 END FROM (
+        SELECT id, last_payment, MIN(90, MAX(0, CAST(({now} - last_payment) / 86400 AS INTEGER) / 30 * 30)) AS bucket
+        FROM customers {where}
+    ) WHERE true
+    ON CONFLICT(customer_id) DO UPDATE SET bucket = excluded.bucket, next_change = excluded.next_change;"""
+
+
+# NOTE: Used by migration 6 to put every existing customer in their bucket.
+FILL_PAYMENT_AGING = PAYMENT_AGING_UPSERT.format(now="CAST(strftime('%s', 'now') AS INTEGER)", where="")
+
+
+# NOTE: The triggers put a new customer in their bucket, and move a customer whose last payment changes, in the same
+# transaction as the insert or update. Every way of adding customers or posting payments keeps the table up to date,
+# including bulk imports and other processes.
+CREATE_AGING_INSERT_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_payment_aging_insert AFTER INSERT ON customers BEGIN
+    """ + PAYMENT_AGING_UPSERT.format(now="CAST(strftime('%s', 'now') AS INTEGER)", where="WHERE id = NEW.id") + """
+END;"""
+
+
+CREATE_AGING_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_payment_aging_update AFTER UPDATE OF last_payment ON customers BEGIN
+    """ + PAYMENT_AGING_UPSERT.format(now="CAST(strftime('%s', 'now') AS INTEGER)", where="WHERE id = NEW.id") + """
+END;"""
+
+
+# NOTE: Moves every customer whose next change time has passed into their new bucket. Takes the current time twice.
+SWEEP_PAYMENT_AGING = PAYMENT_AGING_UPSERT.format(
+    now="?", where="WHERE id IN (SELECT customer_id FROM payment_aging WHERE next_change <= ?)")
+
+
+CHECK_PAYMENT_AGING_DUE = "SELECT EXISTS(SELECT 1 FROM payment_aging WHERE next_change <= ?);"
+
+
+PAYMENT_AGING_SUMMARY = "SELECT bucket, COUNT(*) FROM payment_aging GROUP BY bucket ORDER BY bucket;"
+
+# REVENUE ROLLUP STATEMENTS 👇 ----------------------------------------------------------------------------------#
+
+# NOTE: The monthly recurring revenue (MRR) of every product, product type and customer location is kept in a rollup
+# table for each, so the revenue report reads one row per group instead of adding up every assignment. Each row holds
+# the number of assignments in the group and their monthly total in cents, which is added to and taken from exactly as
+# assignments come and go (adding up prices as floats would drift away from the real total over time).
+
+CREATE_REVENUE_BY_PRODUCT_TABLE = """CREATE TABLE IF NOT EXISTS revenue_by_product(
+    product_id INTEGER PRIMARY KEY,
+    assignments INTEGER NOT NULL,
+    mrr_cents INTEGER NOT NULL);"""
+
+
+CREATE_REVENUE_BY_PRODUCT_TYPE_TABLE = """CREATE TABLE IF NOT EXISTS revenue_by_product_type(
+    product_type TEXT PRIMARY KEY,
+    assignments INTEGER NOT NULL,
+    mrr_cents INTEGER NOT NULL);"""
+
+
+CREATE_REVENUE_BY_LOCATION_TABLE = """CREATE TABLE IF NOT EXISTS revenue_by_location(
+    location TEXT PRIMARY KEY,
+    assignments INTEGER NOT NULL,
+    mrr_cents INTEGER NOT NULL);"""
+
+
+# NOTE: Adds up the assignments matching {where} by the group {value} (such as products.product_type) and adds them to
+# (sign "") or takes them from (sign "-") the rollup {table}, whose group column is {key}. The triggers and statements
+# below fill in {table}, {key} and {value} once per rollup table, and {sign} and {where} for what changed.
+REVENUE_ROLLUP_UPSERT = """INSERT INTO {table}({key}, assignments, mrr_cents)
+        SELECT {value}, {sign}COUNT(*), {sign}SUM(CAST(round(products.price * 100) AS INTEGER)) FROM customer_products
+        JOIN customers ON customers.id = customer_products.customer_id
+        JOIN products ON products.id = customer_products.product_id
+        WHERE {where} GROUP BY {value}
+        ON CONFLICT({key}) DO UPDATE SET
+            assignments = assignments + excluded.assignments, mrr_cents = mrr_cents + excluded.mrr_cents;
+    """
+
+
+# NOTE: Removes the groups of the assignments matching {where} that no longer have any assignments.
+REVENUE_ROLLUP_CLEANUP = """DELETE FROM {table} WHERE assignments = 0 AND {key} IN (
+        SELECT {value} FROM customer_products
+        JOIN customers ON customers.id = customer_products.customer_id
+        JOIN products ON products.id = customer_products.product_id
+        WHERE {where});
+    """
+
+
+# NOTE: Each rollup table's name, group column and the value it groups the assignments by.
+REVENUE_ROLLUPS = {
+    "product": {"table": "revenue_by_product", "key": "product_id", "value": "products.id"},
+    "product-type": {"table": "revenue_by_product_type", "key": "product_type", "value": "products.product_type"},
+    "location": {"table": "revenue_by_location", "key": "location", "value": "customers.location"},
+}
+
+
+# NOTE: Used by migration 8 and database.rebuild_revenue_rollups() to fill the rollup tables from every assignment.
+FILL_REVENUE_BY_PRODUCT = REVENUE_ROLLUP_UPSERT.format(sign="", where="true", **REVENUE_ROLLUPS["product"])
+
+
+FILL_REVENUE_BY_PRODUCT_TYPE = REVENUE_ROLLUP_UPSERT.format(sign="", where="true", **REVENUE_ROLLUPS["product-type"])
+
+
+FILL_REVENUE_BY_LOCATION = REVENUE_ROLLUP_UPSERT.format(sign="", where="true", **REVENUE_ROLLUPS["location"])
+
+
+# NOTE: The triggers keep the rollup tables up to date in the same transaction as the change, however it is made
+# (assigning or removing a product, removing a customer or product, or changing a product's price). Assignments are
+# taken from their groups BEFORE a row is deleted or changed, while they can still be joined to their customer and
+# product, and added to their new groups AFTER. An assignment removed because its customer or product was removed has
+# already been taken away by the customer's or product's trigger, and can no longer be joined to it.
+CREATE_REVENUE_ASSIGNMENT_INSERT_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customer_products_revenue_insert AFTER INSERT ON customer_products BEGIN
+    """ + "".join(REVENUE_ROLLUP_UPSERT.format(sign="", where="customer_products.id = NEW.id", **rollup)
+                  for rollup in REVENUE_ROLLUPS.values()) + """
+END;"""
+
+
+CREATE_REVENUE_ASSIGNMENT_DELETE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customer_products_revenue_delete BEFORE DELETE ON customer_products BEGIN
+    """ + "".join(statement.format(sign="-", where="customer_products.id = OLD.id", **rollup)
+                  for statement in (REVENUE_ROLLUP_UPSERT, REVENUE_ROLLUP_CLEANUP) for rollup in REVENUE_ROLLUPS.values()) + """
+END;"""
+
+
+CREATE_REVENUE_CUSTOMER_DELETE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_revenue_delete BEFORE DELETE ON customers BEGIN
+    """ + "".join(statement.format(sign="-", where="customer_products.customer_id = OLD.id", **rollup)
+                  for statement in (REVENUE_ROLLUP_UPSERT, REVENUE_ROLLUP_CLEANUP) for rollup in REVENUE_ROLLUPS.values()) + """
+END;"""
+
+
+CREATE_REVENUE_PRODUCT_DELETE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS products_revenue_delete BEFORE DELETE ON products BEGIN
+    """ + "".join(statement.format(sign="-", where="customer_products.product_id = OLD.id", **rollup)
+                  for statement in (REVENUE_ROLLUP_UPSERT, REVENUE_ROLLUP_CLEANUP) for rollup in REVENUE_ROLLUPS.values()) + """
+END;"""
+
+
+CREATE_REVENUE_PRODUCT_BEFORE_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS products_revenue_before_update BEFORE UPDATE OF price, product_type ON products
+    WHEN OLD.price IS NOT NEW.price OR OLD.product_type IS NOT NEW.product_type BEGIN
+    """ + "".join(statement.format(sign="-", where="customer_products.product_id = OLD.id", **rollup)
+                  for statement in (REVENUE_ROLLUP_UPSERT, REVENUE_ROLLUP_CLEANUP) for rollup in REVENUE_ROLLUPS.values()) + """
+END;"""
+
+
+CREATE_REVENUE_PRODUCT_AFTER_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS products_revenue_after_update AFTER UPDATE OF price, product_type ON products
+    WHEN OLD.price IS NOT NEW.price OR OLD.product_type IS NOT NEW.product_type BEGIN
+    """ + "".join(REVENUE_ROLLUP_UPSERT.format(sign="", where="customer_products.product_id = NEW.id", **rollup)
+                  for rollup in REVENUE_ROLLUPS.values()) + """
+END;"""
+
+
+CREATE_REVENUE_CUSTOMER_BEFORE_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_revenue_before_update BEFORE UPDATE OF location ON customers
+    WHEN OLD.location IS NOT NEW.location BEGIN
+    """ + "".join(statement.format(sign="-", where="customer_products.customer_id = OLD.id", **REVENUE_ROLLUPS["location"])
+                  for statement in (REVENUE_ROLLUP_UPSERT, REVENUE_ROLLUP_CLEANUP)) + """
+END;"""
+
+
+CREATE_REVENUE_CUSTOMER_AFTER_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS customers_revenue_after_update AFTER UPDATE OF location ON customers
+    WHEN OLD.location IS NOT NEW.location BEGIN
+    """ + REVENUE_ROLLUP_UPSERT.format(sign="", where="customer_products.customer_id = NEW.id", **REVENUE_ROLLUPS["location"]) + """
+END;"""
+
+
+# NOTE: The rows of a rollup table, highest revenue first. {table} and {key} are formatted in like the statements above.
+VIEW_REVENUE_ROLLUP = "SELECT {key}, assignments, mrr_cents FROM {table} ORDER BY mrr_cents DESC;"
+
+
+# NOTE: Recomputes a rollup table's rows from every assignment, for checking the table against (see
+# database.verify_revenue_rollups()).
+RECOMPUTE_REVENUE_ROLLUP = """SELECT {value}, COUNT(*), SUM(CAST(round(products.price * 100) AS INTEGER)) FROM customer_products
+    JOIN customers ON customers.id = customer_products.customer_id
+    JOIN products ON products.id = customer_products.product_id
+    GROUP BY {value};"""
+
+
+CLEAR_REVENUE_ROLLUP = "DELETE FROM {table};"
+
+# SHARD STATEMENTS 👇 -----------------------------------------------------------------------------------------#
+
+# NOTE: These start a new shard's ids at the start of its id range (see database.SHARD_ID_RANGE). sqlite_sequence holds
+# the last id handed out for each AUTOINCREMENT table, and has no row for a table that hasn't had a row inserted yet.
+INSERT_SHARD_SEQUENCE = """INSERT INTO sqlite_sequence(name, seq) SELECT ?1, ?2
+    WHERE NOT EXISTS(SELECT 1 FROM sqlite_sequence WHERE name = ?1);"""
+
+
+UPDATE_SHARD_SEQUENCE = "UPDATE sqlite_sequence SET seq = ?2 WHERE name = ?1 AND seq < ?2;"
+
+
+# NOTE: These copy the products to a shard (see database.sync_products()). The ids of the products kept are given as a
+# JSON list, so the whole list is one parameter.
+DELETE_PRODUCTS_NOT_IN = "DELETE FROM products WHERE id NOT IN (SELECT value FROM json_each(?));"
+
+
+UPSERT_PRODUCT = """INSERT INTO products(id, product, product_type, price) VALUES (?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET product = excluded.product, product_type = excluded.product_type, price = excluded.price;"""
+
+
+# NOTE: Like VIEW_LATE_CUSTOMERS, with the bucket as the last column so the shards' late customers can be merged.
+VIEW_LATE_CUSTOMERS_WITH_BUCKET = """SELECT customers.id, name, phone_num, location, card_num, sign_up_date, last_payment, bucket
+    FROM payment_aging
+    JOIN customers ON customers.id = payment_aging.customer_id
+    WHERE bucket >= ? ORDER BY bucket DESC;"""
+
+
+CUSTOMER_BILL_AMOUNT = """SELECT SUM(products.price) FROM customers
+    JOIN customer_products ON customer_products.customer_id = customers.id
+    JOIN products ON products.id = customer_products.product_id
+    WHERE customers.name = ?;"""
+
+
+# NOTE: These copy an existing database file (attached as "source") into a shard (see shards.py). The first parameter
+# is added to the customer and assignment ids to move them into the shard's id range, and the second is the shard
+# whose customers are copied, picked with the location_shard() function shards.py adds to the connection.
+SPLIT_PRODUCTS = "INSERT INTO products(id, product, product_type, price) SELECT id, product, product_type, price FROM source.products;"
+
+
+SPLIT_CUSTOMERS = """INSERT INTO customers(id, name, phone_num, location, card_num, sign_up_date, last_payment)
+    SELECT id + ?1, name, phone_num, location, card_num, sign_up_date, last_payment FROM source.customers
+    WHERE location_shard(location) = ?2 ORDER BY id;"""
+
+
+SPLIT_ASSIGNMENTS = """INSERT INTO customer_products(id, customer_id, product_id)
+    SELECT customer_products.id + ?1, customer_products.customer_id + ?1, customer_products.product_id
+    FROM source.customer_products
+    JOIN source.customers ON customers.id = customer_products.customer_id
+    WHERE location_shard(customers.location) = ?2 ORDER BY customer_products.id;"""
+
+
+SPLIT_BILLS = """INSERT INTO bills(billing_month, customer_id, customer_name, customer_location, product_count, total)
+    SELECT billing_month, customer_id + ?1, customer_name, customer_location, product_count, total FROM source.bills
+    WHERE location_shard(customer_location) = ?2 ORDER BY id;"""
+
+
+COUNT_SHARD_ROWS = "SELECT (SELECT COUNT(*) FROM customers), (SELECT COUNT(*) FROM customer_products);"
@@ -0,0 +1,123 @@
+# NOTE: This file contains the table renderer used by the view prompts. Rows are formatted into aligned columns and
+# written in blocks of BLOCK_SIZE rows with one write per block instead of one print() per row, which is what made
+# long listings slow over an SSH session. When the listing is longer than the terminal, it is piped through a pager
+# ($PAGER, or less if it is installed) so it can be scrolled instead of flying past.
+
+import functools
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+# Number of rows formatted and written at a time. Column widths are worked out from the rows seen so far, so a column
+# only widens between blocks and memory use doesn't grow with the length of the listing.
+BLOCK_SIZE = 1000
+
+# Format dates are shown in, such as Jan 05 2024.
+DATE_FORMAT = "%b %d %Y"
+
+# Pager used when $PAGER isn't set. -F quits straight away if the listing fits on one screen, -R shows the emoji and
+# -X leaves the listing on screen after quitting.
+DEFAULT_PAGER = "less -FRX"
+
+SEPARATOR = " | "
+
+FOOTER = "---------------------------\n"
+
+# FORMAT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to convert a timestamp stored in the database into a date for display.
+# NOTE: Dates are stored as the timestamp of a day, so the same few thousand timestamps come up over and over in a long
+# listing. Each one is only converted once instead of on every row.
+@functools.lru_cache(maxsize=8192)
+def format_date(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
+
+
+# Function used to widen the column widths seen so far to fit a block of rows (each already a tuple of strings).
+def widen_columns(rows, widths):
+    for row in rows:
+        for index, value in enumerate(row):
+            if len(value) > widths[index]:
+                widths[index] = len(value)
+
+
+# Function used to format a block of rows into lines aligned to the column widths. Returns the block as one string.
+def format_block(rows, widths):
+    # The last column isn't padded so lines don't end in spaces.
+    last = len(widths) - 1
+    return "".join(
+        SEPARATOR.join(value if index == last else value.ljust(widths[index]) for index, value in enumerate(row)) + "\n"
+        for row in rows)
+
+# OUTPUT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to find the pager command to use. Returns None if the output isn't a terminal or there is no pager.
+def pager_command():
+    if not sys.stdout.isatty():
+        return None
+    command = shlex.split(os.environ.get("PAGER", DEFAULT_PAGER))
+    if not command or not shutil.which(command[0]):
+        return None
+    return command
+
+
+# Function used to open where a listing is written. Yields a function that writes one string.
+# NOTE: The pager is only started for a listing that won't fit on the terminal, so a short listing (like a page of 20
+# customers) is written straight to the screen without starting a new process.
+@contextmanager
+def open_output(line_count, more_rows):
+    command = pager_command()
+    if command is None or (not more_rows and line_count < shutil.get_terminal_size().lines):
+        yield sys.stdout.write
+        sys.stdout.flush()
+        return
+
+    sys.stdout.flush()
+    pager = subprocess.Popen(command, stdin=subprocess.PIPE, text=True, encoding="utf-8")
+    try:
+        yield pager.stdin.write
+    finally:
+        # The pager is gone if the user quit it before the end of the listing.
+        try:
+            pager.stdin.close()
+        except BrokenPipeError:
+            pass
+        pager.wait()
+
+# RENDER FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to render a listing as a table under a title. rows can be a list or a cursor and are read one block at
+# a time. convert_row turns a row into a tuple of strings (by default every value is passed to str()).
+def render_table(title, columns, rows, convert_row=None):
+    convert_row = convert_row or (lambda row: tuple(map(str, row)))
+    rows = iter(rows)
+    widths = [len(column) for column in columns]
+
+    block = [convert_row(row) for row in islice(rows, BLOCK_SIZE)]
+    more_rows = len(block) == BLOCK_SIZE
+
+    # The header is formatted along with the first block so it lines up with the first block's columns.
+    widen_columns(block, widths)
+    header = [tuple(columns), tuple("-" * width for width in widths)]
+    text = f"\n🛜------{title}-----🛜\n" + format_block(header + block, widths)
+
+    with open_output(len(block) + 4, more_rows) as write:
+        try:
+            write(text)
+            while more_rows:
+                block = [convert_row(row) for row in islice(rows, BLOCK_SIZE)]
+                more_rows = len(block) == BLOCK_SIZE
+                widen_columns(block, widths)
+                write(format_block(block, widths))
+            write(FOOTER)
+
+        # The user quit the pager before the end of the listing, so the rest of the rows aren't read.
+        except BrokenPipeError:
+            pass
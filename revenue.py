@@ -0,0 +1,98 @@
+# NOTE: This file contains the revenue report for management: the monthly recurring revenue (MRR) of every product,
+# product type or customer location, read from the revenue rollup tables that the database keeps up to date as
+# products are assigned, removed and repriced. The report reads one row per group, however many assignments there are.
+#
+# Usage: python revenue.py [--by product|product-type|location] [--limit 20]
+#        python revenue.py --verify [--repair]
+#
+# --verify recomputes the rollups from every assignment and lists any group that doesn't match, and --repair rebuilds
+# the rollup tables when it finds one.
+
+import argparse
+import sys
+import time
+
+import database
+import queries
+import render
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+GROUPS = list(queries.REVENUE_ROLLUPS)
+
+# Each group's report title and columns.
+REPORT_COLUMNS = {
+    "product": ["Product", "Type", "Price", "Assignments", "MRR"],
+    "product-type": ["Product Type", "Assignments", "MRR"],
+    "location": ["Location", "Assignments", "MRR"],
+}
+
+# REPORT FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to format an amount in cents as dollars.
+def format_cents(cents):
+    return f"${cents / 100:,.2f}"
+
+
+# Function used to get a group's report rows, each a tuple of strings in the order of its REPORT_COLUMNS.
+def report_rows(group, limit=None):
+    rows = database.view_revenue(group)[:limit]
+    if group != "product":
+        return [(str(key), str(assignments), format_cents(mrr_cents)) for key, assignments, mrr_cents in rows]
+
+    # The product rollup is kept by product id, so the product's name, type and price are looked up from the product
+    # catalog (which is usually already in the product cache).
+    products = {id: (product, product_type, price) for id, product, product_type, price in database.view_products()}
+    return [(*map(str, products.get(id, (f"#{id}", "", ""))), str(assignments), format_cents(mrr_cents))
+            for id, assignments, mrr_cents in rows]
+
+
+# Function used to print a group's revenue report with the total MRR under it.
+def print_report(group, limit=None):
+    # The product types are the fewest groups, so the total is added up from them.
+    totals = database.view_revenue("product-type")
+    total_assignments = sum(assignments for key, assignments, mrr_cents in totals)
+    total_cents = sum(mrr_cents for key, assignments, mrr_cents in totals)
+
+    render.render_table(f"MRR by {group}", REPORT_COLUMNS[group], report_rows(group, limit), convert_row=tuple)
+    print(f"Total MRR: {format_cents(total_cents)} from {total_assignments} product assignments")
+
+# VERIFY FUNCTIONS 👇 -------------------------------------------------------------------------------------------#
+
+# Function used to check the rollups against a recompute, printing every difference, and rebuild them if asked.
+# Returns True if no differences were found.
+def verify(repair=False):
+    start = time.perf_counter()
+    differences = database.verify_revenue_rollups()
+    print(f"Checked the revenue rollups in {time.perf_counter() - start:.2f}s.")
+
+    for group, key, stored, recomputed in differences:
+        print(f"  {group} {key!r}: stored {stored}, recomputed {recomputed} (assignments, cents)")
+    if not differences:
+        print("The revenue rollups match the assignments.")
+        return True
+
+    print(f"{len(differences)} groups don't match.")
+    if repair:
+        database.rebuild_revenue_rollups()
+        print("The revenue rollups were rebuilt.")
+    return False
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the monthly recurring revenue, or check the revenue rollups.")
+    parser.add_argument("--by", choices=GROUPS, default="product-type", help="group the revenue by (default: product-type)")
+    parser.add_argument("--limit", type=int, help="most groups shown, highest revenue first")
+    parser.add_argument("--verify", action="store_true", help="recompute the rollups and list any differences")
+    parser.add_argument("--repair", action="store_true", help="with --verify, rebuild the rollups if they differ")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    args = parser.parse_args()
+    if args.repair and not args.verify:
+        parser.error("--repair needs --verify")
+
+    if args.database:
+        database.use_database(args.database)
+    if args.verify:
+        sys.exit(0 if verify(args.repair) else 1)
+    print_report(args.by, args.limit)
@@ -0,0 +1,443 @@
+# NOTE: This file contains the local JSON service for the customer tracking system. It is one long-running process
+# that answers HTTP requests for the customer, product, assignment, late customer and bill operations, so scripts can
+# make many requests without paying Python startup, imports and opening the database every time. The database
+# connections stay open between requests, along with SQLite's page cache and each connection's cache of prepared
+# statements, and the operations run through adatabase.py so the server keeps answering while a slow query runs.
+#
+# Usage: python server.py [--host 127.0.0.1] [--port 8080] [--database customer_data.db]
+#
+# Endpoints (request and response bodies are JSON, dates are sent as mm-dd-YYYY and returned as YYYY-MM-DD):
+#   GET    /customers[?location=&after_id=&limit=]     POST /customers                 DELETE /customers/<id>?name=
+#   GET    /customers/search?q=[&limit=]               POST /customers/<id>/payment    GET    /customers/late[?bucket=]
+#   GET    /customers/aging
+#   GET    /products[?type=&after_id=&limit=]          POST /products                  DELETE /products/<id>?name=
+#   POST   /products/<id>/price
+#   GET    /assignments[?location=&after_id=&limit=]   POST /assignments               DELETE /assignments/<id>
+#   GET    /bills/<customer name>
+#   POST   /batch      (a list of {"method", "path", "body"} requests, answered with a list of {"status", "body"})
+#
+# Listings are paged with after_id and limit (default limit 100), and each page comes with the after_id of the next
+# page, or null on the last page. See load_test.py for measuring requests per second.
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import adatabase
+import database
+import other_functions
+import validation
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Logger an unexpected error is written to, with its traceback, before the client is answered with a 500.
+logger = logging.getLogger("customer_tracking.server")
+
+# Number of entries in a page of a listing when the request doesn't give a limit, and the most it can ask for.
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Most operations in one batch request, and the largest request body accepted (in bytes).
+MAX_BATCH = 1000
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+CUSTOMER_FIELDS = ["id", "name", "phone_num", "location", "card_num", "sign_up_date", "last_payment"]
+
+PRODUCT_FIELDS = ["id", "product", "product_type", "price"]
+
+ASSIGNMENT_FIELDS = ["id", "customer_name", "customer_location", "product_name", "product_price"]
+
+# Raised by the endpoint functions to answer with an error status and message.
+class RequestError(Exception):
+
+    def __init__(self, status, error):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+
+# CONVERSION FUNCTIONS 👇 ---------------------------------------------------------------------------------------#
+
+# Function used to convert customer rows into JSON objects, with their dates as YYYY-MM-DD.
+def customers_to_json(customers):
+    return [dict(zip(CUSTOMER_FIELDS, (id, name, phone_num, location, card_num,
+                                       other_functions.timestamp_to_iso_date(sign_up_timestamp),
+                                       other_functions.timestamp_to_iso_date(last_payment_timestamp))))
+            for id, name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp in customers]
+
+
+# Function used to convert rows of the products or customer_products table into JSON objects.
+def rows_to_json(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+# Function used to get a required field from a request body, raising a 400 error if it is missing or blank.
+def required(body, field):
+    value = body.get(field)
+    if value is None or str(value).strip() == "":
+        raise RequestError(400, f"missing {field}")
+    return value
+
+
+# Function used to convert a mm-dd-YYYY date from a request into a timestamp, raising a 400 error if it isn't valid.
+def parse_date(date, field):
+    return parse_value(validation.parse_date, str(date).strip(), field)
+
+
+# Function used to run one of the parse functions in validation.py on a value from a request, raising a 400 error
+# with the reason if it isn't valid.
+def parse_value(parse, value, field):
+    try:
+        return parse(value)
+    except ValueError as error:
+        raise RequestError(400, f"{field} {error}")
+
+
+# Function used to convert a number from a request, raising a 400 error if it isn't one.
+def parse_number(value, field, type=float):
+    try:
+        return type(value)
+    except (TypeError, ValueError):
+        raise RequestError(400, f"{field} must be a number")
+
+
+# Function used to read the after_id and limit of a paged listing from a request's query string.
+def parse_paging(query):
+    after_id = parse_number(query.get("after_id", 0), "after_id", int)
+    limit = min(parse_number(query.get("limit", DEFAULT_LIMIT), "limit", int), MAX_LIMIT)
+    return after_id, max(limit, 1)
+
+
+# Function used to build the response body for one page of a listing.
+def page_response(rows, has_next_page, entries):
+    return {"entries": entries, "next_after_id": rows[-1][0] if has_next_page else None}
+
+# CUSTOMER ENDPOINTS 👇 -----------------------------------------------------------------------------------------#
+
+# Endpoint used for 👇
+# 1. Add a customer
+async def add_customer(match, query, body):
+    name, location = str(required(body, "name")).strip(), str(required(body, "location")).strip()
+    phone_num, card_num = str(required(body, "phone_num")).strip(), str(required(body, "card_num")).strip()
+    parse_value(validation.parse_phone_number, phone_num, "phone_num")
+    parse_value(validation.parse_card_number, card_num, "card_num")
+    sign_up_timestamp = parse_date(required(body, "sign_up_date"), "sign_up_date")
+    last_payment_timestamp = parse_date(required(body, "last_payment"), "last_payment")
+
+    id = await adatabase.add_new_customer(name, phone_num, location, card_num, sign_up_timestamp, last_payment_timestamp)
+    if id is None:
+        raise RequestError(409, f"{name} already present at {location}")
+    return 201, {"ok": True, "id": id}
+
+
+# Endpoint used for 👇
+# 2. Remove a customer
+async def remove_customer(match, query, body):
+    id, name = int(match["id"]), required(query, "name")
+    if not await adatabase.remove_customer(id, name):
+        raise RequestError(404, f"no entry {id} for customer {name}")
+    return 200, {"ok": True, "id": id}
+
+
+# Endpoint used for 👇
+# 3. View customer(s)
+async def customers(match, query, body):
+    after_id, limit = parse_paging(query)
+    rows, has_next_page = await adatabase.view_customers_page(after_id, query.get("location") or None, limit)
+    return 200, page_response(rows, has_next_page, customers_to_json(rows))
+
+
+# Endpoint used to find customers from part of their name, location or phone number, best match first.
+async def search_customers(match, query, body):
+    limit = min(parse_number(query.get("limit", database.SEARCH_LIMIT), "limit", int), MAX_LIMIT)
+    return 200, {"entries": customers_to_json(await adatabase.search_customers(required(query, "q"), limit))}
+
+
+# Endpoint used for 👇
+# 4. View customers who currently have late payments
+async def late_customers(match, query, body):
+    bucket = parse_number(query.get("bucket", 30), "bucket", int)
+    return 200, {"entries": customers_to_json(await adatabase.view_late_customers(bucket))}
+
+
+# Endpoint used to count the customers in each payment aging bucket.
+async def aging(match, query, body):
+    summary = await adatabase.payment_aging_summary()
+    return 200, {str(bucket): count for bucket, count in summary.items()}
+
+
+# Endpoint used for 👇
+# 5. Update a customer's last payment made
+async def update_payment(match, query, body):
+    id = int(match["id"])
+    if not await adatabase.update_last_payment(parse_date(required(body, "date"), "date"), id):
+        raise RequestError(404, f"no customer entry {id}")
+    return 200, {"ok": True, "id": id}
+
+# PRODUCT ENDPOINTS 👇 ------------------------------------------------------------------------------------------#
+
+# Endpoint used for 👇
+# 6. Add a product
+# NOTE: Like the add product prompt, equipment is always added at a price of $0.
+async def add_product(match, query, body):
+    name, product_type = str(required(body, "name")).strip(), str(required(body, "type")).strip().capitalize()
+    if product_type not in ("Equipment", "Service"):
+        raise RequestError(400, "type must be Equipment or Service")
+    price = 0 if product_type == "Equipment" else round(parse_number(required(body, "price"), "price"), 2)
+
+    id = await adatabase.add_new_product(name, product_type, price)
+    if id is None:
+        raise RequestError(409, f"{name} already present at ${price}")
+    return 201, {"ok": True, "id": id}
+
+
+# Endpoint used for 👇
+# 7. Remove a product
+async def remove_product(match, query, body):
+    id, name = int(match["id"]), required(query, "name")
+    if not await adatabase.remove_product(id, name):
+        raise RequestError(404, f"no entry {id} for product {name}")
+    return 200, {"ok": True, "id": id}
+
+
+# Endpoint used for 👇
+# 8. View product(s)
+async def products(match, query, body):
+    after_id, limit = parse_paging(query)
+    product_type = query.get("type", "").strip().capitalize() or None
+    rows, has_next_page = await adatabase.view_products_page(after_id, product_type, limit)
+    return 200, page_response(rows, has_next_page, rows_to_json(PRODUCT_FIELDS, rows))
+
+
+# Endpoint used for 👇
+# 9. Edit the price of a product
+async def update_price(match, query, body):
+    id = int(match["id"])
+    if not await adatabase.update_price(round(parse_number(required(body, "price"), "price"), 2), id):
+        raise RequestError(404, f"no product entry {id}")
+    return 200, {"ok": True, "id": id}
+
+# ASSIGNMENT AND BILL ENDPOINTS 👇 ------------------------------------------------------------------------------#
+
+# Endpoint used for 👇
+# 10. Assign a product to a customer
+async def assign(match, query, body):
+    customer, location = required(body, "customer"), required(body, "location")
+    product, price = required(body, "product"), round(parse_number(required(body, "price"), "price"), 2)
+
+    id = await adatabase.assign_product_to_customer(customer, location, product, price)
+    if id is not None:
+        return 201, {"ok": True, "id": id}
+    if not await adatabase.customer_at_location_check(customer, location):
+        raise RequestError(404, f"{customer} isn't present at {location}")
+    if not await adatabase.product_and_price_check(product, price):
+        raise RequestError(404, f"{product} at ${price} isn't a current product")
+    raise RequestError(409, f"{product} is already assigned to {customer} at {location}")
+
+
+# Endpoint used for 👇
+# 11. Unassign a product from a customer
+async def unassign(match, query, body):
+    id = int(match["id"])
+    if not await adatabase.remove_assignment(id):
+        raise RequestError(404, f"no product assignment {id}")
+    return 200, {"ok": True, "id": id}
+
+
+# Endpoint used for 👇
+# 12. View product assignment(s)
+async def assignments(match, query, body):
+    after_id, limit = parse_paging(query)
+    rows, has_next_page = await adatabase.view_assignments_page(after_id, query.get("location") or None, limit)
+    return 200, page_response(rows, has_next_page, rows_to_json(ASSIGNMENT_FIELDS, rows))
+
+
+# Endpoint used for 👇
+# 13. View a customer's monthly bill
+async def bill(match, query, body):
+    name = unquote(match["name"])
+    if not await adatabase.customer_assignment_check(name):
+        raise RequestError(404, f"{name} does not have any current products assigned to them")
+    total = (await adatabase.view_monthly_bill(name))[0][0]
+    return 200, {"name": name, "total": float(total)}
+
+# ROUTING 👇 ----------------------------------------------------------------------------------------------------#
+
+# Each route is a method, a pattern for the path, and the endpoint that answers it. Routes are tried in order.
+ROUTES = [
+    ("GET", r"/customers", customers),
+    ("POST", r"/customers", add_customer),
+    ("GET", r"/customers/search", search_customers),
+    ("GET", r"/customers/late", late_customers),
+    ("GET", r"/customers/aging", aging),
+    ("DELETE", r"/customers/(?P<id>\d+)", remove_customer),
+    ("POST", r"/customers/(?P<id>\d+)/payment", update_payment),
+    ("GET", r"/products", products),
+    ("POST", r"/products", add_product),
+    ("DELETE", r"/products/(?P<id>\d+)", remove_product),
+    ("POST", r"/products/(?P<id>\d+)/price", update_price),
+    ("GET", r"/assignments", assignments),
+    ("POST", r"/assignments", assign),
+    ("DELETE", r"/assignments/(?P<id>\d+)", unassign),
+    ("GET", r"/bills/(?P<name>[^/]+)", bill),
+]
+
+COMPILED_ROUTES = [(method, re.compile(pattern + "/?"), endpoint) for method, pattern, endpoint in ROUTES]
+
+
+# Function used to answer one request. Returns the response's status and body.
+async def handle(method, target, body):
+    url = urlsplit(target)
+    query = dict(parse_qsl(url.query))
+
+    if url.path.rstrip("/") == "/batch":
+        if method != "POST":
+            return 405, {"ok": False, "error": "batch requests must be POSTed"}
+        return await handle_batch(body)
+
+    path_found = False
+    for route_method, pattern, endpoint in COMPILED_ROUTES:
+        match = pattern.fullmatch(url.path)
+        if match is None:
+            continue
+        path_found = True
+        if route_method != method:
+            continue
+        try:
+            return await endpoint(match, query, body if isinstance(body, dict) else {})
+        except RequestError as error:
+            return error.status, {"ok": False, "error": error.error}
+
+    if path_found:
+        return 405, {"ok": False, "error": f"{method} is not allowed on {url.path}"}
+    return 404, {"ok": False, "error": f"no endpoint {url.path}"}
+
+
+# Function used to answer a batch request, a list of requests that are each answered as if sent on their own.
+# NOTE: The requests in a batch run one after another in order, so a later request sees what earlier ones changed.
+async def handle_batch(requests):
+    if not isinstance(requests, list):
+        return 400, {"ok": False, "error": "a batch must be a list of requests"}
+    if len(requests) > MAX_BATCH:
+        return 413, {"ok": False, "error": f"a batch can hold at most {MAX_BATCH} requests"}
+
+    responses = []
+    for request in requests:
+        if not isinstance(request, dict) or "path" not in request:
+            responses.append({"status": 400, "body": {"ok": False, "error": "each request needs a path"}})
+            continue
+        method = str(request.get("method", "GET")).upper()
+        status, body = await handle(method, request["path"], request.get("body")) if request["path"] != "/batch" \
+            else (400, {"ok": False, "error": "batches can't be nested"})
+        responses.append({"status": status, "body": body})
+    return 200, responses
+
+# CONNECTION FUNCTIONS 👇 ---------------------------------------------------------------------------------------#
+
+# Function used to write one response to a client.
+def write_response(writer, status, body, keep_alive):
+    payload = json.dumps(body).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+
+
+# Function used to serve one client connection. Requests are answered one after another until the client closes the
+# connection or asks for it to be closed, so a client can send any number of requests over one connection.
+async def serve_client(reader, writer):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = request_line.split(" ", 2)
+            except ValueError:
+                write_response(writer, 400, {"ok": False, "error": "bad request line"}, False)
+                break
+
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            try:
+                length = int(headers.get("content-length", 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                write_response(writer, 400, {"ok": False, "error": "bad content-length"}, False)
+                break
+            if length > MAX_BODY_SIZE:
+                write_response(writer, 413, {"ok": False, "error": "request body too large"}, False)
+                break
+            body = None
+            if length:
+                try:
+                    data = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    write_response(writer, 400, {"ok": False, "error": "request body shorter than its content-length"}, False)
+                    break
+                # NOTE: ValueError also covers a body that isn't UTF-8, which json.loads() raises as UnicodeDecodeError.
+                try:
+                    body = json.loads(data)
+                except ValueError:
+                    write_response(writer, 400, {"ok": False, "error": "body is not valid JSON"}, False)
+                    break
+
+            try:
+                status, response = await handle(method.upper(), target, body)
+            except Exception:
+                # NOTE: The details of the error stay in the server's log, since they can include customer data.
+                logger.exception("%s %s failed", method.upper(), target)
+                status, response = 500, {"ok": False, "error": STATUS_TEXT[500]}
+
+            write_response(writer, status, response, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+# Function used to run the server until it is stopped.
+async def serve(host, port):
+    server = await asyncio.start_server(serve_client, host, port)
+    print(f"Serving the customer tracking system on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await adatabase.close()
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the customer tracking system as a local HTTP/JSON service.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    args = parser.parse_args()
+
+    if args.database:
+        database.use_database(args.database)
+
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
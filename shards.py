@@ -0,0 +1,94 @@
+# NOTE: This file contains the tools for sharded mode (see the SHARD FUNCTIONS in database.py), where customers and
+# their product assignments are kept in one database file per region instead of all in one file. split copies an
+# existing database file into a new shard directory, and status counts what is in each shard.
+#
+# Usage: python shards.py split customer_data.db shards/
+#        python shards.py status shards/
+#
+# Once split, the application uses the shards when it is started with CUSTOMER_DB_SHARD_DIR=shards/ or --shards
+# shards/. Every product is copied to every shard, and customers, assignments and saved bills go to the shard of the
+# customer's location. Customer and assignment ids are moved into their shard's id range, so a customer's id changes
+# unless they are in the first shard.
+
+import argparse
+import os
+import time
+
+import database
+import queries
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+# Name the source database file is attached under while it is split.
+SOURCE_SCHEMA = "source"
+
+# SPLIT FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to copy the rows of one shard out of the attached source file into the shard the calling thread is
+# running on. Returns the number of customers copied.
+def copy_shard(shard):
+    connection = database.get_connection()
+    id_base = shard * database.SHARD_ID_RANGE
+
+    with database.unit_of_work():
+        connection.execute(queries.SPLIT_PRODUCTS)
+        customers = connection.execute(queries.SPLIT_CUSTOMERS, (id_base, shard)).rowcount
+        connection.execute(queries.SPLIT_ASSIGNMENTS, (id_base, shard))
+        connection.execute(queries.SPLIT_BILLS, (id_base, shard))
+    return customers
+
+
+# Function used to split a database file into a new shard directory. Returns the number of customers copied to each
+# shard and the time taken in seconds.
+# NOTE: The source file is attached to each shard's connection and copied with INSERT ... SELECT, so the rows never
+# pass through Python. The location_shard() SQL function picks each customer's shard.
+def split(source_path, directory):
+    start = time.perf_counter()
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"{source_path} does not exist")
+
+    # The source file is brought up to the newest schema version first so its tables match the shards'.
+    database.use_database(source_path)
+    database.migrate_database()
+    database.use_shards(directory)
+    existing = [path for path in map(database.shard_path, range(len(database.SHARDS))) if os.path.exists(path)]
+    if existing:
+        raise FileExistsError(f"{directory} already has shards ({', '.join(existing)})")
+
+    counts = []
+    for shard in range(len(database.SHARDS)):
+        connection = database.on_shard(shard, database.get_connection)
+        connection.create_function("location_shard", 1, database.location_shard, deterministic=True)
+        connection.execute(f"ATTACH DATABASE ? AS {SOURCE_SCHEMA}", (source_path, ))
+        try:
+            counts.append(database.on_shard(shard, copy_shard, shard))
+        finally:
+            connection.execute(f"DETACH DATABASE {SOURCE_SCHEMA}")
+    return counts, time.perf_counter() - start
+
+
+# Function used to count the customers and product assignments in each shard of a shard directory.
+def status(directory):
+    database.use_shards(directory)
+    return database.fan_out(lambda: database.get_connection().execute(queries.COUNT_SHARD_ROWS).fetchone())
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a database file into shards by region, or show the shards.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("split", help="copy a database file into a new shard directory")
+    command.add_argument("source", help="database file to split")
+    command.add_argument("directory", help="directory the shard files are created in")
+    command = commands.add_parser("status", help="count the customers and assignments in each shard")
+    command.add_argument("directory", help="shard directory")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        counts, elapsed = split(args.source, args.directory)
+        print(f"Split {sum(counts)} customers into {len(counts)} shards in {elapsed:.2f}s.")
+        for name, count in zip(database.SHARDS, counts):
+            print(f"  {name}: {count} customers")
+    else:
+        for name, (customers, assignments) in zip(database.SHARDS, status(args.directory)):
+            print(f"{name}: {customers} customers, {assignments} product assignments")
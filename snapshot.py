@@ -0,0 +1,56 @@
+# NOTE: This file contains the snapshot tool. It copies the live database to a snapshot file with SQLite's online
+# backup API while the operators keep working, showing the progress of the copy as it goes. Exports and billing runs
+# can then read the snapshot (python export.py customers --snapshot snapshot.db, or python billing.py --snapshot
+# snapshot.db) instead of competing with the operators for the live database.
+#
+# Usage: python snapshot.py [output.db] [--pages 1024] [--database file.db]
+#
+# In sharded mode (CUSTOMER_DB_SHARD_DIR set), the output is a directory with a snapshot of every shard.
+
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import database
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+# Name of the snapshot file when none is given, such as snapshot_2024-01-05_1530.db.
+DEFAULT_SNAPSHOT_PATH = "snapshot_{time:%Y-%m-%d_%H%M}.db"
+
+# SNAPSHOT FUNCTIONS 👇 -----------------------------------------------------------------------------------------#
+
+# Function used to show the progress of a snapshot on one line that is rewritten after every step.
+def show_progress(status, remaining, total):
+    copied = total - remaining
+    sys.stdout.write(f"\rCopied {copied:,} of {total:,} pages ({copied / max(total, 1):.0%})")
+    sys.stdout.flush()
+
+
+# Function used to take a snapshot. Returns the time taken in seconds.
+def take_snapshot(snapshot_path, pages=database.SNAPSHOT_PAGES, progress=None):
+    start = time.perf_counter()
+    database.snapshot_database(snapshot_path, pages, progress)
+    return time.perf_counter() - start
+
+# MAIN 👇 -------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the live database to a snapshot for reporting.")
+    parser.add_argument("output", nargs="?", help="snapshot file (default: snapshot_<date>_<time>.db)")
+    parser.add_argument("--pages", type=int, default=database.SNAPSHOT_PAGES, help="pages copied per step")
+    parser.add_argument("--database", help="database file (default: $CUSTOMER_DB_PATH or customer_data.db)")
+    args = parser.parse_args()
+
+    snapshot_path = args.output or DEFAULT_SNAPSHOT_PATH.format(time=datetime.now())
+
+    if args.database:
+        database.use_database(args.database)
+    # The progress is only shown on a terminal, where the line can be rewritten.
+    progress = show_progress if sys.stdout.isatty() else None
+    elapsed = take_snapshot(snapshot_path, args.pages, progress)
+
+    if progress:
+        print()
+    print(f"Snapshot written to {snapshot_path} in {elapsed:.2f}s.")
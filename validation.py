@@ -0,0 +1,104 @@
+# NOTE: This file contains the validation of customer and payment data, shared by the prompts, the bulk import, the
+# payment posting, the command mode and the JSON service. Each parse function checks a value against a pattern that is
+# compiled once when the file is imported and converts it in the same pass (a date straight into its timestamp), so a
+# value is never checked in one place and converted in another.
+#
+# A parse function returns the converted value, or raises a ValueError whose message finishes the sentence started by
+# the value's label (such as "phone number" + "must be in XXX-XXX-XXXX format"). validate_batch() runs the parse
+# functions over a whole chunk of records a column at a time and returns each record's values or error.
+
+import functools
+import re
+from datetime import datetime
+
+#-----------------------------------------------------------------------------------------------------------------#
+
+PHONE_NUMBER_FORMAT = re.compile(r"\d{3}-\d{3}-\d{4}")
+
+CARD_NUMBER_FORMAT = re.compile(r"\d{13,19}")
+
+# Dates are entered as mm-dd-YYYY. The groups are the month, day and year.
+DATE_FORMAT = re.compile(r"(0[1-9]|1[0-2])-(0[1-9]|[1-2][0-9]|3[0-1])-(\d{4})")
+
+# Most dates kept by parse_date(). An import file only holds a few thousand different days, so nearly every date after
+# the first few rows is converted by a dictionary lookup.
+DATE_CACHE_SIZE = 65536
+
+# PARSE FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to parse a phone number, which must be in XXX-XXX-XXXX format.
+def parse_phone_number(phone_num):
+    if PHONE_NUMBER_FORMAT.fullmatch(phone_num) is None:
+        raise ValueError("must be in XXX-XXX-XXXX format")
+    return phone_num
+
+
+# Function used to parse a card number, which must be 13 to 19 digits with no dashes.
+def parse_card_number(card_num):
+    if CARD_NUMBER_FORMAT.fullmatch(card_num) is None:
+        raise ValueError("must be 13 to 19 digits")
+    return card_num
+
+
+# Function used to parse a mm-dd-YYYY date into the timestamp stored in the database.
+# NOTE: The pattern has already split the date into its month, day and year, so the timestamp is built from them
+# directly rather than parsing the date again with datetime.strptime(). A date that doesn't exist (such as 02-30-2024)
+# is rejected too.
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(date):
+    match = DATE_FORMAT.fullmatch(date)
+    if match is None:
+        raise ValueError("must be in mm-dd-YYYY format")
+    month, day, year = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day)).timestamp()
+    except ValueError:
+        raise ValueError("does not exist") from None
+
+# VALIDATORS 👇 -------------------------------------------------------------------------------------------------#
+
+# NOTE: Each validator is the record field it reads, the label used in its error messages, and the parse function
+# its value is passed to (None for free text, which only has to be present).
+
+CUSTOMER_VALIDATORS = [
+    ("name", "name", None),
+    ("phone_num", "phone number", parse_phone_number),
+    ("location", "location", None),
+    ("card_num", "card number", parse_card_number),
+    ("sign_up_date", "sign-up date", parse_date),
+    ("last_payment", "last payment date", parse_date),
+]
+
+# BATCH FUNCTIONS 👇 --------------------------------------------------------------------------------------------#
+
+# Function used to validate a chunk of records (dictionaries, such as the rows of an import file). Each field is
+# checked down the whole chunk before the next, and a record stops being checked at its first error.
+# Returns a list of each record's converted values (a tuple in the order of the validators, or None if the record
+# isn't valid) and a list of each record's error (None if it is valid).
+def validate_batch(records, validators):
+    errors = [None] * len(records)
+    columns = []
+
+    for field, label, parse in validators:
+        column = [None] * len(records)
+        for index, record in enumerate(records):
+            if errors[index] is not None:
+                continue
+
+            value = record.get(field)
+            value = "" if value is None else str(value).strip()
+            if not value:
+                errors[index] = f"missing {field}"
+                continue
+
+            if parse is not None:
+                try:
+                    value = parse(value)
+                except ValueError as error:
+                    errors[index] = f"{label} {error}"
+                    continue
+            column[index] = value
+        columns.append(column)
+
+    values = [None if error else fields for fields, error in zip(zip(*columns), errors)]
+    return values, errors